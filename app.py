@@ -1,5 +1,5 @@
 # app.py
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, Response
 from youtube_transcript_api import YouTubeTranscriptApi
 from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound
 from google import genai
@@ -10,21 +10,37 @@ from datetime import datetime
 import os
 import time
 import tempfile
-import io
 import base64
+import hashlib
+from urllib.parse import quote
 from dotenv import load_dotenv
+from job_queue import JobManager, QueueFullError
+from transcript_cache import TwoTierCache
+from singleflight import SingleFlight
+from captions import select_caption_track, CaptionTrackCache
+from gemini_router import ModelRouter
+from summarizer import summarize_text, PROMPT_VERSION
+from exporters import EXPORT_FORMATS, SUBTITLE_FORMATS, parse_segments, export_etag, iter_export
+from batch_ingest import BatchManager, BatchLimitError, BATCH_MAX_ITEMS
+from progress import ProgressBroker, is_valid_progress_id
+from cancellation import RequestScope, CancelRegistry, SharedCancel
+from history_cursor import encode_history_cursor, decode_history_cursor
 
 load_dotenv()
 
 # MCP Client import
 try:
-    from mcp_client_utils import call_process_youtube_workflow, call_transcribe_audio, call_convert_media, check_connection
+    from mcp_client_utils import call_process_youtube_workflow, call_transcribe_audio, call_convert_media, check_connection, get_health_snapshot
+    from mcp_client_utils import call_convert_media_stream, MCPToolError
 except ImportError as e:
     print(f"MCP Client Utils import failed: {e}")
-    def call_process_youtube_workflow(url): return f"MCP Client modülü yüklenemedi: {e}"
-    def call_transcribe_audio(file_path, model_size="base"): return f"MCP Client modülü yüklenemedi: {e}"
+    class MCPToolError(Exception): pass
+    def call_convert_media_stream(file_path, target_format="mp3"): raise MCPToolError(f"MCP Client modülü yüklenemedi: {e}")
+    def call_process_youtube_workflow(url, on_progress=None, deadline=None, cancel_event=None): return f"MCP Client modülü yüklenemedi: {e}"
+    def call_transcribe_audio(file_path, model_size="base", on_progress=None, deadline=None, cancel_event=None): return f"MCP Client modülü yüklenemedi: {e}"
     def call_convert_media(file_path, target_format="mp3"): return f"MCP Client modülü yüklenemedi: {e}"
     def check_connection(): return False
+    def get_health_snapshot(): return {'status': 'disconnected', 'connected': False, 'last_error': f"MCP Client modülü yüklenemedi: {e}"}
 
 app = Flask(__name__)
 
@@ -38,6 +54,30 @@ url: str = os.environ.get("SUPABASE_URL")
 key: str = os.environ.get("SUPABASE_KEY")
 supabase: Client = create_client(url, key)
 
+# Asenkron iş modu için arka plan iş havuzu
+job_manager = JobManager()
+
+# Supabase önünde yerel transkript önbelleği (bellek + SQLite)
+transcript_cache = TwoTierCache('transcripts')
+
+# Özet önbelleği: metin özeti + model + prompt sürümü -> özet (bellek + SQLite + Supabase)
+summary_cache = TwoTierCache('summaries')
+
+# Aynı video/dosya için eşzamanlı istekleri tek işleme indirger
+youtube_flight = SingleFlight()
+workflow_flight = SingleFlight()
+upload_flight = SingleFlight()
+
+# MCP araçlarından gelen ilerleme olaylarını tarayıcıya (SSE) aktarır
+progress_broker = ProgressBroker()
+
+# İstemci koptuğunda veya sekme kapandığında MCP çağrılarını iptal etmek için
+cancel_registry = CancelRegistry()
+shared_cancel = SharedCancel()
+
+# Video başına seçilen altyazı izi (tekrar listelemeyi önler)
+caption_tracks = CaptionTrackCache()
+
 # Fallback models to try in order
 GEMINI_MODELS = [
     'gemini-1.5-flash',
@@ -48,38 +88,18 @@ GEMINI_MODELS = [
     'gemini-1.5-pro-001'
 ]
 
+# Özet önbelleği anahtarında kullanılan, model listesi değişince değişen kısa özet
+GEMINI_MODELS_HASH = hashlib.sha256(','.join(GEMINI_MODELS).encode('utf-8')).hexdigest()[:12]
+
+# Sağlıklı modeli hatırlayan, devre kesicili model yönlendirici
+model_router = ModelRouter(client, GEMINI_MODELS)
+
 def generate_content_with_retry(contents, config=None):
     """
-    Tries to generate content using a list of fallback models.
+    Generates content on the best healthy model, failing over to the others.
+    See gemini_router.ModelRouter for health scores and circuit breaking.
     """
-    last_error = None
-
-    # Try models in order
-    for model_name in GEMINI_MODELS:
-        try:
-            print(f"Trying Gemini model: {model_name}")
-            response = client.models.generate_content(
-                model=model_name,
-                contents=contents,
-                config=config
-            )
-            print(f"Success with model: {model_name}")
-            return response
-        except Exception as e:
-            error_str = str(e)
-            print(f"Failed with model {model_name}: {error_str}")
-
-            if "404" in error_str or "NOT_FOUND" in error_str or "not found" in error_str:
-                last_error = e
-                continue
-
-            last_error = e
-
-    if last_error:
-        print(f"All models failed. Last error: {last_error}")
-        raise last_error
-    else:
-        raise Exception("No models available or unknown error")
+    return model_router.generate_content(contents, config=config)
 
 # YouTube URL patterns
 VIDEO_ID_PATTERNS = [
@@ -95,32 +115,45 @@ def extract_video_id(url):
             return match.group(1)
     return None
 
-def get_transcript(video_id, language='tr'):
-    """YouTube video transkriptini alır - TAM METİN"""
+def get_transcript(video_id, languages=None, use_cache=True):
+    """YouTube video transkriptini alır - TAM METİN. use_cache=False iken 'transkript yok' önbelleğine bakılmaz."""
     try:
         print(f"Video ID için transkript alınıyor: {video_id}")
+
+        negative = transcript_cache.get_negative(video_id) if use_cache else None
+        if negative:
+            print(f"Önbellek: bu video için transkript olmadığı biliniyor ({video_id})")
+            return None, negative
         
         cookies_file = 'youtube_cookies.txt'
         cookies = cookies_file if os.path.exists(cookies_file) else None
         
         ytt = YouTubeTranscriptApi()
-        
-        try:
-            print(f"Türkçe transkript deneniyor...")
-            transcript_data = ytt.fetch(video_id, languages=['tr'])
-            detected_language = 'tr'
-            print(f"Türkçe transkript bulundu!")
-        except:
+
+        transcript_data = None
+        cached_track = caption_tracks.get(video_id)
+        if cached_track:
+            track, detected_language = cached_track
             try:
-                print(f"İngilizce transkript deneniyor...")
-                transcript_data = ytt.fetch(video_id, languages=['en'])
-                detected_language = 'en'
-                print(f"İngilizce transkript bulundu!")
-            except:
-                print(f"Otomatik transkript deneniyor...")
-                transcript_data = ytt.fetch(video_id)
-                detected_language = 'auto'
-                print(f"Otomatik transkript bulundu!")
+                transcript_data = track.fetch()
+                print(f"Önbellekteki altyazı izi kullanıldı: {detected_language}")
+            except (TranscriptsDisabled, NoTranscriptFound):
+                raise
+            except Exception as e:
+                # İz URL'si geçersizleşmiş olabilir, yeniden keşfet
+                print(f"Önbellekteki altyazı izi alınamadı ({e}), yeniden listeleniyor...")
+                caption_tracks.invalidate(video_id)
+
+        if transcript_data is None:
+            # Mevcut altyazıları tek seferde listele, en uygununu seç ve sadece onu indir
+            transcript_list = ytt.list(video_id)
+            track, detected_language = select_caption_track(transcript_list, languages)
+            if track is None:
+                raise NoTranscriptFound(video_id, languages or [], transcript_list)
+
+            print(f"Seçilen altyazı: {detected_language} ({'otomatik' if track.is_generated else 'manuel'})")
+            transcript_data = track.fetch()
+            caption_tracks.set(video_id, track, detected_language)
         
         print(f"Transkript verisi alındı: {len(transcript_data)} satır")
         
@@ -139,9 +172,13 @@ def get_transcript(video_id, language='tr'):
         }, None
     
     except TranscriptsDisabled:
-        return None, "Bu video için transkript kapalı."
+        error = "Bu video için transkript kapalı."
+        transcript_cache.set_negative(video_id, error)
+        return None, error
     except NoTranscriptFound:
-        return None, "Bu video için transkript bulunamadı."
+        error = "Bu video için transkript bulunamadı."
+        transcript_cache.set_negative(video_id, error)
+        return None, error
     except Exception as e:
         print(f"HATA: {type(e).__name__}: {str(e)}")
         import traceback
@@ -159,15 +196,59 @@ def format_timestamp(seconds):
     else:
         return f"{minutes:02d}:{secs:02d}"
 
-def generate_summary(text):
-    """Gemini ile özet oluşturur"""
+def summary_cache_key(text):
+    """
+    Özet önbelleği anahtarı: metnin SHA-256'sı, yapılandırılmış model listesi ve prompt sürümü.
+    O an en sağlıklı görünen model anahtara girmez; yönlendiricinin seçimi değiştikçe aynı metin ıskalanırdı.
+    """
+    text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    return f"{text_hash}:{GEMINI_MODELS_HASH}:v{PROMPT_VERSION}"
+
+def get_cached_summary(cache_key):
+    """Özeti önce yerel önbellekte, sonra Supabase'deki summary_cache tablosunda arar"""
+    summary = summary_cache.get(cache_key)
+    if summary:
+        return summary
+
+    try:
+        response = supabase.table('summary_cache').select('summary').eq('cache_key', cache_key).limit(1).execute()
+        if response.data:
+            summary = response.data[0]['summary']
+            summary_cache.set(cache_key, summary)
+            return summary
+    except Exception as e:
+        print(f"Özet önbelleği okunamadı (Supabase): {e}")
+    return None
+
+def store_cached_summary(cache_key, summary, model=None):
+    """Özeti önbelleğe yazar; model yalnızca bilgi amaçlı saklanır (özeti birleştiren son çağrıyı yanıtlayan model)"""
+    summary_cache.set(cache_key, summary)
+    text_hash, _, prompt_version = cache_key.split(':')
     try:
-        prompt = f"""Aşağıdaki metni özetle. Önemli noktaları maddeler halinde belirt:
+        supabase.table('summary_cache').upsert({
+            'cache_key': cache_key,
+            'text_hash': text_hash,
+            'model': model or 'unknown',
+            'prompt_version': int(prompt_version.lstrip('v')),
+            'summary': summary,
+            'created': datetime.now().isoformat()
+        }).execute()
+    except Exception as e:
+        print(f"Özet önbelleğe yazılamadı (Supabase): {e}")
 
-        {text[:100000]}
-        """
-        response = generate_content_with_retry(contents=prompt)
-        return response.text, None
+def generate_summary(text):
+    """Gemini ile özet oluşturur. Uzun metinler bölümlenip map-reduce ile özetlenir, kırpılmaz."""
+    try:
+        cache_key = summary_cache_key(text)
+        cached = get_cached_summary(cache_key)
+        if cached:
+            print("Özet önbellekten getirildi.")
+            return cached, None
+
+        summary = summarize_text(text, lambda prompt: generate_content_with_retry(contents=prompt).text)
+        # Son çağrı (tek istek ya da reduce adımı) bu thread'de yapılır
+        store_cached_summary(cache_key, summary, model_router.last_model())
+        return summary, None
     except Exception as e:
         return None, f"Özet oluşturma hatası: {str(e)}"
 
@@ -181,16 +262,35 @@ def save_to_supabase(data, file_obj=None):
         response = supabase.table('transcripts').insert(data).execute()
         # Supabase returns the inserted data
         if response.data:
-            return response.data[0]['id'], None
+            record = response.data[0]
+            if record.get('video_id'):
+                transcript_cache.set(record['video_id'], record)
+            return record['id'], None
         return None, "Kayıt başarısız, veri dönmedi."
     except Exception as e:
         return None, f"Veritabanı hatası: {str(e)}"
 
+def update_summary_in_supabase(record, summary):
+    """Mevcut kaydın özetini günceller ve yerel önbelleği tazeler"""
+    try:
+        supabase.table('transcripts').update({'summary': summary}).eq('id', record['id']).execute()
+    except Exception as e:
+        return f"Veritabanı hatası: {str(e)}"
+
+    if record.get('video_id'):
+        transcript_cache.set(record['video_id'], {**record, 'summary': summary})
+    return None
+
 def get_from_supabase(video_id):
-    """Supabase'den transkript getirir"""
+    """Supabase'den transkript getirir (önce yerel önbelleğe bakar)"""
+    cached = transcript_cache.get(video_id)
+    if cached:
+        return cached, None
+
     try:
         response = supabase.table('transcripts').select("*").eq('video_id', video_id).execute()
         if response.data:
+            transcript_cache.set(video_id, response.data[0])
             return response.data[0], None
         return None, "Kayıt bulunamadı"
     except Exception as e:
@@ -202,22 +302,33 @@ def index():
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """MCP Sunucusu bağlantı kontrolü"""
-    is_connected = check_connection()
+    """MCP Sunucusu bağlantı durumu (arka planda ölçülen son durum, anında döner)"""
+    return jsonify(get_health_snapshot())
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Yerel transkript önbelleği istatistikleri"""
     return jsonify({
-        'status': 'connected' if is_connected else 'disconnected',
-        'connected': is_connected
+        'success': True,
+        'transcripts': transcript_cache.stats(),
+        'summaries': summary_cache.stats()
     })
 
+@app.route('/api/cache/<video_id>', methods=['DELETE'])
+def invalidate_cache(video_id):
+    """Bir videonun önbellek kayıtlarını (olumsuz sonuçlar dahil) siler"""
+    transcript_cache.invalidate(video_id)
+    return jsonify({'success': True, 'video_id': video_id})
+
 @app.route('/api/transcript', methods=['POST'])
 def get_transcript_api():
     try:
         if 'audio_file' in request.files:
-            return handle_file_upload()
+            return handle_file_upload(async_mode=request.form.get('async') == 'true')
         
         if request.is_json:
             data = request.json
-            return handle_youtube_url(data)
+            return handle_youtube_url(data, async_mode=data.get('async') is True or data.get('async') == 'true')
 
         if request.form.get('url'):
              data = {
@@ -226,7 +337,7 @@ def get_transcript_api():
                  'generate_summary': request.form.get('generate_summary') == 'true',
                  'include_timestamps': request.form.get('include_timestamps') == 'true'
              }
-             return handle_youtube_url(data)
+             return handle_youtube_url(data, async_mode=request.form.get('async') == 'true')
 
         return jsonify({'error': 'Geçersiz istek formatı'}), 400
 
@@ -238,6 +349,64 @@ def get_transcript_api():
         traceback.print_exc()
         return jsonify({'error': f'Sunucu hatası: {str(e)}'}), 500
 
+def submit_job(fn, *args, **kwargs):
+    """İşi arka plan havuzuna gönderir ve hemen job_id döndürür"""
+    try:
+        job_id = job_manager.submit(fn, *args, **kwargs)
+    except QueueFullError:
+        response = jsonify({'error': 'Sunucu meşgul, iş kuyruğu dolu. Lütfen daha sonra tekrar deneyin.'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': f'/api/jobs/{job_id}'
+    }), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Asenkron işin durumunu ve sonucunu döndürür"""
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({'error': 'İş bulunamadı'}), 404
+
+    return jsonify({
+        'success': True,
+        'job_id': job['id'],
+        'status': job['status'],
+        'created': job['created'],
+        'started': job['started'],
+        'finished': job['finished'],
+        'result': job['result'],
+        'error': job['error']
+    })
+
+@app.route('/api/progress/<progress_id>', methods=['GET'])
+def progress_stream(progress_id):
+    """İsteğin ilerleme olaylarını Server-Sent Events olarak yayınlar"""
+    if not is_valid_progress_id(progress_id):
+        return jsonify({'error': 'Geçersiz progress_id'}), 400
+
+    return Response(
+        progress_broker.subscribe(progress_id, request.headers.get('Last-Event-ID')),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/cancel/<progress_id>', methods=['POST'])
+def cancel_request(progress_id):
+    """Tarayıcının (sendBeacon) gönderdiği iptal isteği; çalışan MCP çağrısını durdurur"""
+    if not is_valid_progress_id(progress_id):
+        return jsonify({'error': 'Geçersiz progress_id'}), 400
+    return jsonify({'success': True, 'cancelled': cancel_registry.cancel(progress_id)})
+
+@app.route('/api/jobs', methods=['GET'])
+def get_job_stats():
+    """İş kuyruğu istatistikleri"""
+    return jsonify({'success': True, **job_manager.stats()})
+
 @app.route('/api/process_youtube_local', methods=['POST'])
 def process_youtube_local():
     """
@@ -246,17 +415,31 @@ def process_youtube_local():
 
     GÜNCELLEME: Artık uzaktaki MCP sunucusunu (ertugrulerata-mcp-media-server.hf.space) kullanıyor.
     """
+    progress_id = None
     try:
         data = request.json
         if not data or 'url' not in data:
             return jsonify({'error': 'URL gerekli'}), 400
 
         url = data['url']
+        progress_id = data.get('progress_id')
         print(f"\n=== YEREL YOUTUBE İŞLEME İSTEĞİ (MCP REMOTE) ===")
         print(f"URL: {url}")
 
-        # Uzaktaki MCP sunucusuna istek gönder
-        report = call_process_youtube_workflow(url)
+        # Uzaktaki MCP sunucusuna istek gönder (aynı video için devam eden işlem varsa onu bekle)
+        flight_key = extract_video_id(url) or url
+        with RequestScope(request.environ, progress_id, cancel_registry) as scope:
+            progress_broker.join(flight_key, progress_id)
+            cancel_event = shared_cancel.join(flight_key, scope)
+            try:
+                report, _ = workflow_flight.do(
+                    flight_key, call_process_youtube_workflow, url,
+                    lambda event: progress_broker.publish_group(flight_key, event),
+                    scope.deadline, cancel_event
+                )
+            finally:
+                progress_broker.leave(flight_key, progress_id)
+                shared_cancel.leave(flight_key, scope)
 
         return jsonify({
             'success': True,
@@ -266,6 +449,8 @@ def process_youtube_local():
     except Exception as e:
         print(f"HATA: {str(e)}")
         return jsonify({'error': str(e)}), 500
+    finally:
+        progress_broker.finish(progress_id)
 
 @app.route('/api/convert', methods=['POST'])
 def convert_media():
@@ -288,21 +473,22 @@ def convert_media():
 
         print(f"Media conversion requested (MCP Remote): {file.filename} -> {target_format}")
 
-        # Convert via MCP
-        result_base64 = call_convert_media(temp_path, target_format)
-
-        # Check for errors
-        if result_base64.startswith("Hata:") or result_base64.startswith("MCP Client Error:"):
-            return jsonify({'error': result_base64}), 400
-
-        # Decode result
-        data = base64.b64decode(result_base64)
-
-        return send_file(
-            io.BytesIO(data),
-            as_attachment=True,
-            download_name=f"{os.path.splitext(file.filename)[0]}.{target_format}",
-            mimetype=f"audio/{target_format}"
+        # Convert via MCP; the result stays on the server and is streamed in ranged chunks
+        try:
+            _, chunks = call_convert_media_stream(temp_path, target_format)
+        except MCPToolError as e:
+            return jsonify({'error': str(e)}), 400
+
+        download_name = f"{os.path.splitext(file.filename)[0]}.{target_format}"
+        # Content-Length gönderilmez: indirme yarıda hata verirse yanıt chunked sonlandırıcısı olmadan kesilir
+        # ve istemci eksik dosyayı tamamlanmış saymaz
+        return Response(
+            chunks,
+            mimetype=f"audio/{target_format}",
+            headers={
+                # RFC 5987: Türkçe karakterli dosya adları için
+                'Content-Disposition': f"attachment; filename*=UTF-8''{quote(download_name)}"
+            }
         )
 
     except Exception as e:
@@ -312,74 +498,124 @@ def convert_media():
         if temp_path and os.path.exists(temp_path):
             os.unlink(temp_path)
 
-def handle_file_upload():
+def handle_file_upload(async_mode=False):
     """Dosya yükleme işlemlerini yönetir"""
-    temp_path = None
+    file = request.files['audio_file']
+    generate_summary_flag = request.form.get('generate_summary') == 'true'
+    model_size = request.form.get('model_size', 'base')
+    progress_id = request.form.get('progress_id')
+    
+    if file.filename == '':
+        return jsonify({'error': 'Dosya seçilmedi'}), 400
+
+    print(f"\n=== YENİ DOSYA YÜKLEME ===")
+    print(f"Dosya: {file.filename}")
+    print(f"Model: {model_size}")
+    
+    suffix = os.path.splitext(file.filename)[1]
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp:
+        temp_path = temp.name
+
     try:
-        file = request.files['audio_file']
-        generate_summary_flag = request.form.get('generate_summary') == 'true'
-        model_size = request.form.get('model_size', 'base')
-        
-        if file.filename == '':
-            return jsonify({'error': 'Dosya seçilmedi'}), 400
+        file.save(temp_path)
 
-        print(f"\n=== YENİ DOSYA YÜKLEME ===")
-        print(f"Dosya: {file.filename}")
-        print(f"Model: {model_size}")
-        
-        suffix = os.path.splitext(file.filename)[1]
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp:
-            file.save(temp.name)
-            temp_path = temp.name
+        if async_mode:
+            response = submit_job(process_uploaded_file, temp_path, file.filename, generate_summary_flag, model_size, progress_id)
+            if response[1] != 202 and os.path.exists(temp_path):
+                os.unlink(temp_path)
+            return response
 
-        print("Whisper (MCP Remote) ile transkript alınıyor...")
-        transcript_result = call_transcribe_audio(temp_path, model_size=model_size)
-        
-        if transcript_result.startswith("Hata:") or transcript_result.startswith("Transkripsiyon hatası:") or transcript_result.startswith("MCP Client Error:"):
-            return jsonify({'error': transcript_result}), 400
-
-        transcript_text = transcript_result
-
-        summary = None
-        if generate_summary_flag:
-            print("Özet oluşturuluyor...")
-            summary, sum_error = generate_summary(transcript_text)
-            if sum_error:
-                summary = f"Özet oluşturulamadı: {sum_error}"
-
-        print("Veritabanına kaydediliyor...")
-
-        with open(temp_path, 'rb') as f:
-            data = {
-                "video_id": "",
-                "url": "",
-                "full_transcript": transcript_text,
-                "simple_transcript": transcript_text,
-                "language": "auto",
-                "summary": summary or "",
-                "created": datetime.now().isoformat()
-            }
-            record_id, save_error = save_to_supabase(data, file_obj=(file.filename, f))
+        payload, status_code = process_uploaded_file(temp_path, file.filename, generate_summary_flag, model_size, progress_id, request.environ)
+        return jsonify(payload), status_code
+    except Exception:
+        # Kayıt veya işe gönderme başarısız olursa geçici dosya (delete=False) geride kalmasın
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
 
-        if save_error:
-            print(f"Kayıt hatası: {save_error}")
-        
-        return jsonify({
-            'success': True,
-            'video_id': None,
-            'transcript': transcript_text,
-            'summary': summary,
-            'language': 'auto',
-            'from_cache': False,
-            'saved': record_id is not None,
-            'record_id': record_id
-        })
+def file_sha256(file_path):
+    """Dosyanın SHA-256 özetini parça parça okuyarak hesaplar"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
 
+def process_uploaded_file(temp_path, filename, generate_summary_flag=False, model_size='base', progress_id=None, environ=None):
+    """
+    Yüklenen dosyayı işler, (payload, status_code) döndürür. Geçici dosyayı siler.
+    environ verilirse (senkron istek) istemci bağlantısı koptuğunda MCP çağrısı iptal edilir.
+    """
+    flight_key = None
+    scope = RequestScope(environ, progress_id, cancel_registry)
+    try:
+        with scope:
+            # Aynı içerik aynı anda birden fazla yüklendiyse sadece biri işlenir; ilerleme hepsine yayınlanır
+            flight_key = f"{file_sha256(temp_path)}:{model_size}:{bool(generate_summary_flag)}"
+            progress_broker.join(flight_key, progress_id)
+            cancel_event = shared_cancel.join(flight_key, scope)
+            on_progress = lambda event: progress_broker.publish_group(flight_key, event)
+            result, _ = upload_flight.do(flight_key, transcribe_uploaded_file, temp_path, filename, generate_summary_flag,
+                                         model_size, on_progress, scope.deadline, cancel_event)
+            return result
     finally:
+        if flight_key:
+            progress_broker.leave(flight_key, progress_id)
+            shared_cancel.leave(flight_key, scope)
+        progress_broker.finish(progress_id)
         if temp_path and os.path.exists(temp_path):
             os.unlink(temp_path)
 
-def handle_youtube_url(data):
+def transcribe_uploaded_file(temp_path, filename, generate_summary_flag=False, model_size='base', on_progress=None,
+                             deadline=None, cancel_event=None):
+    """Dosyayı MCP ile yazıya döker, özetler ve kaydeder"""
+    print("Whisper (MCP Remote) ile transkript alınıyor...")
+    transcript_result = call_transcribe_audio(temp_path, model_size=model_size, on_progress=on_progress,
+                                              deadline=deadline, cancel_event=cancel_event)
+    
+    if transcript_result.startswith("Hata:") or transcript_result.startswith("Transkripsiyon hatası:") or transcript_result.startswith("MCP Client Error:"):
+        return {'error': transcript_result}, 400
+
+    transcript_text = transcript_result
+
+    summary = None
+    if generate_summary_flag:
+        print("Özet oluşturuluyor...")
+        if on_progress:
+            on_progress({'step': 'summary', 'message': 'Özet oluşturuluyor...'})
+        summary, sum_error = generate_summary(transcript_text)
+        if sum_error:
+            summary = f"Özet oluşturulamadı: {sum_error}"
+
+    print("Veritabanına kaydediliyor...")
+
+    with open(temp_path, 'rb') as f:
+        data = {
+            "video_id": "",
+            "url": "",
+            "full_transcript": transcript_text,
+            "simple_transcript": transcript_text,
+            "language": "auto",
+            "summary": summary or "",
+            "created": datetime.now().isoformat()
+        }
+        record_id, save_error = save_to_supabase(data, file_obj=(filename, f))
+
+    if save_error:
+        print(f"Kayıt hatası: {save_error}")
+    
+    return {
+        'success': True,
+        'video_id': None,
+        'transcript': transcript_text,
+        'summary': summary,
+        'language': 'auto',
+        'from_cache': False,
+        'saved': record_id is not None,
+        'record_id': record_id
+    }, 200
+
+def handle_youtube_url(data, async_mode=False):
     """Mevcut YouTube URL işleme mantığı"""
     url = data.get('url')
     use_cache = data.get('use_cache', True)
@@ -396,28 +632,73 @@ def handle_youtube_url(data):
     if not video_id:
         return jsonify({'error': 'Geçersiz YouTube URL\'si'}), 400
 
+    if async_mode:
+        return submit_job(process_youtube_video, url, video_id, use_cache, generate_summary_flag, include_timestamps)
+
+    payload, status_code = process_youtube_video(url, video_id, use_cache, generate_summary_flag, include_timestamps)
+    return jsonify(payload), status_code
+
+def process_youtube_video(url, video_id, use_cache=True, generate_summary_flag=False, include_timestamps=True):
+    """YouTube videosunun transkriptini alır/özetler/kaydeder, (payload, status_code) döndürür"""
     if use_cache:
         cached_record, error = get_from_supabase(video_id)
         if cached_record:
             # Supabase returns dict, not object
+            summary = cached_record.get('summary', '')
+            if generate_summary_flag and not summary:
+                # Kayıt özetsiz saklanmış; özeti şimdi üretip kayda ekle
+                summary, sum_error = generate_summary(cached_record['full_transcript'])
+                if sum_error:
+                    summary = f"Özet oluşturulamadı: {sum_error}"
+                else:
+                    save_error = update_summary_in_supabase(cached_record, summary)
+                    if save_error:
+                        print(f"Özet kaydedilemedi: {save_error}")
+
             transcript_text = cached_record['full_transcript'] if include_timestamps else cached_record['simple_transcript']
-            return jsonify({
+            return {
                 'success': True,
                 'video_id': video_id,
                 'transcript': transcript_text,
-                'summary': cached_record.get('summary', ''),
+                'summary': summary,
                 'language': cached_record.get('language', ''),
                 'from_cache': True,
                 'record_id': cached_record['id']
-            })
+            }, 200
 
-    transcript_data, error = get_transcript(video_id)
+    # Aynı video için devam eden bir işlem varsa YouTube/Gemini/DB'ye tekrar gitmeden onun sonucunu bekle
+    flight_key = f"{video_id}:{bool(generate_summary_flag)}:{bool(use_cache)}"
+    result, _ = youtube_flight.do(flight_key, fetch_and_store_transcript, url, video_id, generate_summary_flag, use_cache)
+    if 'error' in result:
+        return result, 400
+
+    transcript_data = result['transcript_data']
+    summary = result['summary']
+    record_id = result['record_id']
+
+    transcript_text = transcript_data['full_text'] if include_timestamps else transcript_data['simple_text']
+
+    return {
+        'success': True,
+        'video_id': video_id,
+        'transcript': transcript_text,
+        'summary': summary,
+        'language': transcript_data['language'],
+        'from_cache': False,
+        'saved': record_id is not None,
+        'record_id': record_id
+    }, 200
+
+def fetch_and_store_transcript(url, video_id, generate_summary_flag=False, use_cache=True):
+    """Transkripti YouTube'dan alır, isteğe bağlı özetler ve Supabase'e kaydeder"""
+    transcript_data, error = get_transcript(video_id, use_cache=use_cache)
     if error:
-        return jsonify({'error': error}), 400
+        return {'error': error}
 
     summary = None
     if generate_summary_flag:
-        summary, sum_error = generate_summary(transcript_data['simple_text'])
+        # Zaman damgalı metin, uzun videolarda bölüm sınırları için kullanılır
+        summary, sum_error = generate_summary(transcript_data['full_text'])
         if sum_error:
             summary = f"Özet oluşturulamadı: {sum_error}"
 
@@ -431,19 +712,92 @@ def handle_youtube_url(data):
         "created": datetime.now().isoformat()
     }
     record_id, save_error = save_to_supabase(data)
+    if save_error:
+        print(f"Kayıt hatası: {save_error}")
 
-    transcript_text = transcript_data['full_text'] if include_timestamps else transcript_data['simple_text']
+    return {
+        'transcript_data': transcript_data,
+        'summary': summary,
+        'record_id': record_id
+    }
+
+def fetch_batch_row(video_id, url, options):
+    """Toplu iş için tek videonun kaydedilecek satırını hazırlar (kaydetmez)"""
+    transcript_data, error = get_transcript(video_id)
+    if error:
+        return None, error
+
+    summary = None
+    if options.get('generate_summary'):
+        summary, sum_error = generate_summary(transcript_data['full_text'])
+        if sum_error:
+            summary = f"Özet oluşturulamadı: {sum_error}"
+
+    return {
+        "video_id": video_id,
+        "url": url,
+        "full_transcript": transcript_data['full_text'],
+        "simple_transcript": transcript_data['simple_text'],
+        "language": transcript_data['language'],
+        "summary": summary or "",
+        "created": datetime.now().isoformat()
+    }, None
+
+def existing_video_ids(video_ids):
+    """Önbellekte veya Supabase'de zaten kaydı olan video ID'lerini döndürür"""
+    found = {video_id for video_id in video_ids if transcript_cache.get(video_id)}
+    remaining = [video_id for video_id in video_ids if video_id not in found]
+    for i in range(0, len(remaining), 100):
+        response = supabase.table('transcripts').select('video_id').in_('video_id', remaining[i:i + 100]).execute()
+        found.update(record['video_id'] for record in response.data)
+    return found
+
+def insert_transcripts_bulk(rows):
+    """Satırları tek insert ile kaydeder ve önbelleğe ekler"""
+    response = supabase.table('transcripts').insert(rows).execute()
+    for record in response.data or []:
+        if record.get('video_id'):
+            transcript_cache.set(record['video_id'], record)
+    return response.data
+
+batch_manager = BatchManager(fetch_batch_row, existing_video_ids, insert_transcripts_bulk, extract_video_id)
+
+@app.route('/api/batch', methods=['POST'])
+def create_batch():
+    """URL listesi veya oynatma listesi/kanal için toplu transkript işi başlatır"""
+    data = request.json or {}
+    references = data.get('urls') or []
+    if isinstance(references, str):
+        references = [references]
+    for field in ('playlist', 'channel'):
+        if data.get(field):
+            references.append(data[field])
+
+    if not references:
+        return jsonify({'error': 'En az bir URL, oynatma listesi veya kanal gerekli'}), 400
+    if len(references) > BATCH_MAX_ITEMS:
+        return jsonify({'error': f'En fazla {BATCH_MAX_ITEMS} URL gönderilebilir'}), 400
+
+    try:
+        batch_id = batch_manager.submit(references, {'generate_summary': bool(data.get('generate_summary', False))})
+    except BatchLimitError:
+        response = jsonify({'error': 'Sunucu meşgul, çok fazla aktif toplu iş var. Lütfen daha sonra tekrar deneyin.'})
+        response.headers['Retry-After'] = '60'
+        return response, 503
 
     return jsonify({
         'success': True,
-        'video_id': video_id,
-        'transcript': transcript_text,
-        'summary': summary,
-        'language': transcript_data['language'],
-        'from_cache': False,
-        'saved': record_id is not None,
-        'record_id': record_id
-    })
+        'batch_id': batch_id,
+        'status_url': f'/api/batch/{batch_id}'
+    }), 202
+
+@app.route('/api/batch/<batch_id>', methods=['GET'])
+def get_batch_status(batch_id):
+    """Toplu işin ilerlemesini ve öğe bazında durumunu döndürür"""
+    batch = batch_manager.get(batch_id, include_items=request.args.get('items', 'true') != 'false')
+    if not batch:
+        return jsonify({'error': 'Toplu iş bulunamadı'}), 404
+    return jsonify({'success': True, **batch})
 
 @app.route('/api/debug/models', methods=['GET'])
 def list_models():
@@ -460,11 +814,46 @@ def list_models():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/debug/models/router', methods=['GET'])
+def model_router_status():
+    """Model yönlendiricisinin durumunu (sağlık, devre kesici, gecikme) döndürür"""
+    return jsonify({'success': True, **model_router.snapshot()})
+
+# Geçmiş listesi için sadece gereken sütunlar (transkript/özet metinleri çekilmez)
+HISTORY_COLUMNS = "id,video_id,url,created,language,has_summary"
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+
 @app.route('/api/history', methods=['GET'])
 def get_history():
-    """Geçmiş kayıtları getirir"""
+    """Geçmiş kayıtları getirir (created üzerinde imleç/keyset sayfalama)"""
     try:
-        response = supabase.table('transcripts').select("*").order('created', desc=True).limit(50).execute()
+        try:
+            limit = min(max(int(request.args.get('limit', HISTORY_PAGE_SIZE)), 1), HISTORY_MAX_PAGE_SIZE)
+            cursor = request.args.get('cursor')
+            after = decode_history_cursor(cursor) if cursor else None
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Geçersiz limit veya imleç'}), 400
+
+        query = supabase.table('transcripts').select(HISTORY_COLUMNS)
+
+        language = request.args.get('language')
+        if language:
+            query = query.eq('language', language)
+
+        has_summary = request.args.get('has_summary')
+        if has_summary in ('true', 'false'):
+            query = query.eq('has_summary', has_summary == 'true')
+
+        if after:
+            # (created, id) < (imleç) : aynı zamanlı kayıtlar id ile ayrılır
+            created, last_id = after
+            query = query.or_(f'created.lt."{created}",and(created.eq."{created}",id.lt.{last_id})')
+
+        # Sonraki sayfa olup olmadığını anlamak için bir fazla kayıt iste
+        response = query.order('created', desc=True).order('id', desc=True).limit(limit + 1).execute()
+        records = response.data[:limit]
+        next_cursor = encode_history_cursor(records[-1]) if len(response.data) > limit else None
         
         items = [{
             'id': record['id'],
@@ -472,54 +861,47 @@ def get_history():
             'url': record.get('url', ''),
             'created': record['created'], # Supabase returns ISO format usually
             'language': record.get('language', ''),
-            'has_summary': bool(record.get('summary'))
-        } for record in response.data]
+            'has_summary': bool(record.get('has_summary'))
+        } for record in records]
         
-        return jsonify({'success': True, 'items': items})
+        return jsonify({'success': True, 'items': items, 'next_cursor': next_cursor})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/export/<record_id>', methods=['GET'])
 def export_transcript(record_id):
-    """Transkripti text dosyası olarak indirir"""
+    """Transkripti txt/md/srt/vtt/json olarak diske yazmadan akış halinde indirir"""
     try:
+        format_type = request.args.get('format', 'txt')
+        if format_type not in EXPORT_FORMATS:
+            return jsonify({'error': f"Desteklenmeyen format: {format_type}"}), 400
+
         response = supabase.table('transcripts').select("*").eq('id', record_id).execute()
         if not response.data:
              return jsonify({'error': 'Kayıt bulunamadı'}), 404
              
         record = response.data[0]
-        format_type = request.args.get('format', 'txt')
-        
+
+        etag = export_etag(record, format_type)
+        if request.if_none_match.contains(etag):
+            not_modified = Response(status=304)
+            not_modified.set_etag(etag)
+            return not_modified
+
+        segments = None
+        if format_type in SUBTITLE_FORMATS:
+            segments = parse_segments(record.get('full_transcript'))
+            if not segments:
+                return jsonify({'error': 'Bu kayıtta zaman damgası yok, altyazı formatı oluşturulamaz'}), 400
+
+        content_type, extension = EXPORT_FORMATS[format_type]
         safe_name = record.get('video_id', '') or f"upload_{record['id']}"
 
-        if format_type == 'md':
-            filename = f"transcript_{safe_name}.md"
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write(f"# Transkript\n\n")
-                if record.get('url'):
-                    f.write(f"**URL:** {record['url']}\n\n")
-                f.write(f"**Tarih:** {record['created']}\n\n")
-                f.write("---\n\n")
-                f.write("## Metin\n\n")
-                f.write(record['full_transcript'].replace('\n', '\n\n'))
-                if record.get('summary'):
-                    f.write("\n\n---\n\n")
-                    f.write("## AI Özeti\n\n")
-                    f.write(record['summary'])
-        else:
-            filename = f"transcript_{safe_name}.txt"
-            with open(filename, 'w', encoding='utf-8') as f:
-                if record.get('url'):
-                    f.write(f"URL: {record['url']}\n")
-                f.write(f"Tarih: {record['created']}\n")
-                f.write("\n" + "="*50 + "\n\n")
-                f.write(record['full_transcript'])
-                if record.get('summary'):
-                    f.write("\n\n" + "="*50 + "\n")
-                    f.write("ÖZET:\n\n")
-                    f.write(record['summary'])
-        
-        return send_file(filename, as_attachment=True)
+        export_response = Response(iter_export(record, format_type, segments), content_type=content_type)
+        export_response.headers['Content-Disposition'] = f'attachment; filename="transcript_{safe_name}.{extension}"'
+        export_response.headers['Cache-Control'] = 'private, no-cache'
+        export_response.set_etag(etag)
+        return export_response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -0,0 +1,253 @@
+import os
+import re
+import time
+import uuid
+import threading
+import traceback
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from rate_limit import RateLimiter
+
+try:
+    import yt_dlp
+except ImportError:
+    yt_dlp = None
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_RATE_PER_MINUTE = float(os.getenv("BATCH_RATE_PER_MINUTE", "60"))  # Tüm toplu işlerin YouTube'a toplam istek hızı
+BATCH_INSERT_SIZE = int(os.getenv("BATCH_INSERT_SIZE", "50"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+BATCH_MAX_ACTIVE = int(os.getenv("BATCH_MAX_ACTIVE", "2"))
+BATCH_TTL = int(os.getenv("BATCH_TTL", str(24 * 3600)))
+
+PLAYLIST_ID_PATTERN = re.compile(r'[?&]list=([A-Za-z0-9_-]+)')
+CHANNEL_PATTERN = re.compile(r'youtube\.com\/(?:@[^\/?#]+|channel\/[^\/?#]+|c\/[^\/?#]+|user\/[^\/?#]+)')
+
+class BatchLimitError(Exception):
+    """Aynı anda çalışan toplu iş sayısı sınıra ulaştığında fırlatılır."""
+
+def extract_playlist_id(url):
+    """URL'deki oynatma listesi ID'sini döndürür"""
+    match = PLAYLIST_ID_PATTERN.search(url or '')
+    return match.group(1) if match else None
+
+def is_collection_url(url):
+    """URL bir oynatma listesi veya kanal mı?"""
+    if not url:
+        return False
+    if CHANNEL_PATTERN.search(url):
+        return True
+    # watch?v=...&list=... bağlantıları tek video olarak ele alınır
+    return 'youtube.com/playlist' in url and extract_playlist_id(url) is not None
+
+def expand_collection(url, max_items=BATCH_MAX_ITEMS):
+    """Oynatma listesi/kanal bağlantısını video ID listesine açar (yt-dlp, indirmeden)"""
+    if yt_dlp is None:
+        raise RuntimeError("Oynatma listesi/kanal desteği için yt-dlp kurulu olmalı (pip install yt-dlp)")
+
+    ydl_opts = {
+        'extract_flat': 'in_playlist',
+        'playlistend': max_items,
+        'quiet': True,
+        'no_warnings': True,
+        'skip_download': True,
+    }
+    video_ids = []
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+        entries = list(info.get('entries') or [])
+        while entries and len(video_ids) < max_items:
+            entry = entries.pop(0)
+            if not entry:
+                continue
+            if entry.get('entries'):
+                # Kanallar sekmelere (Videos, Shorts...) ayrılmış alt listeler döndürebilir
+                entries = list(entry['entries']) + entries
+            elif entry.get('_type') == 'playlist' and entry.get('url'):
+                sub = ydl.extract_info(entry['url'], download=False)
+                entries = list(sub.get('entries') or []) + entries
+            elif entry.get('id'):
+                video_ids.append(entry['id'])
+    return video_ids
+
+class BatchManager:
+    """
+    Toplu transkript alma işlerini yönetir: referansları video ID'lerine açar, önbellekte olanları atlar,
+    transkriptleri sınırlı paralellik ve hız sınırıyla çeker, sonuçları toplu insert ile yazar.
+    Her öğe YouTube'dan çekildiği için hız sınırı tektir ve aynı anda çalışan tüm toplu işler tarafından paylaşılır.
+
+    fetch_fn(video_id, url, options) -> (satır, hata): kaydedilecek satırı üretir (options, submit()'e verilen ayarlar)
+    existing_fn(video_ids) -> set: zaten kayıtlı olan video ID'leri
+    insert_fn(satırlar) -> kaydedilen kayıtlar
+    """
+
+    def __init__(self, fetch_fn, existing_fn, insert_fn, extract_video_id,
+                 concurrency: int = BATCH_CONCURRENCY, rate_per_minute: float = BATCH_RATE_PER_MINUTE,
+                 insert_size: int = BATCH_INSERT_SIZE, max_active: int = BATCH_MAX_ACTIVE):
+        self.fetch_fn = fetch_fn
+        self.existing_fn = existing_fn
+        self.insert_fn = insert_fn
+        self.extract_video_id = extract_video_id
+        self.concurrency = concurrency
+        self.rate_per_minute = rate_per_minute
+        self.insert_size = insert_size
+        self.max_active = max_active
+        self.limiter = RateLimiter(rate_per_minute)
+        self._batches = {}
+        self._lock = threading.Lock()
+
+    def submit(self, references, options=None) -> str:
+        """Toplu işi başlatır ve batch_id döndürür"""
+        self._purge_expired()
+        with self._lock:
+            active = sum(1 for b in self._batches.values() if b['status'] in ('expanding', 'running'))
+            if active >= self.max_active:
+                raise BatchLimitError("Çok fazla aktif toplu iş var")
+
+            batch_id = uuid.uuid4().hex
+            self._batches[batch_id] = {
+                'id': batch_id,
+                'status': 'expanding',
+                'created': time.time(),
+                'finished': None,
+                'error': None,
+                'items': []
+            }
+
+        thread = threading.Thread(target=self._run, args=(batch_id, list(references), options or {}),
+                                  name=f"batch-{batch_id[:8]}", daemon=True)
+        thread.start()
+        return batch_id
+
+    def get(self, batch_id, include_items=True):
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if not batch:
+                return None
+            items = [dict(item) for item in batch['items']]
+            result = {key: value for key, value in batch.items() if key != 'items'}
+
+        counts = {}
+        for item in items:
+            counts[item['status']] = counts.get(item['status'], 0) + 1
+        done = sum(counts.get(s, 0) for s in ('done', 'cached', 'failed'))
+
+        for field in ('created', 'finished'):
+            if result[field]:
+                result[field] = datetime.fromtimestamp(result[field]).isoformat()
+        result['total'] = len(items)
+        result['counts'] = counts
+        result['progress'] = round(done / len(items), 3) if items else 0.0
+        if include_items:
+            result['items'] = items
+        return result
+
+    def _set_item(self, batch_id, index, **fields):
+        with self._lock:
+            self._batches[batch_id]['items'][index].update(fields)
+
+    def _set_batch(self, batch_id, **fields):
+        with self._lock:
+            self._batches[batch_id].update(fields)
+
+    def _expand(self, references):
+        video_ids = []
+        seen = set()
+        for ref in references:
+            ref = (ref or '').strip()
+            if not ref:
+                continue
+            if is_collection_url(ref):
+                ids = expand_collection(ref, BATCH_MAX_ITEMS)
+            else:
+                video_id = self.extract_video_id(ref)
+                if not video_id and re.fullmatch(r'[A-Za-z0-9_-]{11}', ref):
+                    video_id = ref  # Çıplak video ID
+                ids = [video_id] if video_id else []
+            for video_id in ids:
+                if video_id not in seen:
+                    seen.add(video_id)
+                    video_ids.append(video_id)
+                if len(video_ids) >= BATCH_MAX_ITEMS:
+                    return video_ids
+        return video_ids
+
+    def _run(self, batch_id, references, options):
+        try:
+            video_ids = self._expand(references)
+            items = [{
+                'video_id': video_id,
+                'url': f"https://www.youtube.com/watch?v={video_id}",
+                'status': 'pending',
+                'record_id': None,
+                'error': None
+            } for video_id in video_ids]
+            self._set_batch(batch_id, items=items, status='running')
+
+            # Kayıtlı olanları tek sorguda bul ve atla
+            existing = self.existing_fn(video_ids) if video_ids else set()
+            pending = []
+            for index, item in enumerate(items):
+                if item['video_id'] in existing:
+                    self._set_item(batch_id, index, status='cached')
+                else:
+                    pending.append(index)
+
+            buffer = []
+            buffer_lock = threading.Lock()
+
+            def flush():
+                with buffer_lock:
+                    rows = list(buffer)
+                    buffer.clear()
+                if rows:
+                    self._insert_rows(batch_id, rows)
+
+            def work(index):
+                item = items[index]
+                self._set_item(batch_id, index, status='running')
+                self.limiter.acquire()
+                try:
+                    row, error = self.fetch_fn(item['video_id'], item['url'], options)
+                except Exception as e:
+                    row, error = None, str(e)
+                if error:
+                    self._set_item(batch_id, index, status='failed', error=error)
+                    return
+                with buffer_lock:
+                    buffer.append((index, row))
+                    full = len(buffer) >= self.insert_size
+                if full:
+                    flush()
+
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                list(executor.map(work, pending))
+            flush()
+
+            self._set_batch(batch_id, status='done', finished=time.time())
+        except Exception as e:
+            traceback.print_exc()
+            self._set_batch(batch_id, status='failed', error=str(e), finished=time.time())
+
+    def _insert_rows(self, batch_id, rows):
+        try:
+            records = self.insert_fn([row for _, row in rows]) or []
+        except Exception as e:
+            for index, _ in rows:
+                self._set_item(batch_id, index, status='failed', error=f"Veritabanı hatası: {str(e)}")
+            return
+
+        record_ids = {record.get('video_id'): record.get('id') for record in records}
+        for index, row in rows:
+            self._set_item(batch_id, index, status='done', record_id=record_ids.get(row.get('video_id')))
+
+    def _purge_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [
+                batch_id for batch_id, batch in self._batches.items()
+                if batch['finished'] and now - batch['finished'] > BATCH_TTL
+            ]
+            for batch_id in expired:
+                del self._batches[batch_id]
@@ -0,0 +1,147 @@
+import os
+import time
+import socket
+import threading
+
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "1800"))  # MCP destekli isteklerin en uzun bekleme süresi (sn)
+DISCONNECT_POLL_INTERVAL = float(os.getenv("DISCONNECT_POLL_INTERVAL", "1"))
+
+def client_socket(environ):
+    """WSGI sunucusunun istemci soketini döndürür (Werkzeug geliştirme sunucusu ve gunicorn), yoksa None."""
+    if not environ:
+        return None
+    return environ.get('werkzeug.socket') or environ.get('gunicorn.socket')
+
+def is_disconnected(sock) -> bool:
+    """
+    Soketi okumadan (MSG_PEEK) yoklar. İstek gövdesi zaten okunduğu için karşı taraf bağlantıyı
+    kapattıysa recv boş döner. Yoklanamayan soketler (ör. TLS) bağlı kabul edilir.
+    """
+    flags = socket.MSG_PEEK | getattr(socket, 'MSG_DONTWAIT', 0)
+    try:
+        return sock.recv(1, flags) == b''
+    except (BlockingIOError, InterruptedError, ValueError):
+        return False
+    except OSError:
+        return True
+
+class RequestScope:
+    """
+    Bir isteğin son süresini ve iptal sinyalini taşır.
+    environ verilirse arka planda istemci soketi izlenir ve bağlantı koparsa istek iptal edilir;
+    progress_id ile kaydedilen kapsamlar /api/cancel/<progress_id> ile de iptal edilebilir.
+    """
+
+    def __init__(self, environ=None, progress_id=None, registry=None, timeout: float = REQUEST_DEADLINE):
+        self.deadline = time.time() + timeout if timeout else None
+        self.cancel_event = threading.Event()
+        self.progress_id = progress_id
+        self.registry = registry
+        self._sock = client_socket(environ)
+        self._stop = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        if self.registry and self.progress_id:
+            self.registry.register(self.progress_id, self)
+        if self._sock is not None and getattr(socket, 'MSG_DONTWAIT', None):
+            threading.Thread(target=self._watch, name="disconnect-watch", daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self.registry and self.progress_id:
+            self.registry.unregister(self.progress_id, self)
+        return False
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def on_cancel(self, callback):
+        """İptal anında çağrılacak fonksiyonu ekler (zaten iptal edildiyse hemen çağırır)."""
+        with self._lock:
+            if not self.cancel_event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self, reason: str = "İstek iptal edildi"):
+        with self._lock:
+            if self.cancel_event.is_set():
+                return
+            self.cancel_event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        print(f"{reason} (progress_id={self.progress_id})")
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"İptal geri çağrısı hatası: {e}")
+
+    def _watch(self):
+        while not self._stop.wait(DISCONNECT_POLL_INTERVAL):
+            if is_disconnected(self._sock):
+                self.cancel("İstemci bağlantısı koptu")
+                return
+
+class CancelRegistry:
+    """progress_id -> çalışan RequestScope eşlemesi; tarayıcı sekme kapanırken sendBeacon ile iptal gönderir."""
+
+    def __init__(self):
+        self._scopes = {}
+        self._lock = threading.Lock()
+
+    def register(self, progress_id, scope):
+        with self._lock:
+            self._scopes[progress_id] = scope
+
+    def unregister(self, progress_id, scope):
+        with self._lock:
+            if self._scopes.get(progress_id) is scope:
+                del self._scopes[progress_id]
+
+    def cancel(self, progress_id) -> bool:
+        with self._lock:
+            scope = self._scopes.get(progress_id)
+        if scope is None:
+            return False
+        scope.cancel("İstek tarayıcıdan iptal edildi")
+        return True
+
+class SharedCancel:
+    """
+    Tek bir işi paylaşan (single-flight) istekler için ortak iptal sinyali.
+    İş ancak bekleyen isteklerin hepsi iptal edildiğinde durdurulur.
+    """
+
+    def __init__(self):
+        self._groups = {}  # key -> {'event': Event, 'members': set}
+        self._lock = threading.Lock()
+
+    def join(self, key, scope: RequestScope) -> threading.Event:
+        with self._lock:
+            group = self._groups.setdefault(key, {'event': threading.Event(), 'members': set()})
+            group['members'].add(scope)
+        scope.on_cancel(lambda: self._abandon(key, scope))
+        return group['event']
+
+    def leave(self, key, scope: RequestScope):
+        with self._lock:
+            group = self._groups.get(key)
+            if group:
+                group['members'].discard(scope)
+                if not group['members']:
+                    del self._groups[key]
+
+    def _abandon(self, key, scope):
+        with self._lock:
+            group = self._groups.get(key)
+            if not group:
+                return
+            group['members'].discard(scope)
+            if not group['members']:
+                # Yeni gelen istekler iptal edilmiş sinyali devralmasın
+                group['event'].set()
+                del self._groups[key]
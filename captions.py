@@ -0,0 +1,75 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+# Tercih edilen altyazı dilleri (öncelik sırasıyla) ve dil bulunamazsa çevrilecek hedef dil
+TRANSCRIPT_LANGUAGES = [
+    code.strip() for code in os.getenv("TRANSCRIPT_LANGUAGES", "tr,en").split(",") if code.strip()
+]
+TRANSCRIPT_TRANSLATE_TO = os.getenv("TRANSCRIPT_TRANSLATE_TO", TRANSCRIPT_LANGUAGES[0] if TRANSCRIPT_LANGUAGES else "")
+CAPTION_TRACK_TTL = int(os.getenv("CAPTION_TRACK_TTL", "3600"))  # Altyazı URL'leri bir süre sonra geçersizleşir
+CAPTION_TRACK_CACHE_SIZE = int(os.getenv("CAPTION_TRACK_CACHE_SIZE", "1000"))
+
+def select_caption_track(transcript_list, languages=None, translate_to=None):
+    """
+    Listelenmiş altyazılar arasından en uygun olanı seçer, ek bir ağ isteği yapmaz.
+    Sıra: tercih edilen diller (önce elle hazırlanmış, sonra otomatik),
+    ardından translate_to diline çevrilebilen bir iz, en son mevcut herhangi bir iz.
+    (transcript, dil_kodu) döndürür; hiç iz yoksa (None, None).
+    """
+    languages = TRANSCRIPT_LANGUAGES if languages is None else languages
+    translate_to = TRANSCRIPT_TRANSLATE_TO if translate_to is None else translate_to
+
+    tracks = list(transcript_list)
+    if not tracks:
+        return None, None
+
+    # Elle hazırlanmış altyazılar otomatik olanlardan önce gelsin
+    ordered = sorted(tracks, key=lambda t: t.is_generated)
+
+    for code in languages:
+        for track in ordered:
+            if track.language_code == code:
+                return track, code
+
+    if translate_to:
+        for track in ordered:
+            if track.is_translatable and any(
+                lang.language_code == translate_to for lang in track.translation_languages
+            ):
+                return track.translate(translate_to), translate_to
+
+    return ordered[0], ordered[0].language_code
+
+class CaptionTrackCache:
+    """Video başına seçilen altyazı izini kısa süreliğine saklar, böylece tekrar listeleme yapılmaz."""
+
+    def __init__(self, ttl: int = CAPTION_TRACK_TTL, max_entries: int = CAPTION_TRACK_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._tracks = OrderedDict()  # video_id -> (expires, transcript, language_code)
+        self._lock = threading.Lock()
+
+    def get(self, video_id: str):
+        with self._lock:
+            entry = self._tracks.get(video_id)
+            if not entry:
+                return None
+            expires, track, language_code = entry
+            if expires < time.time():
+                del self._tracks[video_id]
+                return None
+            self._tracks.move_to_end(video_id)
+            return track, language_code
+
+    def set(self, video_id: str, track, language_code: str):
+        with self._lock:
+            self._tracks[video_id] = (time.time() + self.ttl, track, language_code)
+            self._tracks.move_to_end(video_id)
+            while len(self._tracks) > self.max_entries:
+                self._tracks.popitem(last=False)
+
+    def invalidate(self, video_id: str):
+        with self._lock:
+            self._tracks.pop(video_id, None)
@@ -0,0 +1,111 @@
+import re
+import json
+import hashlib
+
+# format -> (content type, dosya uzantısı)
+EXPORT_FORMATS = {
+    'txt': ('text/plain; charset=utf-8', 'txt'),
+    'md': ('text/markdown; charset=utf-8', 'md'),
+    'srt': ('application/x-subrip; charset=utf-8', 'srt'),
+    'vtt': ('text/vtt; charset=utf-8', 'vtt'),
+    'json': ('application/json; charset=utf-8', 'json'),
+}
+SUBTITLE_FORMATS = ('srt', 'vtt')
+
+LAST_CUE_SECONDS = 4  # Son satırın bitiş zamanı bilinmediği için varsayılan süre
+
+TIMESTAMP_LINE = re.compile(r'^\[(?:(\d+):)?(\d{1,2}):(\d{2})\]\s?(.*)$')
+
+def parse_segments(full_transcript: str):
+    """
+    get_transcript'in ürettiği '[mm:ss] metin' / '[hh:mm:ss] metin' satırlarını
+    {'start', 'end', 'text'} sözlüklerine çevirir. Zaman damgasız satırlar önceki satıra eklenir.
+    """
+    segments = []
+    for line in (full_transcript or '').split('\n'):
+        match = TIMESTAMP_LINE.match(line.strip())
+        if match:
+            hours, minutes, seconds, text = match.groups()
+            start = int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds)
+            segments.append({'start': start, 'end': None, 'text': text.strip()})
+        elif segments and line.strip():
+            segments[-1]['text'] = f"{segments[-1]['text']} {line.strip()}".strip()
+
+    for current, following in zip(segments, segments[1:]):
+        current['end'] = max(following['start'], current['start'] + 1)
+    if segments:
+        segments[-1]['end'] = segments[-1]['start'] + LAST_CUE_SECONDS
+    return segments
+
+def format_cue_time(seconds: float, separator: str = ',') -> str:
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600 * 1000)
+    minutes, millis = divmod(millis, 60 * 1000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+def export_etag(record: dict, format_type: str) -> str:
+    """Kaydın içeriğine ve formata bağlı ETag değeri"""
+    digest = hashlib.sha256()
+    for part in (str(record.get('id')), format_type, record.get('created') or '',
+                 record.get('url') or '', record.get('full_transcript') or '', record.get('summary') or ''):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()[:32]
+
+def iter_export(record: dict, format_type: str, segments=None):
+    """Kaydı istenen formatta parça parça üretir (dosyaya yazmadan doğrudan yanıta akıtılır)"""
+    if format_type == 'md':
+        yield "# Transkript\n\n"
+        if record.get('url'):
+            yield f"**URL:** {record['url']}\n\n"
+        yield f"**Tarih:** {record['created']}\n\n"
+        yield "---\n\n"
+        yield "## Metin\n\n"
+        for i, line in enumerate((record.get('full_transcript') or '').split('\n')):
+            yield ("\n\n" if i else "") + line
+        if record.get('summary'):
+            yield "\n\n---\n\n"
+            yield "## AI Özeti\n\n"
+            yield record['summary']
+
+    elif format_type in SUBTITLE_FORMATS:
+        segments = parse_segments(record.get('full_transcript')) if segments is None else segments
+        separator = '.' if format_type == 'vtt' else ','
+        if format_type == 'vtt':
+            yield "WEBVTT\n\n"
+        for i, segment in enumerate(segments, start=1):
+            if format_type == 'srt':
+                yield f"{i}\n"
+            yield (f"{format_cue_time(segment['start'], separator)} --> "
+                   f"{format_cue_time(segment['end'], separator)}\n{segment['text']}\n\n")
+
+    elif format_type == 'json':
+        segments = parse_segments(record.get('full_transcript')) if segments is None else segments
+        header = {
+            'id': record.get('id'),
+            'video_id': record.get('video_id') or None,
+            'url': record.get('url') or None,
+            'language': record.get('language') or None,
+            'created': record.get('created'),
+            'summary': record.get('summary') or None,
+        }
+        # Segment listesini tek seferde serileştirmek yerine eleman eleman yaz
+        yield json.dumps(header, ensure_ascii=False)[:-1] + ', "segments": ['
+        for i, segment in enumerate(segments):
+            yield ("," if i else "") + json.dumps(segment, ensure_ascii=False)
+        if not segments and record.get('full_transcript'):
+            # Zaman damgasız (ör. Whisper) kayıtlar tek segment olarak döner
+            yield json.dumps({'start': None, 'end': None, 'text': record['full_transcript']}, ensure_ascii=False)
+        yield "]}"
+
+    else:
+        if record.get('url'):
+            yield f"URL: {record['url']}\n"
+        yield f"Tarih: {record['created']}\n"
+        yield "\n" + "=" * 50 + "\n\n"
+        yield record.get('full_transcript') or ''
+        if record.get('summary'):
+            yield "\n\n" + "=" * 50 + "\n"
+            yield "ÖZET:\n\n"
+            yield record['summary']
@@ -0,0 +1,247 @@
+import os
+import time
+import threading
+
+ROUTER_FAILURE_THRESHOLD = int(os.getenv("GEMINI_FAILURE_THRESHOLD", "3"))
+ROUTER_OPEN_SECONDS = float(os.getenv("GEMINI_OPEN_SECONDS", "30"))
+ROUTER_MAX_OPEN_SECONDS = float(os.getenv("GEMINI_MAX_OPEN_SECONDS", "600"))
+ROUTER_NOT_FOUND_SECONDS = float(os.getenv("GEMINI_NOT_FOUND_SECONDS", "3600"))
+ROUTER_REFRESH_INTERVAL = float(os.getenv("GEMINI_REFRESH_INTERVAL", "600"))
+ROUTER_EWMA_ALPHA = 0.3
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+def is_not_found_error(error) -> bool:
+    error_str = str(error)
+    return "404" in error_str or "NOT_FOUND" in error_str or "not found" in error_str
+
+class ModelState:
+    def __init__(self, name: str, priority: int):
+        self.name = name
+        self.priority = priority
+        self.state = CLOSED
+        self.health = 1.0  # EWMA of success (1) / failure (0)
+        self.latency_ewma = None
+        self.consecutive_failures = 0
+        self.open_seconds = ROUTER_OPEN_SECONDS
+        self.open_until = 0.0
+        self.probe_in_flight = False
+        self.listed = None  # None: unknown, True/False: seen in client.models.list()
+        self.calls = 0
+        self.successes = 0
+        self.last_error = None
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'priority': self.priority,
+            'state': self.state,
+            'health': round(self.health, 3),
+            'latency_ewma_ms': round(self.latency_ewma * 1000) if self.latency_ewma is not None else None,
+            'consecutive_failures': self.consecutive_failures,
+            'open_for_seconds': max(0, round(self.open_until - time.time())) if self.state == OPEN else 0,
+            'listed': self.listed,
+            'calls': self.calls,
+            'successes': self.successes,
+            'last_error': self.last_error
+        }
+
+class ModelRouter:
+    """
+    Routes Gemini calls to the best healthy model instead of walking the fallback list every time.
+    Each model has a circuit breaker (closed -> open -> half_open probe), a health score and a
+    latency EWMA. Models that return 404 are parked for a long time; the model list is refreshed
+    from client.models.list() in the background.
+    """
+
+    def __init__(self, client, models, failure_threshold: int = ROUTER_FAILURE_THRESHOLD,
+                 refresh_interval: float = ROUTER_REFRESH_INTERVAL):
+        self.client = client
+        self.failure_threshold = failure_threshold
+        self.refresh_interval = refresh_interval
+        self._models = {name: ModelState(name, i) for i, name in enumerate(models)}
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        self._served = threading.local()
+        self.last_refresh = None
+        self.last_refresh_error = None
+
+    def generate_content(self, contents, config=None):
+        """Calls generate_content on the best available model, failing over to the next ones."""
+        self.start_background_refresh()
+        last_error = None
+        candidates = self._candidates()
+        tried = set()
+
+        try:
+            for model_name in candidates:
+                tried.add(model_name)
+                start = time.time()
+                try:
+                    print(f"Trying Gemini model: {model_name}")
+                    response = self.client.models.generate_content(
+                        model=model_name,
+                        contents=contents,
+                        config=config
+                    )
+                    self.record_success(model_name, time.time() - start)
+                    self._served.model = model_name
+                    print(f"Success with model: {model_name}")
+                    return response
+                except Exception as e:
+                    print(f"Failed with model {model_name}: {e}")
+                    self.record_failure(model_name, e)
+                    last_error = e
+        finally:
+            self._release_probes([name for name in candidates if name not in tried])
+
+        if last_error:
+            print(f"All models failed. Last error: {last_error}")
+            raise last_error
+        raise Exception("No models available or unknown error")
+
+    def best_model(self):
+        """Name of the model the next call would try first."""
+        with self._lock:
+            ordered = self._ordered(time.time(), reserve=False)
+        return ordered[0] if ordered else None
+
+    def last_model(self):
+        """Name of the model that served the last successful call made from this thread."""
+        return getattr(self._served, 'model', None)
+
+    def _candidates(self):
+        with self._lock:
+            return self._ordered(time.time(), reserve=True)
+
+    def _ordered(self, now, reserve):
+        # Lock must be held
+        healthy = []
+        probes = []
+        for model in self._models.values():
+            if model.state == OPEN and now >= model.open_until:
+                model.state = HALF_OPEN
+                model.probe_in_flight = False
+            if model.state == CLOSED:
+                healthy.append(model)
+            elif model.state == HALF_OPEN and not model.probe_in_flight:
+                probes.append(model)
+
+        healthy.sort(key=lambda m: (
+            -round(m.health, 1),
+            m.latency_ewma if m.latency_ewma is not None else float('inf'),
+            m.priority
+        ))
+        probes.sort(key=lambda m: m.priority)
+
+        if reserve:
+            for model in probes:
+                model.probe_in_flight = True
+
+        ordered = [m.name for m in healthy + probes]
+        if not ordered and self._models:
+            # Every breaker is open: try the one that would reopen first rather than failing outright
+            ordered = [min(self._models.values(), key=lambda m: m.open_until).name]
+        return ordered
+
+    def _release_probes(self, model_names):
+        # Probes reserved for this call but never attempted go back to the pool
+        with self._lock:
+            for name in model_names:
+                model = self._models.get(name)
+                if model and model.state == HALF_OPEN:
+                    model.probe_in_flight = False
+
+    def record_success(self, model_name: str, latency: float):
+        with self._lock:
+            model = self._models.get(model_name)
+            if not model:
+                return
+            model.calls += 1
+            model.successes += 1
+            model.health = (1 - ROUTER_EWMA_ALPHA) * model.health + ROUTER_EWMA_ALPHA
+            model.latency_ewma = latency if model.latency_ewma is None else (
+                (1 - ROUTER_EWMA_ALPHA) * model.latency_ewma + ROUTER_EWMA_ALPHA * latency
+            )
+            model.consecutive_failures = 0
+            model.open_seconds = ROUTER_OPEN_SECONDS
+            model.state = CLOSED
+            model.probe_in_flight = False
+
+    def record_failure(self, model_name: str, error):
+        with self._lock:
+            model = self._models.get(model_name)
+            if not model:
+                return
+            model.calls += 1
+            model.health = (1 - ROUTER_EWMA_ALPHA) * model.health
+            model.consecutive_failures += 1
+            model.last_error = str(error)[:300]
+            model.probe_in_flight = False
+
+            if is_not_found_error(error):
+                # Retired or unknown model: no point retrying for a long while
+                self._open(model, ROUTER_NOT_FOUND_SECONDS)
+            elif model.state == HALF_OPEN:
+                # Failed probe: back off exponentially
+                model.open_seconds = min(model.open_seconds * 2, ROUTER_MAX_OPEN_SECONDS)
+                self._open(model, model.open_seconds)
+            elif model.consecutive_failures >= self.failure_threshold:
+                self._open(model, model.open_seconds)
+
+    def _open(self, model, seconds):
+        model.state = OPEN
+        model.open_until = time.time() + seconds
+
+    def refresh_models(self):
+        """Marks configured models as available/unavailable according to client.models.list()."""
+        try:
+            listed = set()
+            for model in self.client.models.list():
+                actions = getattr(model, 'supported_actions', None) or getattr(model, 'supported_generation_methods', None)
+                if actions and 'generateContent' not in actions:
+                    continue
+                listed.add(model.name.split('/')[-1])
+        except Exception as e:
+            self.last_refresh_error = str(e)
+            print(f"Gemini model list refresh failed: {e}")
+            return
+
+        with self._lock:
+            for model in self._models.values():
+                model.listed = model.name in listed
+                if not model.listed:
+                    self._open(model, max(self.refresh_interval, ROUTER_OPEN_SECONDS))
+                elif model.state == OPEN and (model.last_error is None or is_not_found_error(model.last_error)):
+                    # Listed again after being parked for a 404 or a previous listing: allow a probe
+                    model.open_until = 0
+            self.last_refresh = time.time()
+            self.last_refresh_error = None
+
+    def start_background_refresh(self):
+        if self._refresh_thread or not self.refresh_interval:
+            return
+        with self._lock:
+            if self._refresh_thread:
+                return
+            self._refresh_thread = threading.Thread(target=self._refresh_loop, name="gemini-model-refresh", daemon=True)
+            self._refresh_thread.start()
+
+    def _refresh_loop(self):
+        while True:
+            self.refresh_models()
+            time.sleep(self.refresh_interval)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            models = [m.to_dict() for m in sorted(self._models.values(), key=lambda m: m.priority)]
+            best = self._ordered(time.time(), reserve=False)
+        return {
+            'best_model': best[0] if best else None,
+            'order': best,
+            'last_refresh': self.last_refresh,
+            'last_refresh_error': self.last_refresh_error,
+            'models': models
+        }
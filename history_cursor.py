@@ -0,0 +1,24 @@
+import json
+import base64
+from datetime import datetime
+
+# Geçmiş listesi için opak sayfalama imleci: son kaydın (created, id) çifti base64 JSON olarak taşınır.
+# İmleç istemciden geldiği için çözülürken doğrulanır; değerleri PostgREST filtresine yazılır.
+
+def encode_history_cursor(record):
+    """Son kaydın (created, id) değerlerinden opak sayfalama imleci üretir"""
+    raw = json.dumps([record['created'], record['id']]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_history_cursor(cursor):
+    """
+    İmleci (created, id) olarak çözer. created PostgREST filtresine yazıldığı için tarih olarak
+    doğrulanıp yeniden biçimlendirilir; geçersiz imleç ValueError fırlatır.
+    """
+    try:
+        created, record_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except TypeError:
+        raise ValueError("Geçersiz imleç")
+    if not isinstance(created, str) or isinstance(record_id, bool) or not isinstance(record_id, int):
+        raise ValueError("Geçersiz imleç")
+    return datetime.fromisoformat(created).isoformat(), record_id
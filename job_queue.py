@@ -0,0 +1,127 @@
+import os
+import queue
+import threading
+import time
+import uuid
+import traceback
+from datetime import datetime
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+JOB_TTL = int(os.getenv("JOB_TTL", "3600"))  # Biten işler bu kadar saniye saklanır
+
+class QueueFullError(Exception):
+    """İş kuyruğu dolduğunda fırlatılır."""
+
+class JobManager:
+    """
+    Sınırlı kuyruklu basit bir arka plan iş havuzu.
+    İşler (payload, status_code) döndüren fonksiyonlardır; sonuç /api/jobs/<id> ile sorgulanır.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, queue_size: int = JOB_QUEUE_SIZE, ttl: int = JOB_TTL):
+        self.workers = workers
+        self.ttl = ttl
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def _ensure_started(self):
+        # Thread'leri ilk işte başlatıyoruz, böylece import sırasında (ve Flask reloader'da) boşa thread açılmaz
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def submit(self, fn, *args, **kwargs) -> str:
+        """İşi kuyruğa ekler ve job_id döndürür. Kuyruk doluysa QueueFullError fırlatır."""
+        self._ensure_started()
+        self._purge_expired()
+
+        job_id = uuid.uuid4().hex
+        job = {
+            'id': job_id,
+            'status': 'queued',
+            'created': time.time(),
+            'started': None,
+            'finished': None,
+            'status_code': None,
+            'result': None,
+            'error': None
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+
+        try:
+            self._queue.put_nowait((job_id, fn, args, kwargs))
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job_id, None)
+            raise QueueFullError("İş kuyruğu dolu")
+
+        return job_id
+
+    def get(self, job_id: str):
+        """İşin durumunu JSON'a uygun sözlük olarak döndürür, yoksa None."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job:
+                return None
+            job = dict(job)
+
+        for field in ('created', 'started', 'finished'):
+            if job[field]:
+                job[field] = datetime.fromtimestamp(job[field]).isoformat()
+        return job
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+        return {
+            'workers': self.workers,
+            'queue_size': self._queue.qsize(),
+            'queue_capacity': self._queue.maxsize,
+            'jobs': counts
+        }
+
+    def _set(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                job.update(fields)
+
+    def _worker(self):
+        while True:
+            job_id, fn, args, kwargs = self._queue.get()
+            self._set(job_id, status='running', started=time.time())
+            try:
+                payload, status_code = fn(*args, **kwargs)
+                self._set(
+                    job_id,
+                    status='done' if status_code < 400 else 'failed',
+                    status_code=status_code,
+                    result=payload,
+                    error=payload.get('error') if isinstance(payload, dict) else None,
+                    finished=time.time()
+                )
+            except Exception as e:
+                traceback.print_exc()
+                self._set(job_id, status='failed', status_code=500, error=str(e), finished=time.time())
+            finally:
+                self._queue.task_done()
+
+    def _purge_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job['finished'] and now - job['finished'] > self.ttl
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
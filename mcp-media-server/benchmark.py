@@ -0,0 +1,76 @@
+"""
+Transkripsiyon backend'lerini aynı ses dosyası üzerinde karşılaştırır.
+
+Kullanım:
+    export PYTHONPATH=$PYTHONPATH:$(pwd)/src
+    python benchmark.py ornek.mp3 --model base --backends whisper,faster-whisper --runs 3
+
+Her backend için model yükleme süresi, ortalama transkripsiyon süresi ve gerçek zaman faktörü
+(RTF = işlem süresi / ses süresi, 1'in altı gerçek zamandan hızlı) raporlanır. Metinlerin ilk
+backend'in çıktısına benzerliği de verilir.
+"""
+import argparse
+import difflib
+import time
+
+import whisper
+
+from transcribe import BACKENDS, estimate_model_bytes
+
+def audio_duration(file_path: str) -> float:
+    return len(whisper.load_audio(file_path)) / whisper.audio.SAMPLE_RATE
+
+def similarity(a: str, b: str) -> float:
+    return difflib.SequenceMatcher(None, a.lower().split(), b.lower().split()).ratio()
+
+def run(file_path: str, model_size: str, backend_names, runs: int):
+    duration = audio_duration(file_path)
+    print(f"Ses: {file_path} ({duration:.1f} sn), model: {model_size}, tekrar: {runs}\n")
+
+    results = []
+    for name in backend_names:
+        backend = BACKENDS.get(name)
+        if backend is None or not backend.available():
+            print(f"{name}: kullanılamıyor, atlandı.")
+            continue
+
+        started = time.time()
+        model = backend.load(model_size)
+        load_seconds = time.time() - started
+
+        timings = []
+        text = ""
+        for _ in range(runs):
+            started = time.time()
+            text = backend.transcribe(model, file_path)
+            timings.append(time.time() - started)
+
+        seconds = sum(timings) / len(timings)
+        size = backend.model_bytes(model, model_size) or estimate_model_bytes(model_size, backend.bytes_per_param)
+        results.append({
+            "backend": name,
+            "load": load_seconds,
+            "seconds": seconds,
+            "rtf": seconds / duration if duration else 0.0,
+            "mb": size / (1024 * 1024),
+            "text": text,
+        })
+        del model
+
+    if not results:
+        return
+
+    reference = results[0]["text"]
+    print(f"{'Backend':<16}{'Yükleme (sn)':>14}{'Süre (sn)':>12}{'RTF':>8}{'Model (MB)':>12}{'Benzerlik':>11}")
+    for result in results:
+        print(f"{result['backend']:<16}{result['load']:>14.1f}{result['seconds']:>12.1f}{result['rtf']:>8.3f}"
+              f"{result['mb']:>12.0f}{similarity(reference, result['text']):>11.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transkripsiyon backend karşılaştırması (RTF)")
+    parser.add_argument("audio", help="Ses dosyası")
+    parser.add_argument("--model", default="base", help="Model boyutu")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="Virgülle ayrılmış backend listesi")
+    parser.add_argument("--runs", type=int, default=1, help="Her backend için tekrar sayısı")
+    args = parser.parse_args()
+    run(args.audio, args.model, [name.strip() for name in args.backends.split(",") if name.strip()], args.runs)
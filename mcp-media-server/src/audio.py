@@ -1,6 +1,34 @@
 import os
+import re
+import wave
+import tempfile
 import subprocess
 import glob
+import numpy as np
+
+SEGMENTER = os.getenv("SEGMENTER", "silence")  # silence (duraklamalardan kes) veya fixed (sabit -c copy kesim)
+SILENCE_NOISE_DB = float(os.getenv("SILENCE_NOISE_DB", "-35"))  # Bu seviyenin altı sessizlik sayılır
+SILENCE_MIN_SECONDS = float(os.getenv("SILENCE_MIN_SECONDS", "0.4"))  # Kesim noktası olabilecek en kısa duraklama
+SILENCE_DROP_SECONDS = float(os.getenv("SILENCE_DROP_SECONDS", "2"))  # Bundan uzun sessizlikler modele gönderilmez
+SEGMENT_WINDOW = float(os.getenv("SEGMENT_WINDOW", "30"))  # Hedef uzunluğun ± bu kadar saniye yakınında duraklama aranır
+SILENCE_PADDING = 0.2  # Atlanan sessizliklerin kenarlarında bırakılan pay (kelime sonları kesilmesin)
+MIN_SEGMENT_SECONDS = 0.5
+
+# Akış halinde bölme: ses 16 kHz mono 16 bit PCM olarak okunur, enerji 20 ms'lik karelerle ölçülür
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.02
+FRAME_BYTES = int(SAMPLE_RATE * FRAME_SECONDS) * 2
+READ_BLOCK_BYTES = 50 * FRAME_BYTES  # 1 saniye
+
+SILENCE_START = re.compile(r"silence_start:\s*(-?[\d.]+)")
+SILENCE_END = re.compile(r"silence_end:\s*(-?[\d.]+)")
+
+class StreamError(RuntimeError):
+    """FFmpeg akışı sıfırdan farklı kodla bitti. segments, hatadan önce üretilmiş parça sayısıdır."""
+
+    def __init__(self, message: str, segments: int = 0):
+        super().__init__(message)
+        self.segments = segments
 
 def get_media_duration(file_path: str) -> float:
     """FFprobe kullanarak medya süresini (saniye) döndürür."""
@@ -18,7 +46,13 @@ def get_media_duration(file_path: str) -> float:
         print(f"Süre alma hatası: {e}")
         return 0.0
 
-def split_media(file_path: str, chunk_length: int = 180) -> list[str]:
+def run_ffmpeg(cmd: list[str], token=None):
+    """FFmpeg komutunu çalıştırır; token verilirse iptal veya son süre aşımında süreç öldürülür."""
+    if token is not None:
+        return token.run_process(cmd)
+    return subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+def split_media(file_path: str, chunk_length: int = 180, token=None) -> list[str]:
     """
     Dosyayı belirtilen saniye uzunluğunda parçalara ayırır (varsayılan 3 dk).
     Eğer süre 5 dakikadan (300sn) kısaysa bölmez.
@@ -42,13 +76,212 @@ def split_media(file_path: str, chunk_length: int = 180) -> list[str]:
         output_pattern
     ]
 
-    subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    run_ffmpeg(cmd, token)
 
     # Oluşan dosyaları bul ve sırala
     chunk_files = sorted(glob.glob(f"{base_name}_part*{ext}"))
     return chunk_files
 
-def convert_media_core(input_path: str, output_format: str = "mp3") -> str:
+def detect_silences(file_path: str, duration: float, token=None) -> list[tuple[float, float]]:
+    """FFmpeg silencedetect filtresiyle sessiz aralıkları (başlangıç, bitiş) saniye olarak döndürür."""
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostats",
+        "-i", file_path,
+        "-vn",
+        "-af", f"silencedetect=noise={SILENCE_NOISE_DB}dB:d={SILENCE_MIN_SECONDS}",
+        "-f", "null", "-"
+    ]
+    result = run_ffmpeg(cmd, token)
+    return parse_silences(result.stderr.decode("utf-8", "replace"), duration)
+
+def parse_silences(output: str, duration: float) -> list[tuple[float, float]]:
+    silences = []
+    start = None
+    for line in output.splitlines():
+        match = SILENCE_START.search(line)
+        if match:
+            start = max(0.0, float(match.group(1)))
+            continue
+        match = SILENCE_END.search(line)
+        if match and start is not None:
+            silences.append((start, float(match.group(1))))
+            start = None
+    if start is not None:
+        # Dosya sessizlikle bitiyor
+        silences.append((start, duration))
+    return silences
+
+def plan_segments(duration: float, silences, target: float = 180, window: float = SEGMENT_WINDOW,
+                  drop: float = SILENCE_DROP_SECONDS) -> list[tuple[float, float]]:
+    """
+    Kesim planı: drop saniyeden uzun sessizlikler çıkarılır, kalan konuşma bölgeleri hedef uzunluğa
+    en yakın kısa duraklamanın ortasından bölünür. Pencerede duraklama yoksa hedef noktadan kesilir.
+    (başlangıç, bitiş) listesi döndürür.
+    """
+    regions = []
+    cursor = 0.0
+    for start, end in silences:
+        if end - start >= drop:
+            region_end = min(start + SILENCE_PADDING, duration)
+            if region_end - cursor >= MIN_SEGMENT_SECONDS:
+                regions.append((cursor, region_end))
+            cursor = max(cursor, end - SILENCE_PADDING)
+    if duration - cursor >= MIN_SEGMENT_SECONDS:
+        regions.append((cursor, duration))
+
+    pauses = [(start + end) / 2 for start, end in silences if end - start < drop]
+    segments = []
+    for region_start, region_end in regions:
+        cursor = region_start
+        while region_end - cursor > target + window:
+            ideal = cursor + target
+            candidates = [pause for pause in pauses if ideal - window <= pause <= ideal + window]
+            cut = min(candidates, key=lambda pause: abs(pause - ideal)) if candidates else ideal
+            segments.append((cursor, cut))
+            cursor = cut
+        segments.append((cursor, region_end))
+    return segments
+
+def segment_media(file_path: str, target_length: int = 180, token=None) -> list[dict]:
+    """
+    Dosyayı transkripsiyon için parçalara ayırır ve {'path', 'start', 'end'} listesi döndürür;
+    start/end parçanın orijinal dosyadaki konumudur (zaman damgalarını birleştirmek için).
+    SEGMENTER=silence iken kesimler duraklamalara denk getirilir, uzun sessizlikler atlanır ve parçalar
+    16 kHz mono WAV olarak yeniden kodlanır (kesimler kare sınırlarına bağlı kalmaz).
+    5 dakikadan kısa dosyalar bölünmez.
+    """
+    duration = get_media_duration(file_path)
+    if duration <= 300:
+        return [{"path": file_path, "start": 0.0, "end": duration}]
+
+    if SEGMENTER == "fixed":
+        return [
+            {"path": path, "start": float(i * target_length), "end": min(float((i + 1) * target_length), duration)}
+            for i, path in enumerate(split_media(file_path, target_length, token))
+        ]
+
+    plan = plan_segments(duration, detect_silences(file_path, duration, token), target_length)
+    kept = sum(end - start for start, end in plan)
+    print(f"Sessizlik bazlı bölme: {len(plan)} parça, {duration - kept:.0f} sn sessizlik atlandı ({duration:.0f} sn içinden)")
+
+    base_name = os.path.splitext(file_path)[0]
+    segments = []
+    for i, (start, end) in enumerate(plan):
+        output_path = f"{base_name}_seg{i:03d}.wav"
+        cmd = [
+            "ffmpeg", "-y",
+            "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}",
+            "-i", file_path,
+            "-vn", "-ac", "1", "-ar", "16000",
+            output_path
+        ]
+        run_ffmpeg(cmd, token)
+        segments.append({"path": output_path, "start": start, "end": end})
+    return segments
+
+def frame_levels(pcm: bytes) -> np.ndarray:
+    """16 bit PCM'in her 20 ms'lik karesinin RMS seviyesini dBFS olarak döndürür (eksik son kare atlanır)."""
+    samples = np.frombuffer(pcm[:len(pcm) - len(pcm) % FRAME_BYTES], dtype=np.int16).astype(np.float32) / 32768.0
+    frames = samples.reshape(-1, FRAME_BYTES // 2)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1)) if len(frames) else np.empty(0, dtype=np.float32)
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+def silent_runs(levels: np.ndarray, final: bool) -> list[tuple[float, float]]:
+    """
+    Seviyesi SILENCE_NOISE_DB altında kalan ve en az SILENCE_MIN_SECONDS süren kare dizilerini
+    (başlangıç, bitiş) saniye olarak döndürür. Tampon sonunda devam eden sessizlik, akış bitmediyse
+    yalnızca atlanacak kadar uzunsa (SILENCE_DROP_SECONDS) sayılır; böylece verilen kararlar değişmez.
+    """
+    silent = np.concatenate(([False], levels < SILENCE_NOISE_DB, [False]))
+    edges = np.flatnonzero(np.diff(silent.astype(np.int8)))
+    runs = []
+    for start, end in zip(edges[::2], edges[1::2]):
+        length = (end - start) * FRAME_SECONDS
+        if length < SILENCE_MIN_SECONDS:
+            continue
+        if end == len(levels) and not final and length < SILENCE_DROP_SECONDS:
+            continue
+        runs.append((start * FRAME_SECONDS, end * FRAME_SECONDS))
+    return runs
+
+def write_wav(path: str, pcm: bytes):
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(pcm)
+
+def stream_segments(source: str, output_dir: str, name: str, headers: dict = None, target_length: float = 180,
+                    split: bool = True, token=None, on_process=None):
+    """
+    source'u (dosya veya HTTP adresi) FFmpeg ile okurken 16 kHz mono PCM'e çevirir ve parçaları ses
+    geldikçe {'path', 'start', 'end'} olarak üreten generator. Kesim kuralları segment_media ile aynıdır
+    (duraklamalarda kes, uzun sessizlikleri at); bir parça, sonrasındaki ses kararı değiştiremeyecek
+    kadar geldiğinde yazılır. split=True iken bellekte en fazla bir parça (hedef uzunluk + pencere) kadar
+    ses tutulur. split=False ise tüm ses akış bitince tek parça olarak yazılır ve tamamı bellekte tutulur;
+    bu yüzden yalnızca süresi bilinen kısa kayıtlar için kullanılmalıdır.
+    on_process, FFmpeg süreci başlar başlamaz onunla çağrılır (ör. başka bir thread'den öldürebilmek için).
+    FFmpeg sıfırdan farklı kodla biterse (başta ya da yarıda) StreamError fırlatılır.
+    """
+    cmd = ["ffmpeg", "-hide_banner", "-nostats", "-loglevel", "error"]
+    if headers:
+        cmd += ["-headers", "".join(f"{key}: {value}\r\n" for key, value in headers.items())]
+    cmd += ["-i", source, "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "-"]
+
+    stderr = tempfile.TemporaryFile()
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr)
+    if on_process is not None:
+        on_process(process)
+    buffer = bytearray()
+    levels = np.empty(0, dtype=np.float32)
+    origin = 0.0  # Tamponun başının kayıttaki konumu (sn)
+    index = 0
+    try:
+        while True:
+            if token is not None:
+                token.check()
+            block = process.stdout.read(READ_BLOCK_BYTES)
+            final = not block
+            if final and process.wait() != 0:
+                # Akış yarıda kesildiyse (ağ hatası, süresi dolan adres) kalan tampon son parça diye yazılmaz
+                stderr.seek(0)
+                raise StreamError(f"FFmpeg akış hatası: {stderr.read().decode('utf-8', 'replace').strip()}", index)
+            if block:
+                # Bloklar kare katı olduğundan seviyeler tamponla hizalı kalır
+                levels = np.concatenate((levels, frame_levels(block)))
+                buffer += block
+
+            buffer_seconds = len(buffer) / 2 / SAMPLE_RATE
+            if split:
+                plan = plan_segments(buffer_seconds, silent_runs(levels, final), target_length)
+            else:
+                plan = [(0.0, buffer_seconds)] if buffer_seconds >= MIN_SEGMENT_SECONDS else []
+            ready = plan if final else [segment for segment in plan if segment[1] < buffer_seconds]
+
+            for start, end in ready:
+                output_path = os.path.join(output_dir, f"{name}_seg{index:03d}.wav")
+                write_wav(output_path, bytes(buffer[int(start * SAMPLE_RATE) * 2:int(end * SAMPLE_RATE) * 2]))
+                index += 1
+                yield {"path": output_path, "start": origin + start, "end": origin + end}
+
+            if final:
+                break
+            if ready:
+                # Tampon, henüz bitmemiş parçanın başına (yoksa son yazılan parçanın sonuna) kadar kısaltılır
+                keep_from = plan[len(ready)][0] if len(plan) > len(ready) else ready[-1][1]
+                frames = int(keep_from / FRAME_SECONDS)
+                del buffer[:frames * FRAME_BYTES]
+                levels = levels[frames:]
+                origin += frames * FRAME_SECONDS
+
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        process.stdout.close()
+        stderr.close()
+
+def convert_media_core(input_path: str, output_format: str = "mp3", token=None) -> str:
     """
     FFmpeg kullanarak medya dönüşümü yapan çekirdek fonksiyon.
     Başarılı olursa çıktı dosya yolunu döndürür, hata olursa Exception fırlatır.
@@ -71,5 +304,5 @@ def convert_media_core(input_path: str, output_format: str = "mp3") -> str:
     if output_format in ["mp3", "wav", "m4a", "ogg"]:
          command.insert(2, "-vn")
 
-    process = subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    run_ffmpeg(command, token)
     return output_path
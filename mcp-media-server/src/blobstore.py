@@ -0,0 +1,111 @@
+import os
+import re
+import shutil
+import hashlib
+import tempfile
+import threading
+
+# İçerik adresli (SHA-256) yükleme deposu: aynı dosya ikinci kez gönderilmez
+BLOB_DIR = os.getenv("BLOB_DIR", os.path.join(tempfile.gettempdir(), "mcp_blobs"))
+BLOB_STORE_MAX_BYTES = int(os.getenv("BLOB_STORE_MAX_BYTES", str(5 * 1024 * 1024 * 1024)))  # 5GB
+
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+_lock = threading.Lock()
+
+os.makedirs(BLOB_DIR, exist_ok=True)
+
+def blob_path(sha256: str) -> str:
+    """Hash'in depodaki yolunu döndürür; geçersiz hash için ValueError fırlatır."""
+    sha256 = (sha256 or "").lower()
+    if not SHA256_PATTERN.match(sha256):
+        raise ValueError(f"Geçersiz SHA-256: {sha256}")
+    return os.path.join(BLOB_DIR, sha256)
+
+def has_blob(sha256: str) -> bool:
+    """Blob depoda var mı? Varsa LRU için son kullanım zamanı güncellenir."""
+    path = blob_path(sha256)
+    if os.path.exists(path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return True
+    return False
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def commit_file(file_path: str, sha256: str) -> str:
+    """
+    Dosyayı doğrulayıp depoya taşır ve blob yolunu döndürür.
+    Hash eşleşmezse dosya silinir ve ValueError fırlatılır.
+    """
+    path = blob_path(sha256)
+    actual = file_sha256(file_path)
+    if actual != sha256.lower():
+        os.unlink(file_path)
+        raise ValueError(f"Hash uyuşmuyor: beklenen {sha256}, gelen {actual}")
+
+    with _lock:
+        if os.path.exists(path):
+            os.unlink(file_path)
+            os.utime(path)
+        else:
+            shutil.move(file_path, path)
+        evict(keep=path)
+    return path
+
+def materialize(sha256: str, filename: str) -> str:
+    """
+    Blob'u doğru uzantıyla geçici bir yola bağlar (hard link, olmazsa kopya).
+    FFmpeg/Whisper uzantıya baktığı için gerekli. Dönen yol kullanımdan sonra silinmelidir; blob silinmez.
+    """
+    path = blob_path(sha256)
+    if not has_blob(sha256):
+        raise FileNotFoundError(f"Blob bulunamadı: {sha256}")
+
+    _, ext = os.path.splitext(os.path.basename(filename or ""))
+    fd, temp_path = tempfile.mkstemp(suffix=ext or ".tmp")
+    os.close(fd)
+    os.unlink(temp_path)
+    try:
+        os.link(path, temp_path)
+    except OSError:
+        shutil.copyfile(path, temp_path)
+    return temp_path
+
+def evict(keep: str = None):
+    """Depo BLOB_STORE_MAX_BYTES'ı aşıyorsa en uzun süredir kullanılmayan blob'ları siler."""
+    entries = []
+    total = 0
+    for entry in os.scandir(BLOB_DIR):
+        if entry.is_file():
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+    for _, size, path in sorted(entries):
+        if total <= BLOB_STORE_MAX_BYTES:
+            break
+        if path == keep:
+            continue
+        try:
+            os.unlink(path)
+            total -= size
+            print(f"Blob silindi (LRU): {os.path.basename(path)}")
+        except OSError:
+            pass
+
+def stats() -> dict:
+    count = 0
+    total = 0
+    for entry in os.scandir(BLOB_DIR):
+        if entry.is_file():
+            count += 1
+            total += entry.stat().st_size
+    return {"blobs": count, "bytes": total, "max_bytes": BLOB_STORE_MAX_BYTES}
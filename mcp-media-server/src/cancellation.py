@@ -0,0 +1,94 @@
+import time
+import threading
+import subprocess
+
+# İstemciden gelen iptal/son süre bilgisinin sunucudaki kaydı.
+# Uzun işler parça sınırlarında token.check() çağırır; FFmpeg süreçleri iptalde öldürülür.
+
+CANCEL_POLL_INTERVAL = 0.5
+EARLY_CANCEL_TTL = 600  # Kayıttan önce gelen iptaller bu kadar saniye hatırlanır
+
+class RequestCancelled(Exception):
+    """İstek istemci tarafından iptal edildiğinde veya son süresi geçtiğinde fırlatılır."""
+
+class CancelToken:
+    def __init__(self, request_id: str = "", deadline: float = 0.0):
+        self.request_id = request_id
+        self.deadline = deadline or 0.0  # Unix zamanı, 0 = süre sınırı yok
+        self.reason = None
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "İstek iptal edildi"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def check(self):
+        """İptal edildiyse veya son süre geçtiyse RequestCancelled fırlatır."""
+        if not self._event.is_set() and self.deadline and time.time() > self.deadline:
+            self.cancel("Son süre aşıldı")
+        if self._event.is_set():
+            raise RequestCancelled(self.reason)
+
+    def run_process(self, cmd, **kwargs) -> subprocess.CompletedProcess:
+        """
+        subprocess.run(check=True) gibi çalışır, ancak iptal veya son süre aşımında süreci öldürür.
+        """
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **kwargs)
+        while True:
+            try:
+                stdout, stderr = process.communicate(timeout=CANCEL_POLL_INTERVAL)
+                break
+            except subprocess.TimeoutExpired:
+                try:
+                    self.check()
+                except RequestCancelled:
+                    process.kill()
+                    process.communicate()
+                    raise
+        if process.returncode:
+            raise subprocess.CalledProcessError(process.returncode, cmd, stdout, stderr)
+        return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+_tokens = {}
+_early_cancels = {}  # request_id -> iptal zamanı
+_lock = threading.Lock()
+
+def register(request_id: str = "", deadline: float = 0.0) -> CancelToken:
+    """İstek için bir token oluşturur; request_id boşsa token sadece son süreyi uygular."""
+    token = CancelToken(request_id, deadline)
+    if not request_id:
+        return token
+    with _lock:
+        _tokens[request_id] = token
+        if _early_cancels.pop(request_id, None):
+            token.cancel()
+    return token
+
+def release(token: CancelToken):
+    if token.request_id:
+        with _lock:
+            if _tokens.get(token.request_id) is token:
+                del _tokens[token.request_id]
+
+def cancel(request_id: str) -> bool:
+    """Çalışan isteği iptal eder. İstek henüz kaydedilmediyse iptal kısa süre hatırlanır; False döner."""
+    now = time.time()
+    with _lock:
+        token = _tokens.get(request_id)
+        if token is None:
+            for old_id, cancelled_at in list(_early_cancels.items()):
+                if now - cancelled_at > EARLY_CANCEL_TTL:
+                    del _early_cancels[old_id]
+            _early_cancels[request_id] = now
+            return False
+    token.cancel()
+    return True
+
+def active_requests() -> int:
+    with _lock:
+        return len(_tokens)
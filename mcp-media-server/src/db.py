@@ -31,12 +31,15 @@ def save_chunk_to_db(file_path: str, video_id: str, url: str) -> str:
         print(f"DB Kayıt hatası ({file_path}): {e}")
         return None
 
-def update_transcript(record_id: str, full_text: str, summary: str = ""):
-    """Kaydı transkript ve özet ile günceller."""
+def update_transcript(record_id: str, full_text: str, summary: str = "", simple_text: str = None):
+    """
+    Kaydı transkript ve özet ile günceller.
+    full_text zaman damgalı ('[mm:ss] metin' satırları), simple_text düz metindir; verilmezse full_text kullanılır.
+    """
     try:
         supabase.table('transcripts').update({
             "full_transcript": full_text,
-            "simple_transcript": full_text,
+            "simple_transcript": full_text if simple_text is None else simple_text,
             "summary": summary
         }).eq('id', record_id).execute()
         return True
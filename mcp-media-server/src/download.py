@@ -1,9 +1,10 @@
 import yt_dlp
 import os
 
-def download_youtube_audio(url: str, output_dir: str = ".") -> tuple[str, str, str]:
+def download_youtube_audio(url: str, output_dir: str = ".", progress_hook=None) -> tuple[str, str, str]:
     """
     YouTube videosunu indirir (en iyi ses mp3) ve dosya yolunu, video id'sini ve başlığı döndürür.
+    progress_hook verilirse indirme sırasında yüzde (0-100) ile çağrılır.
     """
     ydl_opts = {
         'format': 'bestaudio/best',
@@ -16,6 +17,15 @@ def download_youtube_audio(url: str, output_dir: str = ".") -> tuple[str, str, s
         'quiet': True,
         'no_warnings': True,
     }
+    if progress_hook:
+        def hook(d):
+            if d.get('status') == 'downloading':
+                total = d.get('total_bytes') or d.get('total_bytes_estimate')
+                if total:
+                    progress_hook(100.0 * d.get('downloaded_bytes', 0) / total)
+            elif d.get('status') == 'finished':
+                progress_hook(100.0)
+        ydl_opts['progress_hooks'] = [hook]
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
         info = ydl.extract_info(url, download=True)
         # yt-dlp will save as ID.mp3 because of postprocessor
@@ -23,3 +33,22 @@ def download_youtube_audio(url: str, output_dir: str = ".") -> tuple[str, str, s
         title = info.get('title', 'Unknown')
         final_path = os.path.join(output_dir, f"{video_id}.mp3")
         return final_path, video_id, title
+
+# FFmpeg'in doğrudan okuyabildiği protokoller (DASH parçaları gibi diğerleri indirilerek işlenir)
+STREAMABLE_PROTOCOLS = ("https", "http", "m3u8", "m3u8_native")
+
+def resolve_audio_stream(url: str):
+    """
+    Videoyu indirmeden en iyi ses akışının adresini çözer.
+    (akış adresi, HTTP başlıkları, video id, başlık, süre) döndürür; akış FFmpeg ile okunamıyorsa None.
+    """
+    ydl_opts = {
+        'format': 'bestaudio/best',
+        'quiet': True,
+        'no_warnings': True,
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+    if not info.get('url') or info.get('protocol') not in STREAMABLE_PROTOCOLS:
+        return None
+    return info['url'], info.get('http_headers') or {}, info['id'], info.get('title', 'Unknown'), float(info.get('duration') or 0)
@@ -0,0 +1,102 @@
+import os
+import queue
+import threading
+
+# İndirme/çözme ile transkripsiyonu üst üste bindiren üretici/tüketici hattı.
+# Üretici thread FFmpeg akışından gelen parçaları sınırlı bir kuyruğa koyar; kuyruk doluysa
+# FFmpeg'in okunması (dolayısıyla indirme) tüketici yetişene kadar bekler.
+
+WORKFLOW_PIPELINE = os.getenv("WORKFLOW_PIPELINE", "true").lower() == "true"
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))
+QUEUE_POLL_INTERVAL = 0.5
+
+_DONE = object()
+
+class SegmentPipeline:
+    """
+    start(segments) ile verilen parçalar (ör. audio.stream_segments generator'ı) ayrı bir thread'de
+    tüketilir ve sırayla iterasyonla alınır. on_segment her parça kuyruğa girmeden önce üretici thread'de
+    çağrılır (ör. parçayı hemen transkripsiyon havuzuna göndermek için). Üreticideki hata iterasyon
+    sonunda fırlatılır. Üretici, FFmpeg sürecini attach_process ile bildirir; close() bu süreci öldürür,
+    böylece ağda takılı kalmış bir okuma da sonlanır.
+    paths, üretilen tüm parça dosyalarını tutar (tüketilmeyenler dahil); close()'dan sonra okunmalıdır.
+    """
+
+    def __init__(self, token=None, on_segment=None, queue_size: int = PIPELINE_QUEUE_SIZE):
+        self.segments = None
+        self.token = token
+        self.on_segment = on_segment
+        self.paths = []
+        self.error = None
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._stop = threading.Event()
+        self._process = None
+        self._process_lock = threading.Lock()
+        self._thread = None
+
+    def start(self, segments):
+        self.segments = segments
+        self._thread = threading.Thread(target=self._produce, name="segment-producer", daemon=True)
+        self._thread.start()
+        return self
+
+    def attach_process(self, process):
+        """Üreticinin okuduğu süreci kaydeder; pipeline zaten kapatıldıysa süreç hemen öldürülür."""
+        with self._process_lock:
+            self._process = process
+            stopped = self._stop.is_set()
+        if stopped:
+            process.kill()
+
+    def __iter__(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=QUEUE_POLL_INTERVAL)
+            except queue.Empty:
+                if self.token is not None:
+                    self.token.check()
+                continue
+            if item is _DONE:
+                if self.error is not None:
+                    raise self.error
+                return
+            yield item
+
+    def close(self):
+        """
+        Üreticiyi durdurur ve bitmesini bekler. FFmpeg süreci öldürüldüğü için bloklanmış okuma EOF ile
+        döner; close() döndükten sonra üretici artık parça yazmaz ve on_segment çağırmaz.
+        """
+        with self._process_lock:
+            self._stop.set()
+            process = self._process
+        if process is not None and process.poll() is None:
+            process.kill()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _produce(self):
+        try:
+            for segment in self.segments:
+                self.paths.append(segment["path"])
+                if self._stop.is_set():
+                    break
+                if self.on_segment is not None:
+                    self.on_segment(segment)
+                if not self._put(segment):
+                    break
+        except BaseException as e:
+            self.error = e
+        finally:
+            if hasattr(self.segments, "close"):
+                self.segments.close()
+            self._put(_DONE)
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=QUEUE_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
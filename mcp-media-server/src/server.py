@@ -4,27 +4,158 @@ import traceback
 import base64
 import tempfile
 import glob
-from fastmcp import FastMCP
+import json
+import time
+import asyncio
+import threading
+import multiprocessing
+from fastmcp import FastMCP, Context
 try:
-    from .download import download_youtube_audio
-    from .audio import split_media
-    from .transcribe import transcribe_local
+    from .download import download_youtube_audio, resolve_audio_stream
+    from .audio import segment_media, stream_segments, StreamError
+    from .transcribe import transcribe_local, model_manager, preload_models, format_transcript
+    from .transcribe_pool import ChunkTranscription
+    from .pipeline import SegmentPipeline, WORKFLOW_PIPELINE
     from .db import save_chunk_to_db, update_transcript
     from .llm import generate_summary
+    from . import blobstore
+    from . import cancellation
+    from .transfer import decode_base64_to_file, write_base64_temp, register_download, read_download, delete_download
 except ImportError:
-    from download import download_youtube_audio
-    from audio import split_media
-    from transcribe import transcribe_local
+    from download import download_youtube_audio, resolve_audio_stream
+    from audio import segment_media, stream_segments, StreamError
+    from transcribe import transcribe_local, model_manager, preload_models, format_transcript
+    from transcribe_pool import ChunkTranscription
+    from pipeline import SegmentPipeline, WORKFLOW_PIPELINE
     from db import save_chunk_to_db, update_transcript
     from llm import generate_summary
+    import blobstore
+    import cancellation
+    from transfer import decode_base64_to_file, write_base64_temp, register_download, read_download, delete_download
 
 # Sunucuyu başlatıyoruz
 mcp = FastMCP("LocalMediaServer")
 
+# Modeller arka planda yüklenip ısıtılır; bu sırada gelen istekler yüklemenin bitmesini bekler.
+# Süreç havuzunun işçileri bu modülü yeniden içe aktarabildiği için yalnızca ana süreçte yapılır.
+if multiprocessing.parent_process() is None:
+    threading.Thread(target=preload_models, name="model-preload", daemon=True).start()
+
 # Temporary directory for uploaded chunks
 UPLOAD_DIR = os.path.join(tempfile.gettempdir(), "mcp_uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Unfinished uploads are kept this long so clients can resume them
+UPLOAD_TTL = int(os.getenv("UPLOAD_TTL", str(24 * 3600)))
+_last_upload_cleanup = 0.0
+
+class ProgressReporter:
+    """
+    Sends MCP progress notifications from blocking work running in a worker thread.
+    The notification message is a JSON object (step, message and optional chunk/chunks/text)
+    so the client can show each step and partial transcripts.
+    """
+
+    def __init__(self, ctx: Context = None):
+        self.ctx = ctx
+        self.loop = asyncio.get_running_loop() if ctx is not None else None
+        self.last_download_percent = -1
+
+    def __call__(self, progress: float, step: str, message: str = "", **extra):
+        if self.ctx is None:
+            return
+        payload = json.dumps({"step": step, "message": message, **extra}, ensure_ascii=False)
+        try:
+            try:
+                coro = self.ctx.report_progress(progress, 100, payload)
+            except TypeError:
+                # Older FastMCP versions have no message argument
+                coro = self.ctx.report_progress(progress, 100)
+            asyncio.run_coroutine_threadsafe(coro, self.loop)
+        except Exception as e:
+            print(f"Progress notification failed: {e}")
+
+    def download_hook(self, percent: float):
+        # yt-dlp calls this many times per second; only whole-percent changes are sent
+        if int(percent) != self.last_download_percent:
+            self.last_download_percent = int(percent)
+            self(percent * 0.2, "download", f"İndiriliyor: %{int(percent)}")
+
+async def run_in_thread(token, fn, *args):
+    """
+    Runs blocking work in a worker thread. If the MCP request itself is cancelled, the token is
+    cancelled too, so the thread stops at its next check instead of finishing abandoned work.
+    """
+    try:
+        return await asyncio.to_thread(fn, *args)
+    except asyncio.CancelledError:
+        token.cancel("MCP isteği iptal edildi")
+        raise
+    finally:
+        cancellation.release(token)
+
+@mcp.tool()
+def cancel_request(request_id: str) -> str:
+    """
+    Cancels a running request started with the same 'request_id'. Download, ffmpeg and
+    transcription work stops at the next chunk boundary.
+    """
+    return json.dumps({"request_id": request_id, "cancelled": cancellation.cancel(request_id)})
+
+@mcp.tool()
+def server_stats() -> str:
+    """
+    Returns loaded Whisper models (load/warmup time, resident size, last use), the model memory
+    budget, blob store usage and the number of running requests as JSON.
+    """
+    return json.dumps({
+        "whisper": model_manager.stats(),
+        "blobs": blobstore.stats(),
+        "active_requests": cancellation.active_requests()
+    })
+
+def cleanup_stale_uploads():
+    """Removes upload directories that haven't received a chunk for UPLOAD_TTL seconds (at most once an hour)."""
+    global _last_upload_cleanup
+    now = time.time()
+    if now - _last_upload_cleanup < 3600:
+        return
+    _last_upload_cleanup = now
+    for entry in os.scandir(UPLOAD_DIR):
+        try:
+            if entry.is_dir() and now - entry.stat().st_mtime > UPLOAD_TTL:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            pass
+
+def conversion_result(output_path: str, return_handle: bool) -> str:
+    """Returns the converted file as base64, or as a download handle when return_handle is set."""
+    if return_handle:
+        return json.dumps(register_download(output_path))
+    with open(output_path, "rb") as f:
+        result_data = f.read()
+    return base64.b64encode(result_data).decode("utf-8")
+
+@mcp.tool()
+def download_chunk(handle: str, offset: int, length: int) -> str:
+    """
+    Returns up to 'length' bytes (at most 8MB) of a converted file starting at 'offset', base64 encoded.
+    An empty string means the end of the file was reached.
+    """
+    try:
+        return base64.b64encode(read_download(handle, offset, length)).decode("utf-8")
+    except Exception as e:
+        return f"Error reading download: {str(e)}"
+
+@mcp.tool()
+def release_download(handle: str) -> str:
+    """Deletes a converted file once the client has fetched it."""
+    try:
+        delete_download(handle)
+        return f"Released {handle}"
+    except Exception as e:
+        return f"Error releasing download: {str(e)}"
+
 @mcp.tool()
 def upload_chunk(upload_id: str, chunk_index: int, chunk_data: str) -> str:
     """
@@ -43,13 +174,40 @@ def upload_chunk(upload_id: str, chunk_index: int, chunk_data: str) -> str:
 
         chunk_path = os.path.join(file_dir, f"{chunk_index:05d}.part")
 
-        with open(chunk_path, "wb") as f:
-            f.write(base64.b64decode(chunk_data))
+        # Write to a temp name and rename, so a half-written chunk is never listed as received
+        tmp_path = f"{chunk_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            decode_base64_to_file(chunk_data, f)
+        os.replace(tmp_path, chunk_path)
 
+        cleanup_stale_uploads()
         return f"Chunk {chunk_index} received for {safe_upload_id}"
     except Exception as e:
         return f"Error receiving chunk: {str(e)}"
 
+@mcp.tool()
+def list_uploaded_chunks(upload_id: str) -> str:
+    """
+    Returns a JSON object with the chunk indices already received for 'upload_id',
+    so an interrupted upload can resume with the missing chunks only.
+    """
+    try:
+        safe_upload_id = os.path.basename(upload_id)
+        if not safe_upload_id:
+            return "Error: Invalid upload_id"
+
+        file_dir = os.path.join(UPLOAD_DIR, safe_upload_id)
+        chunks = []
+        if os.path.isdir(file_dir):
+            for part in glob.glob(os.path.join(file_dir, "*.part")):
+                name = os.path.basename(part)[:-len(".part")]
+                if name.isdigit():
+                    chunks.append(int(name))
+
+        return json.dumps({"upload_id": safe_upload_id, "chunks": sorted(chunks)})
+    except Exception as e:
+        return f"Error listing chunks: {str(e)}"
+
 def assemble_file(upload_id: str, filename: str) -> str:
     """
     Assembles chunks for the given upload_id and returns the path to the assembled file.
@@ -89,15 +247,85 @@ def assemble_file(upload_id: str, filename: str) -> str:
     return assembled_path
 
 @mcp.tool()
-def transcribe_uploaded_file(upload_id: str, filename: str, model_size: str = "base") -> str:
+def has_blob(sha256: str) -> str:
     """
-    Assembles previously uploaded chunks for 'upload_id' and transcribes the result.
-    filename is provided to preserve the file extension.
+    Returns a JSON object telling whether a file with this SHA-256 is already stored,
+    so the client can skip uploading it.
+    """
+    try:
+        return json.dumps({"sha256": sha256.lower(), "exists": blobstore.has_blob(sha256)})
+    except Exception as e:
+        return f"Error checking blob: {str(e)}"
+
+@mcp.tool()
+def commit_blob(upload_id: str, sha256: str, filename: str = "") -> str:
+    """
+    Assembles previously uploaded chunks for 'upload_id', verifies the SHA-256 and moves the
+    file into the content-addressed blob store. Later calls can reference it by 'sha256'.
     """
-    assembled_path = None
     try:
         assembled_path = assemble_file(upload_id, filename)
-        return transcribe_local(assembled_path, model_size)
+        size = os.path.getsize(assembled_path)
+        blobstore.commit_file(assembled_path, sha256)
+        return json.dumps({"sha256": sha256.lower(), "size": size})
+    except Exception as e:
+        return f"Error committing blob: {str(e)}"
+
+def resolve_input_file(upload_id: str, filename: str, blob_sha256: str) -> str:
+    """
+    Returns a temporary path for the input: a link to the stored blob when blob_sha256 is given,
+    otherwise the file assembled from the upload chunks. The caller deletes it.
+    """
+    if blob_sha256:
+        return blobstore.materialize(blob_sha256, filename)
+    return assemble_file(upload_id, filename)
+
+def transcribe_file_chunks(file_path: str, model_size: str, backend: str, token,
+                           progress: ProgressReporter = None) -> str:
+    """
+    Transcribes a file chunk by chunk (split at pauses like the workflow) and returns the joined text.
+    The token is checked before every chunk, so a cancel or deadline stops the work at the next chunk
+    boundary; a chunk Whisper has already started on runs to completion.
+    With a progress reporter, every chunk reports i/N and its text like the workflow; chunks share 10-95.
+    """
+    progress = progress or ProgressReporter()
+    segments = segment_media(file_path, token=token)
+    paths = [segment["path"] for segment in segments]
+    chunks = len(paths)
+    if not chunks:
+        message = "Kayıtta konuşma bulunamadı."
+    elif chunks > 1:
+        message = f"Dosya {chunks} parçaya bölündü."
+    else:
+        message = "Bölünmesine gerek kalmadı."
+    progress(10, "split", message, chunks=chunks)
+    transcripts = ChunkTranscription(paths, model_size=model_size, token=token, backend=backend)
+    try:
+        texts = []
+        for i in range(chunks):
+            token.check()
+            progress(10 + 85 * i / chunks, "transcribe", f"Parça {i+1}/{chunks} işleniyor", chunk=i + 1, chunks=chunks)
+            text = "".join(segment["text"] for segment in transcripts.result(i))
+            texts.append(text)
+            progress(10 + 85 * (i + 1) / chunks, "chunk_transcribed", f"Parça {i+1}/{chunks} yazıya döküldü",
+                     text=text, chunk=i + 1, chunks=chunks)
+        return "".join(texts)
+    finally:
+        transcripts.close()
+        for path in paths:
+            if path != file_path and os.path.exists(path):
+                os.unlink(path)
+
+def run_transcribe_uploaded_file(upload_id: str, filename: str, model_size: str, blob_sha256: str,
+                                 progress: ProgressReporter, token, backend: str = "") -> str:
+    assembled_path = None
+    try:
+        assembled_path = resolve_input_file(upload_id, filename, blob_sha256)
+        token.check()
+        progress(5, "transcribe", f"Transkript çıkarılıyor ({model_size})...")
+        text = transcribe_file_chunks(assembled_path, model_size, backend, token, progress)
+        progress(100, "done", "Transkript tamamlandı.")
+        return text
     except Exception as e:
         return f"Error in transcribe_uploaded_file: {str(e)}"
     finally:
@@ -105,24 +333,33 @@ def transcribe_uploaded_file(upload_id: str, filename: str, model_size: str = "b
             os.unlink(assembled_path)
 
 @mcp.tool()
-def convert_uploaded_file(upload_id: str, filename: str, output_format: str = "mp3") -> str:
+async def transcribe_uploaded_file(ctx: Context, upload_id: str = "", filename: str = "", model_size: str = "base",
+                                   blob_sha256: str = "", request_id: str = "", deadline: float = 0.0,
+                                   backend: str = "") -> str:
     """
-    Assembles previously uploaded chunks for 'upload_id', converts it, and returns the result as base64.
+    Assembles previously uploaded chunks for 'upload_id' (or uses the stored blob 'blob_sha256')
+    and transcribes the result. filename is provided to preserve the file extension.
+    Sends progress notifications while it runs. 'request_id' allows cancel_request to stop it and
+    'deadline' (Unix time) stops it when the caller will no longer wait.
+    'backend' ('whisper' or 'faster-whisper') overrides TRANSCRIBE_BACKEND for this request.
     """
+    progress = ProgressReporter(ctx)
+    token = cancellation.register(request_id, deadline)
+    return await run_in_thread(token, run_transcribe_uploaded_file, upload_id, filename, model_size, blob_sha256, progress, token,
+                               backend)
+
+def run_convert_uploaded_file(upload_id: str, filename: str, output_format: str, blob_sha256: str,
+                              return_handle: bool, token) -> str:
     assembled_path = None
     output_path = None
     try:
         from .audio import convert_media_core
-        assembled_path = assemble_file(upload_id, filename)
-
-        # Convert
-        output_path = convert_media_core(assembled_path, output_format)
+        assembled_path = resolve_input_file(upload_id, filename, blob_sha256)
 
-        # Read result
-        with open(output_path, "rb") as f:
-            result_data = f.read()
+        # Convert (ffmpeg is killed if the request is cancelled)
+        output_path = convert_media_core(assembled_path, output_format, token=token)
 
-        return base64.b64encode(result_data).decode("utf-8")
+        return conversion_result(output_path, return_handle)
 
     except Exception as e:
         return f"Error in convert_uploaded_file: {str(e)}"
@@ -132,35 +369,51 @@ def convert_uploaded_file(upload_id: str, filename: str, output_format: str = "m
         if output_path and os.path.exists(output_path):
             os.unlink(output_path)
 
-
 @mcp.tool()
-def transcribe_local_file(file_path: str, model_size: str = "base") -> str:
+async def convert_uploaded_file(upload_id: str = "", filename: str = "", output_format: str = "mp3", blob_sha256: str = "",
+                                return_handle: bool = False, request_id: str = "", deadline: float = 0.0) -> str:
     """
-    Yerel bir ses dosyasını (mp3, wav, m4a) Whisper kullanarak metne çevirir.
-    Tool wrapper for the transcribe module.
+    Assembles previously uploaded chunks for 'upload_id' (or uses the stored blob 'blob_sha256'),
+    converts it, and returns the result as base64. With return_handle=True the result stays on the
+    server and a JSON object {"handle", "size"} is returned for use with download_chunk.
+    'request_id' and 'deadline' work as in transcribe_uploaded_file.
     """
-    return transcribe_local(file_path, model_size)
+    token = cancellation.register(request_id, deadline)
+    return await run_in_thread(token, run_convert_uploaded_file, upload_id, filename, output_format, blob_sha256,
+                               return_handle, token)
+
 
 @mcp.tool()
-def transcribe_audio_base64(audio_data: str, filename: str, model_size: str = "base") -> str:
+def transcribe_local_file(file_path: str, model_size: str = "base", backend: str = "") -> str:
     """
-    Base64 encoded ses verisini alır, geçici dosyaya kaydeder ve transcribe eder.
+    Yerel bir ses dosyasını (mp3, wav, m4a) Whisper kullanarak metne çevirir.
+    Tool wrapper for the transcribe module.
     """
+    return transcribe_local(file_path, model_size, backend)
+
+def run_transcribe_audio_base64(audio_data: str, filename: str, model_size: str, backend: str, token) -> str:
     try:
-        # Create temp file
-        suffix = os.path.splitext(filename)[1]
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp:
-            temp.write(base64.b64decode(audio_data))
-            temp_path = temp.name
+        # Geçici dosyaya parça parça çözülerek yazılır
+        temp_path = write_base64_temp(audio_data, filename)
 
         try:
-            return transcribe_local(temp_path, model_size)
+            return transcribe_file_chunks(temp_path, model_size, backend, token)
         finally:
             if os.path.exists(temp_path):
                 os.unlink(temp_path)
     except Exception as e:
         return f"Hata: {str(e)}"
 
+@mcp.tool()
+async def transcribe_audio_base64(audio_data: str, filename: str, model_size: str = "base", backend: str = "",
+                                  request_id: str = "", deadline: float = 0.0) -> str:
+    """
+    Base64 encoded ses verisini alır, geçici dosyaya kaydeder ve transcribe eder.
+    'request_id' ve 'deadline' transcribe_uploaded_file'daki gibi çalışır.
+    """
+    token = cancellation.register(request_id, deadline)
+    return await run_in_thread(token, run_transcribe_audio_base64, audio_data, filename, model_size, backend, token)
+
 @mcp.tool()
 def convert_media_format(input_path: str, output_format: str = "mp3") -> str:
     """
@@ -176,28 +429,22 @@ def convert_media_format(input_path: str, output_format: str = "mp3") -> str:
         return f"Hata: {str(e)}"
 
 @mcp.tool()
-def convert_media_base64(audio_data: str, filename: str, output_format: str = "mp3") -> str:
+def convert_media_base64(audio_data: str, filename: str, output_format: str = "mp3", return_handle: bool = False) -> str:
     """
     Base64 encoded ses verisini alır, dönüştürür ve base64 olarak geri döndürür.
+    return_handle=True ise sonuç sunucuda tutulur ve download_chunk için {"handle", "size"} döner.
     """
     try:
         from .audio import convert_media_core
-        # Create temp file
-        suffix = os.path.splitext(filename)[1]
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp:
-            temp.write(base64.b64decode(audio_data))
-            temp_path = temp.name
+        # Create temp file (decoded block by block)
+        temp_path = write_base64_temp(audio_data, filename)
 
         output_path = None
         try:
             # Convert
             output_path = convert_media_core(temp_path, output_format)
 
-            # Read result
-            with open(output_path, "rb") as f:
-                result_data = f.read()
-
-            return base64.b64encode(result_data).decode("utf-8")
+            return conversion_result(output_path, return_handle)
 
         finally:
             # Cleanup
@@ -210,85 +457,187 @@ def convert_media_base64(audio_data: str, filename: str, output_format: str = "m
         return f"Hata: {str(e)}"
 
 @mcp.tool()
-def process_youtube_workflow(url: str) -> str:
+async def process_youtube_workflow(url: str, ctx: Context, request_id: str = "", deadline: float = 0.0,
+                                   backend: str = "") -> str:
     """
     YouTube linkini alır, indirir, gerekirse böler, veritabanına kaydeder,
     transkript oluşturur, özetini çıkarır ve günceller.
+    Her adımda (indirme yüzdesi, bölme, parça i/N, özet) ilerleme bildirimi gönderir.
+    request_id ile cancel_request'ten iptal edilebilir; deadline (Unix zamanı) geçince iş bırakılır.
+    backend ('whisper' veya 'faster-whisper') bu istek için TRANSCRIBE_BACKEND'i geçersiz kılar.
     """
+    progress = ProgressReporter(ctx)
+    token = cancellation.register(request_id, deadline)
+    return await run_in_thread(token, run_youtube_workflow, url, progress, token, backend)
+
+def process_workflow_chunk(i: int, segment: dict, video_id: str, url: str, transcripts, report: list,
+                           progress: ProgressReporter, chunk_start: float, chunk_span: float, chunks: int = None):
+    """Bir parçayı kaydeder, transkriptini (mutlak zaman damgalarıyla) ve özetini veritabanına yazar."""
+    part = f"{i+1}/{chunks}" if chunks else f"{i+1}"
+    # Akış halinde parça sayısı baştan bilinmez
+    position = {"chunk": i + 1, "chunks": chunks} if chunks else {"chunk": i + 1}
+    report.append(f"İşleniyor: {os.path.basename(segment['path'])}...")
+    progress(chunk_start, "transcribe", f"Parça {part} işleniyor", **position)
+
+    # DB Kayıt (Önce dosyayı kaydet)
+    record_id = save_chunk_to_db(segment["path"], video_id, url)
+
+    if not record_id:
+        report.append(f"  - DB Kayıt başarısız!")
+        return
+
+    report.append(f"  - Kaydedildi (ID: {record_id})")
+
+    # Transkript (zaman damgaları parçanın orijinal kayıttaki konumuna göre kaydırılır)
+    try:
+        full_text, transcript_text = format_transcript(transcripts.result(i), segment["start"])
+    except cancellation.RequestCancelled:
+        raise
+    except Exception as e:
+        report.append(f"  - Transkript hatası: {str(e)}")
+        return
+
+    progress(chunk_start + chunk_span * 0.8, "chunk_transcribed", f"Parça {part} yazıya döküldü",
+             text=transcript_text, **position)
+
+    # Özetleme (Yeni Özellik)
+    report.append(f"  - Özet çıkarılıyor (Llama 3.2)...")
+    summary_text = generate_summary(transcript_text)
+    progress(chunk_start + chunk_span, "summary", f"Parça {part} özeti hazır", **position)
+
+    # DB Güncelleme
+    success = update_transcript(record_id, full_text, summary_text, simple_text=transcript_text)
+    if success:
+        report.append(f"  - Transkript ve özet güncellendi.")
+    else:
+        report.append(f"  - DB güncelleme hatası.")
+
+def run_youtube_workflow(url: str, progress: ProgressReporter = None, token=None, backend: str = "") -> str:
+    """process_youtube_workflow'un işçi thread'inde çalışan gövdesi."""
+    progress = progress or ProgressReporter()
+    token = token or cancellation.CancelToken()
+
+    def download_hook(percent):
+        # yt-dlp kancadan fırlatılan hatada indirmeyi keser
+        token.check()
+        progress.download_hook(percent)
+
     temp_dir = "temp_downloads"
     os.makedirs(temp_dir, exist_ok=True)
 
     report = []
     file_path = None
     chunks = []
+    transcripts = None
+    segment_pipeline = None
 
     try:
-        # 1. İndir
-        report.append(f"İndiriliyor: {url}")
-        file_path, original_video_id, title = download_youtube_audio(url, temp_dir)
-        report.append(f"İndirildi: {title} ({file_path})")
-
-        # 2. Böl
-        chunks = split_media(file_path)
-        if len(chunks) > 1:
-            report.append(f"Dosya {len(chunks)} parçaya bölündü.")
-        else:
-            report.append("Bölünmesine gerek kalmadı.")
-
-        # 3. İşle
-        for i, chunk_path in enumerate(chunks):
-            chunk_name = os.path.basename(chunk_path)
-            part_suffix = f"_part{i+1}" if len(chunks) > 1 else ""
-            current_video_id = f"{original_video_id}{part_suffix}"
-
-            report.append(f"İşleniyor: {chunk_name}...")
-
-            # DB Kayıt (Önce dosyayı kaydet)
-            record_id = save_chunk_to_db(chunk_path, current_video_id, url)
-
-            if not record_id:
-                report.append(f"  - DB Kayıt başarısız!")
-                continue
-
-            report.append(f"  - Kaydedildi (ID: {record_id})")
-
-            # Transkript
-            transcript_text = transcribe_local(chunk_path, model_size="base")
-
-            if transcript_text.startswith("Hata") or transcript_text.startswith("Transkripsiyon hatası"):
-                 report.append(f"  - Transkript hatası: {transcript_text}")
-                 continue
-
-            # Özetleme (Yeni Özellik)
-            report.append(f"  - Özet çıkarılıyor (Llama 3.2)...")
-            summary_text = generate_summary(transcript_text)
-            
-            # DB Güncelleme
-            success = update_transcript(record_id, transcript_text, summary_text)
-            if success:
-                report.append(f"  - Transkript ve özet güncellendi.")
+        stream = None
+        if WORKFLOW_PIPELINE:
+            token.check()
+            stream = resolve_audio_stream(url)
+
+        if stream:
+            try:
+                # İndirme, çözme ve transkripsiyon üst üste çalışır: parçalar ses geldikçe havuza gönderilir
+                source, headers, original_video_id, title, duration = stream
+                report.append(f"Akış başlatıldı: {title}")
+                progress(0, "download", f"Akış başlatıldı: {title}")
+                # Süresi bilinen kısa kayıtlar, indirmeden sonraki yolda olduğu gibi bölünmez.
+                # Süre bilinmiyorsa (ör. canlı yayın) her zaman bölünür ki tampon sınırsız büyümesin.
+                split = not duration or duration > 300
+                transcripts = ChunkTranscription(model_size="base", token=token, backend=backend, parallel=True)
+                segment_pipeline = SegmentPipeline(token=token, on_segment=lambda segment: transcripts.add(segment["path"]))
+                segment_pipeline.start(stream_segments(source, temp_dir, original_video_id, headers, split=split, token=token,
+                                                       on_process=segment_pipeline.attach_process))
+                started = time.time()
+                for i, segment in enumerate(segment_pipeline):
+                    if i == 0:
+                        print(f"İlk parça {time.time() - started:.1f} sn'de hazır ({url})")
+                    token.check()
+                    part_suffix = f"_part{i+1}" if split else ""
+                    # Parça sayısı baştan bilinmediği için ilerleme işlenen ses süresine göre hesaplanır
+                    chunk_start = 5 + 90 * min(1.0, segment["start"] / duration) if duration else 5
+                    chunk_end = 5 + 90 * min(1.0, segment["end"] / duration) if duration else 95
+                    process_workflow_chunk(i, segment, f"{original_video_id}{part_suffix}", url, transcripts, report,
+                                           progress, chunk_start, chunk_end - chunk_start)
+                    chunks.append(segment["path"])
+                if not chunks:
+                    report.append("Kayıtta konuşma bulunamadı.")
+                else:
+                    report.append(f"Akış {len(chunks)} parça halinde işlendi.")
+            except StreamError as e:
+                if e.segments:
+                    # Yarıda kesilen akıştan eksik transkript kaydedilmez
+                    raise
+                # Akış hiç okunamadıysa (ör. adres reddedildi) dosya indirilerek devam edilir
+                print(f"Akış okunamadı, indirmeye geçiliyor ({url}): {e}")
+                report.append("Akış okunamadı, dosya indirilerek devam ediliyor.")
+                segment_pipeline.close()
+                transcripts.close()
+                segment_pipeline = transcripts = stream = None
+
+        if not stream:
+            # 1. İndir
+            report.append(f"İndiriliyor: {url}")
+            progress(0, "download", f"İndiriliyor: {url}")
+            file_path, original_video_id, title = download_youtube_audio(url, temp_dir, download_hook)
+            report.append(f"İndirildi: {title} ({file_path})")
+
+            # 2. Böl
+            token.check()
+            # Kesimler duraklamalara denk getirilir, uzun sessizlikler atlanır
+            segments = segment_media(file_path, token=token)
+            chunks = [segment["path"] for segment in segments]
+            if not chunks:
+                report.append("Kayıtta konuşma bulunamadı.")
+            elif len(chunks) > 1:
+                report.append(f"Dosya {len(chunks)} parçaya bölündü.")
             else:
-                report.append(f"  - DB güncelleme hatası.")
-
+                report.append("Bölünmesine gerek kalmadı.")
+            progress(25, "split", report[-1], chunks=len(chunks))
+
+            # 3. İşle
+            # Parçalar süreç havuzunda paralel yazıya dökülür; sonuçlar parça sırasıyla alınır
+            transcripts = ChunkTranscription(chunks, model_size="base", token=token, backend=backend)
+            for i, segment in enumerate(segments):
+                token.check()
+                part_suffix = f"_part{i+1}" if len(chunks) > 1 else ""
+                # Parçalar 25-95 aralığını paylaşır
+                process_workflow_chunk(i, segment, f"{original_video_id}{part_suffix}", url, transcripts, report,
+                                       progress, 25 + 70 * i / len(chunks), 70 / len(chunks), len(chunks))
+
+    except cancellation.RequestCancelled as e:
+        print(f"Workflow cancelled ({url}): {e}")
+        return "\n".join(report) + f"\nİptal edildi: {str(e)}"
     except Exception as e:
+        if token.cancelled:
+            # yt-dlp kancadan gelen iptali kendi hatasına sarar
+            return "\n".join(report) + f"\nİptal edildi: {token.reason}"
         traceback.print_exc()
         return "\n".join(report) + f"\nGenel Hata: {str(e)}"
     finally:
+        if segment_pipeline is not None:
+            # close() üreticinin bitmesini bekler; paths ancak bundan sonra tamdır
+            segment_pipeline.close()
+            chunks = segment_pipeline.paths
+        if transcripts is not None:
+            transcripts.close()
         # Temizlik
         if file_path and os.path.exists(file_path):
             try: os.remove(file_path)
             except: pass
 
-        if chunks and len(chunks) > 1:
-            for c in chunks:
-                if c and os.path.exists(c):
-                    try: os.remove(c)
-                    except: pass
+        for c in chunks:
+            if c and c != file_path and os.path.exists(c):
+                try: os.remove(c)
+                except: pass
 
         if os.path.exists(temp_dir) and not os.listdir(temp_dir):
             try: os.rmdir(temp_dir)
             except: pass
 
+    progress(100, "done", "İşlem tamamlandı.")
     return "\n".join(report)
 
 if __name__ == "__main__":
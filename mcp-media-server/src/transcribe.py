@@ -1,29 +1,318 @@
-import whisper
 import os
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+try:
+    import whisper
+except ImportError:
+    whisper = None
+try:
+    import faster_whisper
+except ImportError:
+    faster_whisper = None
 
-model_cache = {}
+WHISPER_PRELOAD_MODELS = os.getenv("WHISPER_PRELOAD_MODELS", "base")  # Sunucu açılırken yüklenecek modeller (virgülle ayrılmış)
+WHISPER_MODEL_BUDGET_MB = int(os.getenv("WHISPER_MODEL_BUDGET_MB", "4096"))  # Bellekte tutulan modellerin toplam üst sınırı
+WHISPER_WARMUP = os.getenv("WHISPER_WARMUP", "true").lower() == "true"
+TRANSCRIBE_BACKEND = os.getenv("TRANSCRIBE_BACKEND", "whisper")  # whisper veya faster-whisper
+FASTER_WHISPER_COMPUTE_TYPE = os.getenv("FASTER_WHISPER_COMPUTE_TYPE", "int8")
+FASTER_WHISPER_BATCH_SIZE = int(os.getenv("FASTER_WHISPER_BATCH_SIZE", "8"))  # 0 = toplu çözme kapalı
+FASTER_WHISPER_CPU_THREADS = int(os.getenv("FASTER_WHISPER_CPU_THREADS", "0"))  # 0 = CTranslate2 varsayılanı
 
-def get_model(model_size="base"):
+# Parametre sayıları (fp32, 4 byte); model yüklenmeden önce yer açmak için tahmin olarak kullanılır
+MODEL_PARAMS = {
+    "tiny": 39_000_000,
+    "base": 74_000_000,
+    "small": 244_000_000,
+    "medium": 769_000_000,
+    "large": 1_550_000_000,
+    "turbo": 809_000_000,
+}
+
+def estimate_model_bytes(model_size: str, bytes_per_param: int = 4) -> int:
+    base_size = model_size.split(".")[0].split("-")[0]
+    return MODEL_PARAMS.get(base_size, MODEL_PARAMS["large"]) * bytes_per_param
+
+class WhisperBackend:
+    """openai-whisper (PyTorch, fp32). Diğer backend'ler aynı arayüzü uygular."""
+
+    name = "whisper"
+    bytes_per_param = 4
+
+    def available(self) -> bool:
+        return whisper is not None
+
+    def load(self, model_size: str):
+        return whisper.load_model(model_size)
+
+    def transcribe_segments(self, model, audio) -> list[dict]:
+        """
+        audio bir dosya yolu veya 16 kHz float32 numpy dizisi olabilir.
+        {'start', 'end', 'text'} listesi döndürür (saniye, ses başına göre).
+        """
+        result = model.transcribe(audio, fp16=False)
+        return [{"start": s["start"], "end": s["end"], "text": s["text"]} for s in result["segments"]]
+
+    def transcribe(self, model, audio) -> str:
+        return "".join(segment["text"] for segment in self.transcribe_segments(model, audio))
+
+    def model_bytes(self, model, model_size: str = "") -> int:
+        """Modelin parametre ve buffer'larının bellekte kapladığı byte miktarı (ölçülemezse 0)."""
+        try:
+            tensors = list(model.parameters()) + list(model.buffers())
+            return sum(t.numel() * t.element_size() for t in tensors)
+        except Exception:
+            return 0
+
+class FasterWhisperBackend(WhisperBackend):
+    """
+    faster-whisper (CTranslate2). CPU'da int8 nicemlenmiş ağırlıklarla çalışır ve sesi VAD ile
+    bölüp parçaları toplu (batched) çözer. Çıktı, openai-whisper gibi segment metinlerinin birleşimidir.
+    """
+
+    name = "faster-whisper"
+
+    def __init__(self, compute_type: str = FASTER_WHISPER_COMPUTE_TYPE, batch_size: int = FASTER_WHISPER_BATCH_SIZE,
+                 cpu_threads: int = FASTER_WHISPER_CPU_THREADS):
+        self.compute_type = compute_type
+        self.batch_size = batch_size
+        self.cpu_threads = cpu_threads
+
+    @property
+    def bytes_per_param(self):
+        return {"int8": 1, "int8_float32": 1, "int8_float16": 1, "float16": 2}.get(self.compute_type, 4)
+
+    def available(self) -> bool:
+        return faster_whisper is not None
+
+    def load(self, model_size: str):
+        model = faster_whisper.WhisperModel(model_size, device="cpu", compute_type=self.compute_type,
+                                            cpu_threads=self.cpu_threads)
+        if self.batch_size > 0 and hasattr(faster_whisper, "BatchedInferencePipeline"):
+            return faster_whisper.BatchedInferencePipeline(model=model)
+        return model
+
+    def transcribe_segments(self, model, audio) -> list[dict]:
+        if isinstance(model, getattr(faster_whisper, "BatchedInferencePipeline", ())):
+            segments, _ = model.transcribe(audio, batch_size=self.batch_size)
+        else:
+            segments, _ = model.transcribe(audio)
+        # segments bir generator'dır; çözümleme tüketilirken yapılır
+        return [{"start": s.start, "end": s.end, "text": s.text} for s in segments]
+
+    def model_bytes(self, model, model_size: str = "") -> int:
+        # CTranslate2 bellek kullanımını raporlamaz; model boyutu ve nicemleme türünden tahmin edilir
+        return estimate_model_bytes(model_size, self.bytes_per_param)
+
+BACKENDS = {backend.name: backend for backend in (WhisperBackend(), FasterWhisperBackend())}
+_missing_warned = set()
+
+def get_backend(name: str = None) -> WhisperBackend:
+    """
+    İstenen backend'i döndürür (boşsa TRANSCRIBE_BACKEND). Kurulu olmayan backend istenirse
+    openai-whisper kullanılır.
+    """
+    name = (name or TRANSCRIBE_BACKEND).strip().lower().replace("_", "-")
+    if name not in BACKENDS:
+        raise ValueError(f"Bilinmeyen transkripsiyon backend'i: {name} (seçenekler: {', '.join(BACKENDS)})")
+    backend = BACKENDS[name]
+    if not backend.available():
+        if name not in _missing_warned:
+            _missing_warned.add(name)
+            print(f"{name} kurulu değil (pip install faster-whisper), whisper kullanılıyor.")
+        return BACKENDS["whisper"]
+    return backend
+
+def set_cpu_threads(threads: int):
+    """Süreç havuzu işçilerinde CTranslate2 thread sayısını sınırlar."""
+    BACKENDS["faster-whisper"].cpu_threads = threads
+
+class ModelManager:
+    """
+    Whisper modellerini (backend ve boyut başına) yükler ve bellek bütçesi içinde tutar.
+    Bütçe aşılınca en uzun süredir kullanılmayan boştaki model önbellekten çıkarılır. use() ile kullanılan
+    modeller çıkarılmaz ve bütçeye sayılmaya devam eder; yalnızca kullanımdaki modeller bütçeyi aşıyorsa
+    yeni model yine yüklenir ve bütçe onlar bitene kadar aşılır. Aynı model eşzamanlı isteklerde bir kez yüklenir.
+    """
+
+    def __init__(self, budget_bytes: int = WHISPER_MODEL_BUDGET_MB * 1024 * 1024, warmup: bool = WHISPER_WARMUP):
+        self.budget_bytes = budget_bytes
+        self.warmup = warmup
+        self._models = OrderedDict()  # "backend:model_size" -> {'model', 'bytes', 'load_seconds', ...}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.evictions = 0
+
+    def get(self, model_size: str = "base", backend: WhisperBackend = None):
+        """Modeli yükler veya önbellekten döndürür; kullanım süresi izlenmez (ör. önceden yükleme)."""
+        return self._entry(model_size, backend, acquire=False)["model"]
+
+    @contextmanager
+    def use(self, model_size: str = "base", backend: WhisperBackend = None):
+        """Modeli blok boyunca kullanımda işaretler; bu sürede LRU ile çıkarılmaz."""
+        entry = self._entry(model_size, backend, acquire=True)
+        try:
+            yield entry["model"]
+        finally:
+            with self._lock:
+                entry["users"] -= 1
+                self._evict(0)
+
+    def _entry(self, model_size, backend, acquire):
+        backend = backend or get_backend()
+        key = f"{backend.name}:{model_size}"
+        with self._lock:
+            entry = self._touch(key, acquire)
+            if entry:
+                return entry
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                entry = self._touch(key, acquire)
+                if entry:
+                    return entry
+                # Yeni model sığsın diye yer önceden açılır (kullanımdaki modeller hariç)
+                self._evict(estimate_model_bytes(model_size, backend.bytes_per_param))
+
+            entry = self._load(model_size, backend)
+            with self._lock:
+                entry["users"] += int(acquire)
+                self._models[key] = entry
+                self._evict(0, keep=key)
+            return entry
+
+    def preload(self, model_sizes, backend: WhisperBackend = None):
+        for model_size in model_sizes:
+            try:
+                self.get(model_size, backend)
+            except Exception as e:
+                print(f"Model önceden yüklenemedi ({model_size}): {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            models = {
+                key: {field: value for field, value in entry.items() if field != "model"}
+                for key, entry in self._models.items()
+            }
+        return {
+            "models": models,
+            "resident_bytes": sum(entry["bytes"] for entry in models.values()),
+            "budget_bytes": self.budget_bytes,
+            "evictions": self.evictions,
+        }
+
+    def _touch(self, key, acquire=False):
+        # Lock tutulurken çağrılır
+        entry = self._models.get(key)
+        if entry:
+            self._models.move_to_end(key)
+            entry["last_used"] = time.time()
+            entry["hits"] += 1
+            entry["users"] += int(acquire)
+        return entry
+
+    def _evict(self, incoming_bytes: int, keep: str = None):
+        # Lock tutulurken çağrılır; kullanımdaki modeller ve keep (yeni yüklenen, yoksa en son kullanılan) çıkarılmaz
+        if keep is None and not incoming_bytes and self._models:
+            keep = next(reversed(self._models))
+        while True:
+            resident = sum(entry["bytes"] for entry in self._models.values())
+            if resident + incoming_bytes <= self.budget_bytes:
+                return
+            key = next((key for key, entry in self._models.items() if not entry["users"] and key != keep), None)
+            if key is None:
+                return
+            entry = self._models.pop(key)
+            self.evictions += 1
+            print(f"Model bellekten çıkarıldı (LRU): {key} ({entry['bytes'] // (1024 * 1024)} MB)")
+
+    def _load(self, model_size, backend):
+        print(f"Model yükleniyor: {model_size} ({backend.name}) (Bu işlem ilk seferde biraz sürebilir)...")
+        started = time.time()
+        model = backend.load(model_size)
+        load_seconds = time.time() - started
+
+        warmup_seconds = None
+        if self.warmup:
+            # İlk gerçek istekteki gecikmeyi önlemek için bir saniyelik sessizlik işlenir
+            started = time.time()
+            try:
+                import numpy as np
+                backend.transcribe(model, np.zeros(16000, dtype=np.float32))
+                warmup_seconds = round(time.time() - started, 2)
+            except Exception as e:
+                print(f"Model ısıtma hatası ({model_size}): {e}")
+
+        size = backend.model_bytes(model, model_size) or estimate_model_bytes(model_size, backend.bytes_per_param)
+        print(f"Model hazır: {model_size} ({backend.name}, {size // (1024 * 1024)} MB, yükleme {load_seconds:.1f} sn)")
+        return {
+            "model": model,
+            "backend": backend.name,
+            "model_size": model_size,
+            "bytes": size,
+            "load_seconds": round(load_seconds, 2),
+            "warmup_seconds": warmup_seconds,
+            "loaded_at": time.time(),
+            "last_used": time.time(),
+            "hits": 0,
+            "users": 0,
+        }
+
+model_manager = ModelManager()
+
+def preload_models():
+    """WHISPER_PRELOAD_MODELS içindeki modelleri yükler ve ısıtır."""
+    model_sizes = [size.strip() for size in WHISPER_PRELOAD_MODELS.split(",") if size.strip()]
+    model_manager.preload(model_sizes)
+
+def get_model(model_size="base", backend: str = None):
     """İstenen Whisper modelini yükler veya önbellekten getirir."""
-    if model_size not in model_cache:
-        print(f"Model yükleniyor: {model_size} (Bu işlem ilk seferde biraz sürebilir)...")
-        model_cache[model_size] = whisper.load_model(model_size)
-    return model_cache[model_size]
+    return model_manager.get(model_size, get_backend(backend))
+
+def transcribe_segments(file_path: str, model_size: str = "base", backend: str = None) -> list[dict]:
+    """Dosyayı yazıya döker ve zaman damgalı segmentleri döndürür; hata olursa exception fırlatır."""
+    engine = get_backend(backend)
+    with model_manager.use(model_size, engine) as model:
+        return engine.transcribe_segments(model, file_path)
+
+def format_timestamp(seconds: float) -> str:
+    """Saniyeyi ana uygulamadaki gibi mm:ss veya hh:mm:ss biçimine çevirir."""
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+    if hours > 0:
+        return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+    return f"{minutes:02d}:{secs:02d}"
+
+def format_transcript(segments, offset: float = 0.0) -> tuple[str, str]:
+    """
+    Segmentleri offset kadar kaydırarak (parçanın orijinal kayıttaki başlangıcı) birleştirir.
+    ('[mm:ss] metin' satırları, düz metin) döndürür.
+    """
+    lines = []
+    texts = []
+    for segment in segments:
+        text = segment["text"].strip()
+        if text:
+            lines.append(f"[{format_timestamp(offset + segment['start'])}] {text}")
+            texts.append(text)
+    return "\n".join(lines), " ".join(texts)
 
-def transcribe_local(file_path: str, model_size: str = "base") -> str:
+def transcribe_local(file_path: str, model_size: str = "base", backend: str = None) -> str:
     """
     Yerel bir ses dosyasını (mp3, wav, m4a) Whisper kullanarak metne çevirir.
 
     Args:
         file_path: Ses dosyasının tam dosya yolu.
         model_size: Model boyutu ('tiny', 'base', 'small', 'medium', 'large'). Varsayılan 'base'.
+        backend: 'whisper' veya 'faster-whisper'. Boşsa TRANSCRIBE_BACKEND kullanılır.
     """
     if not os.path.exists(file_path):
         return f"Hata: Dosya bulunamadı -> {file_path}"
 
     try:
-        model = get_model(model_size)
-        result = model.transcribe(file_path, fp16=False)
-        return result["text"]
+        return "".join(segment["text"] for segment in transcribe_segments(file_path, model_size, backend))
     except Exception as e:
         return f"Transkripsiyon hatası: {str(e)}"
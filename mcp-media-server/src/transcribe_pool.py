@@ -0,0 +1,151 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+try:
+    from .transcribe import transcribe_segments, get_model, set_cpu_threads
+except ImportError:
+    from transcribe import transcribe_segments, get_model, set_cpu_threads
+
+# Uzun kayıtların parçaları ayrı süreçlerde paralel yazıya dökülür.
+# Her işçi süreç modelini bir kez yükler ve sunucu açık kaldıkça yeniden kullanır.
+# İşçiler bellek paylaşmaz: her birinin kendi model yöneticisi ve WHISPER_MODEL_BUDGET_MB bütçesi vardır,
+# yani modellerin toplam bellek kullanımı işçi sayısı x bütçeye (artı sunucu sürecindeki modeller) kadar çıkabilir.
+
+WHISPER_THREADS_PER_WORKER = int(os.getenv("WHISPER_THREADS_PER_WORKER", "2"))
+WHISPER_WORKERS = os.getenv("WHISPER_WORKERS", "auto")  # auto = çekirdek sayısı / işçi başına thread, 1 = süreç havuzu kapalı
+WHISPER_POOL_MODEL = os.getenv("WHISPER_POOL_MODEL", "base")  # İşçiler açılırken önceden yüklenen model
+RESULT_POLL_INTERVAL = 0.5
+
+def worker_count() -> int:
+    if WHISPER_WORKERS.strip().lower() == "auto":
+        return max(1, (os.cpu_count() or 1) // max(1, WHISPER_THREADS_PER_WORKER))
+    return max(1, int(WHISPER_WORKERS))
+
+def _init_worker(threads: int, model_size: str):
+    # Süreçler aynı çekirdekler için yarışmasın diye her işçinin thread sayısı sınırlanır
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    set_cpu_threads(threads)
+    if model_size:
+        get_model(model_size)
+
+def _transcribe_chunk(file_path: str, model_size: str, backend: str) -> list[dict]:
+    return transcribe_segments(file_path, model_size=model_size, backend=backend)
+
+_executor = None
+_lock = threading.Lock()
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            workers = worker_count()
+            print(f"Whisper süreç havuzu başlatılıyor: {workers} işçi x {WHISPER_THREADS_PER_WORKER} thread")
+            # fork, sunucunun thread'leri ve torch ile güvenli değil
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(WHISPER_THREADS_PER_WORKER, WHISPER_POOL_MODEL)
+            )
+        return _executor
+
+def _reset_executor(broken):
+    global _executor
+    with _lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+def shutdown():
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def _wait(future, token):
+    while True:
+        if token is not None:
+            token.check()
+        try:
+            return future.result(timeout=RESULT_POLL_INTERVAL)
+        except FutureTimeout:
+            continue
+
+class ChunkTranscription:
+    """
+    Bir kaydın parçalarını yazıya döker; result(i) i. parçanın zaman damgalı segmentlerini döndürür
+    (transkripsiyon hatası exception olarak fırlatılır).
+    Süreç havuzu kullanılıyorsa her parça eklendiği anda havuza gönderilir; çağıran taraf bir parçanın
+    sonucunu beklerken sonrakiler diğer çekirdeklerde işlenir. Aksi halde parça result() çağrıldığında
+    bu süreçte işlenir. Parçalar baştan verilebilir veya akış halinde add() ile eklenebilir (parallel=True).
+    close() (ör. iptalde) henüz başlamamış parçaları iptal eder; çalışmakta olan parçalar yarıda kesilemez.
+    add() üretici thread'den, result() ise tüketici thread'den çağrılabilir; havuz durumu kilitle korunur.
+    """
+
+    def __init__(self, paths=(), model_size: str = "base", token=None, backend: str = None, parallel: bool = None):
+        paths = list(paths)
+        self.paths = []
+        self.model_size = model_size
+        self.token = token
+        self.backend = backend
+        self.futures = {}
+        self._lock = threading.Lock()
+        if parallel is None:
+            parallel = len(paths) > 1
+        self.executor = _get_executor() if parallel and worker_count() > 1 else None
+        for path in paths:
+            self.add(path)
+
+    def add(self, path: str) -> int:
+        with self._lock:
+            index = len(self.paths)
+            self.paths.append(path)
+            executor = self.executor
+            if executor is None:
+                return index
+            try:
+                self.futures[index] = executor.submit(_transcribe_chunk, path, self.model_size, self.backend)
+                return index
+            except BrokenProcessPool:
+                pass
+        self._pool_failed(executor)
+        return index
+
+    def result(self, index: int) -> list[dict]:
+        with self._lock:
+            future = self.futures.get(index)
+            executor = self.executor
+            path = self.paths[index]
+        if future is not None:
+            try:
+                return _wait(future, self.token)
+            except BrokenProcessPool:
+                self._pool_failed(executor)
+        if self.token is not None:
+            self.token.check()
+        return transcribe_segments(path, model_size=self.model_size, backend=self.backend)
+
+    def close(self):
+        with self._lock:
+            futures = list(self.futures.values())
+        for future in futures:
+            future.cancel()
+
+    def _pool_failed(self, executor):
+        # Bir işçi çöktüyse (ör. bellek yetmedi) havuz yenilenir, kalan parçalar bu süreçte işlenir.
+        # Çöküşü add() ve result() aynı anda görebilir; havuzu yalnızca ilk gören bırakır.
+        with self._lock:
+            if executor is None or self.executor is not executor:
+                return
+            self.executor = None
+            self.futures = {}
+        print("Whisper süreç havuzu çöktü, kalan parçalar tek süreçte işleniyor.")
+        _reset_executor(executor)
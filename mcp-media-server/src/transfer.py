@@ -0,0 +1,84 @@
+import os
+import time
+import uuid
+import base64
+import shutil
+import tempfile
+
+# MCP araçları üzerinden gelen base64 verinin dosyaya aktarımı ve dönüştürülen dosyaların parça parça indirilmesi.
+# Base64 bloklar halinde çözülür; çözülmüş içerik hiçbir zaman bellekte tek parça olarak tutulmaz.
+
+# Base64 is decoded in blocks of this many characters (multiple of 4), so the decoded bytes never exist in memory all at once
+BASE64_DECODE_BLOCK = 4 * 256 * 1024
+
+def decode_base64_to_file(data: str, out_file):
+    """Decodes a base64 string into an open binary file block by block and returns the number of bytes written."""
+    written = 0
+    for start in range(0, len(data), BASE64_DECODE_BLOCK):
+        block = base64.b64decode(data[start:start + BASE64_DECODE_BLOCK])
+        out_file.write(block)
+        written += len(block)
+    return written
+
+def write_base64_temp(data: str, filename: str) -> str:
+    """Streams base64 data into a temporary file with filename's extension and returns its path."""
+    suffix = os.path.splitext(os.path.basename(filename or ""))[1]
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp:
+        temp_path = temp.name
+        try:
+            decode_base64_to_file(data, temp)
+        except Exception:
+            temp.close()
+            os.unlink(temp_path)
+            raise
+    return temp_path
+
+# Converted outputs are kept here and fetched with download_chunk
+DOWNLOAD_DIR = os.path.join(tempfile.gettempdir(), "mcp_downloads")
+os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+DOWNLOAD_TTL = int(os.getenv("DOWNLOAD_TTL", "3600"))
+DOWNLOAD_MAX_CHUNK = 8 * 1024 * 1024
+_last_download_cleanup = 0.0
+
+def cleanup_stale_downloads():
+    """Removes download handles older than DOWNLOAD_TTL seconds that were never released (at most once a minute)."""
+    global _last_download_cleanup
+    now = time.time()
+    if now - _last_download_cleanup < 60:
+        return
+    _last_download_cleanup = now
+    for entry in os.scandir(DOWNLOAD_DIR):
+        try:
+            if entry.is_file() and now - entry.stat().st_mtime > DOWNLOAD_TTL:
+                os.unlink(entry.path)
+        except OSError:
+            pass
+
+def register_download(output_path: str) -> dict:
+    """
+    Moves a produced file into DOWNLOAD_DIR and returns {"type": "download", "handle", "size"}.
+    The "type" field lets clients tell a handle apart from an inline base64 result.
+    """
+    cleanup_stale_downloads()
+    _, ext = os.path.splitext(output_path)
+    handle = f"{uuid.uuid4().hex}{ext}"
+    download_path = os.path.join(DOWNLOAD_DIR, handle)
+    shutil.move(output_path, download_path)
+    return {"type": "download", "handle": handle, "size": os.path.getsize(download_path)}
+
+def download_path_for(handle: str) -> str:
+    safe_handle = os.path.basename(handle or "")
+    path = os.path.join(DOWNLOAD_DIR, safe_handle)
+    if not safe_handle or not os.path.isfile(path):
+        raise FileNotFoundError(f"Unknown download handle: {handle}")
+    return path
+
+def read_download(handle: str, offset: int, length: int) -> bytes:
+    """Reads up to 'length' bytes (at most DOWNLOAD_MAX_CHUNK) of a registered file starting at 'offset'."""
+    length = max(0, min(int(length), DOWNLOAD_MAX_CHUNK))
+    with open(download_path_for(handle), "rb") as f:
+        f.seek(int(offset))
+        return f.read(length)
+
+def delete_download(handle: str):
+    os.unlink(download_path_for(handle))
@@ -1,251 +1,1031 @@
 import asyncio
+import atexit
 import base64
+import concurrent.futures
+import hashlib
+import json
 import os
 import math
+import random
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
 import uuid
+from collections import deque
+import anyio
+import httpx
 from mcp import ClientSession
 from mcp.client.sse import sse_client
 
 MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "https://ertugrulerata-mcp-media-server.hf.space/sse")
-CHUNK_SIZE = 1 * 1024 * 1024  # 1MB chunks
+CHUNK_SIZE = 1 * 1024 * 1024  # 1MB chunks (initial size before throughput is measured)
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 8 * 1024 * 1024
+MCP_UPLOAD_WINDOW = int(os.getenv("MCP_UPLOAD_WINDOW", "4"))  # Chunks in flight
+MCP_UPLOAD_RETRIES = int(os.getenv("MCP_UPLOAD_RETRIES", "3"))  # Retries per chunk
+UPLOAD_TARGET_SECONDS = 2.0  # Aim for chunks that take about this long to send
+MCP_DOWNLOAD_CHUNK_SIZE = int(os.getenv("MCP_DOWNLOAD_CHUNK_SIZE", str(2 * 1024 * 1024)))  # Ranged download size
+MCP_DOWNLOAD_PREFETCH = int(os.getenv("MCP_DOWNLOAD_PREFETCH", "2"))  # Download chunks requested ahead
 
-async def check_connection_async():
+# Transcription uploads are re-encoded locally to 16 kHz mono audio (what Whisper uses) before sending
+MCP_PRECOMPRESS = os.getenv("MCP_PRECOMPRESS", "auto").lower()  # auto (if ffmpeg is installed) | on | off
+MCP_PRECOMPRESS_FORMAT = os.getenv("MCP_PRECOMPRESS_FORMAT", "opus").lower()  # opus | flac
+MCP_PRECOMPRESS_BITRATE = os.getenv("MCP_PRECOMPRESS_BITRATE", "32k")  # Opus only
+MCP_PRECOMPRESS_MIN_BYTES = int(os.getenv("MCP_PRECOMPRESS_MIN_BYTES", str(1024 * 1024)))  # Smaller files are sent as-is
+MCP_PRECOMPRESS_TIMEOUT = float(os.getenv("MCP_PRECOMPRESS_TIMEOUT", "600"))
+
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "4"))  # Max concurrent sessions / tool calls
+MCP_KEEPALIVE_INTERVAL = float(os.getenv("MCP_KEEPALIVE_INTERVAL", "30"))  # Ping idle sessions this often
+MCP_CONNECT_TIMEOUT = float(os.getenv("MCP_CONNECT_TIMEOUT", "30"))
+MCP_READ_TIMEOUT = float(os.getenv("MCP_READ_TIMEOUT", "3600"))  # Long uploads / processing
+MCP_HEALTH_INTERVAL = float(os.getenv("MCP_HEALTH_INTERVAL", "15"))  # Background probe interval
+CANCEL_POLL_INTERVAL = 0.5  # How often a waiting caller checks its cancel event
+
+class MCPToolError(Exception):
+    """Raised when an MCP tool returns an error message instead of a result."""
+
+class RequestCancelled(Exception):
+    """Raised when the caller cancels a call or its deadline passes."""
+
+# Errors that mean the SSE stream itself is gone (mcp raises these from anyio streams and httpx)
+CONNECTION_ERRORS = (OSError, EOFError, asyncio.TimeoutError, anyio.ClosedResourceError, anyio.BrokenResourceError,
+                     anyio.EndOfStream, httpx.TransportError)
+
+def _is_connection_error(error) -> bool:
+    """
+    True when error (or an error it wraps) is a transport failure. Tool errors, protocol errors the
+    server answered with and cancellations leave the session usable. A request that got no answer
+    within the read timeout (McpError 408) is treated as a dead connection.
+    """
+    seen = set()
+    pending = [error]
+    while pending:
+        error = pending.pop()
+        if error is None or id(error) in seen:
+            continue
+        seen.add(id(error))
+        if isinstance(error, CONNECTION_ERRORS):
+            return True
+        if getattr(getattr(error, "error", None), "code", None) == httpx.codes.REQUEST_TIMEOUT:
+            return True
+        pending.extend(getattr(error, "exceptions", ()))  # ExceptionGroup from anyio task groups
+        pending.extend((error.__cause__, error.__context__))
+    return False
+
+class _PooledSession:
+    def __init__(self, session: ClientSession, init_result, close_event: asyncio.Event):
+        self.session = session
+        self.init_result = init_result
+        self.close_event = close_event
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.closed = False
+        self.broken = False
+
+class ServerCapabilities:
+    """Tool names and server identity discovered once per server, used to pick the upload transport."""
+
+    def __init__(self, tool_names, server_name: str = None, server_version: str = None):
+        self.tools = frozenset(tool_names)
+        self.server_name = server_name
+        self.server_version = server_version
+        self.fetched = time.time()
+
+    def has(self, *names) -> bool:
+        return all(name in self.tools for name in names)
+
+    def transport(self) -> str:
+        """Best way to get a file to the server: 'blob' (skip known content), 'chunked' or 'legacy' (single base64 call)."""
+        if self.has("upload_chunk", "has_blob", "commit_blob"):
+            return "blob"
+        if self.has("upload_chunk"):
+            return "chunked"
+        return "legacy"
+
+    def to_dict(self) -> dict:
+        return {
+            'server_name': self.server_name,
+            'server_version': self.server_version,
+            'transport': self.transport(),
+            'tools': sorted(self.tools),
+            'fetched': self.fetched
+        }
+
+class MCPSessionPool:
+    """
+    Keeps initialized ClientSessions alive on a single background event loop thread.
+    Sync callers submit coroutines with run(); each call borrows a session, so the SSE
+    connect + initialize handshake is paid once per session instead of once per call.
+    Idle sessions are pinged periodically and replaced when they fail.
+    """
+
+    def __init__(self, url: str, max_sessions: int = MCP_POOL_SIZE,
+                 keepalive_interval: float = MCP_KEEPALIVE_INTERVAL):
+        self.url = url
+        self.max_sessions = max_sessions
+        self.keepalive_interval = keepalive_interval
+        self._loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._semaphore = None
+        self._idle = []
+        self._all = set()
+        self.connects = 0
+        self.on_call_result = None  # Callback(latency, error) for every finished call
+        self._capabilities = None
+        self._capabilities_lock = None
+        self._server_key = None  # (name, version) from the last initialize()
+        self._connection_lost = False
+        self.capability_refreshes = 0
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop:
+                return self._loop
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+
+            def run_loop():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(started.set)
+                loop.run_forever()
+
+            self._thread = threading.Thread(target=run_loop, name="mcp-client-loop", daemon=True)
+            self._thread.start()
+            started.wait()
+            self._loop = loop
+            asyncio.run_coroutine_threadsafe(self._setup(), loop).result()
+            return loop
+
+    async def _setup(self):
+        self._semaphore = asyncio.Semaphore(self.max_sessions)
+        self._capabilities_lock = asyncio.Lock()
+        if self.keepalive_interval:
+            asyncio.create_task(self._keepalive())
+
+    def submit(self, fn):
+        """Schedules fn(session) on the background loop and returns a concurrent Future."""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._with_session(fn), loop)
+
+    def run(self, fn, timeout: float = None, cancel_event: threading.Event = None):
+        """
+        Runs the coroutine function fn(session) on a pooled session and waits for its result.
+        Raises RequestCancelled (and cancels the call) when timeout passes or cancel_event is set.
+        """
+        future = self.submit(fn)
+        end = time.monotonic() + timeout if timeout is not None else None
+        try:
+            while True:
+                wait = CANCEL_POLL_INTERVAL if cancel_event is not None else None
+                if end is not None:
+                    remaining = max(0, end - time.monotonic())
+                    wait = remaining if wait is None else min(wait, remaining)
+                try:
+                    return future.result(wait)
+                except concurrent.futures.TimeoutError:
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise RequestCancelled("Request cancelled by the caller")
+                    if end is not None and time.monotonic() >= end:
+                        raise RequestCancelled("Request deadline exceeded")
+        except BaseException:
+            future.cancel()
+            raise
+
+    async def _with_session(self, fn):
+        async with self._semaphore:
+            conn = await self._acquire()
+            start = time.monotonic()
+            try:
+                result = await fn(conn.session)
+                self._report(time.monotonic() - start, None)
+                return result
+            except BaseException as e:
+                if _is_connection_error(e):
+                    # The stream is gone; don't hand the session out again and re-discover tools on reconnect
+                    conn.broken = True
+                    self._connection_lost = True
+                if not isinstance(e, asyncio.CancelledError):
+                    self._report(time.monotonic() - start, e)
+                raise
+            finally:
+                self._release(conn)
+
+    def _report(self, latency, error):
+        if self.on_call_result:
+            try:
+                self.on_call_result(latency, error)
+            except Exception as e:
+                print(f"MCP call result callback failed: {e}")
+
+    async def _acquire(self) -> _PooledSession:
+        while self._idle:
+            conn = self._idle.pop()
+            if conn.closed:
+                continue
+            if time.monotonic() - conn.last_used > self.keepalive_interval:
+                if not await self._ping(conn):
+                    continue
+            return conn
+        return await self._connect()
+
+    def _release(self, conn: _PooledSession):
+        conn.last_used = time.monotonic()
+        if conn.broken or conn.closed:
+            self._close(conn)
+        else:
+            self._idle.append(conn)
+
+    async def _connect(self) -> _PooledSession:
+        ready = asyncio.get_running_loop().create_future()
+        asyncio.create_task(self._connection_main(ready))
+        conn = await asyncio.wait_for(ready, MCP_CONNECT_TIMEOUT)
+        self.connects += 1
+
+        # Re-discover tools on the first connection after a failure or when the server identity changed
+        server_info = getattr(conn.init_result, "serverInfo", None)
+        server_key = (getattr(server_info, "name", None), getattr(server_info, "version", None))
+        if self._connection_lost or server_key != self._server_key:
+            self._capabilities = None
+        self._server_key = server_key
+        self._connection_lost = False
+        return conn
+
+    async def capabilities(self, session: ClientSession, refresh: bool = False) -> ServerCapabilities:
+        """
+        Returns the cached tool list of the server, calling list_tools only when nothing is cached,
+        after a reconnect that invalidated it, or when refresh is requested (tool-not-found).
+        """
+        async with self._capabilities_lock:
+            if refresh or self._capabilities is None:
+                tools_result = await session.list_tools()
+                name, version = self._server_key or (None, None)
+                self._capabilities = ServerCapabilities([t.name for t in tools_result.tools], name, version)
+                self.capability_refreshes += 1
+                print(f"MCP server capabilities: {self._capabilities.transport()} transport, {len(self._capabilities.tools)} tools")
+            return self._capabilities
+
+    async def _connection_main(self, ready):
+        # The SSE transport and session context managers must be entered and exited in the
+        # same task, so each pooled connection lives in its own long-running task.
+        conn = None
+        try:
+            print(f"Connecting to MCP Server: {self.url}")
+            async with sse_client(self.url, timeout=MCP_CONNECT_TIMEOUT, sse_read_timeout=MCP_READ_TIMEOUT) as (read, write):
+                async with ClientSession(read, write) as session:
+                    init_result = await session.initialize()
+                    conn = _PooledSession(session, init_result, asyncio.Event())
+                    self._all.add(conn)
+                    if ready.done():
+                        return  # Caller gave up waiting
+                    ready.set_result(conn)
+                    await conn.close_event.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                print(f"MCP session closed: {e}")
+        finally:
+            if conn:
+                conn.closed = True
+                self._all.discard(conn)
+
+    def _close(self, conn: _PooledSession):
+        conn.closed = True
+        conn.close_event.set()
+
+    async def _ping(self, conn: _PooledSession) -> bool:
+        try:
+            await asyncio.wait_for(conn.session.send_ping(), 10)
+            conn.last_used = time.monotonic()
+            return True
+        except Exception as e:
+            print(f"MCP keepalive ping failed, reconnecting: {e}")
+            self._connection_lost = True
+            self._close(conn)
+            return False
+
+    async def _keepalive(self):
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            now = time.monotonic()
+            stale = [c for c in self._idle if now - c.last_used >= self.keepalive_interval]
+            for conn in stale:
+                if conn in self._idle:
+                    self._idle.remove(conn)
+                    if await self._ping(conn):
+                        self._idle.append(conn)
+
+    def close(self):
+        """Closes all sessions (called at interpreter exit)."""
+        if not self._loop:
+            return
+
+        async def close_all():
+            for conn in list(self._all):
+                self._close(conn)
+            self._idle.clear()
+            await asyncio.sleep(0.1)
+
+        try:
+            asyncio.run_coroutine_threadsafe(close_all(), self._loop).result(2)
+        except Exception:
+            pass
+
+    def saturated(self) -> bool:
+        return len(self._all) >= self.max_sessions and not self._idle
+
+    def stats(self) -> dict:
+        return {
+            'url': self.url,
+            'max_sessions': self.max_sessions,
+            'open_sessions': len(self._all),
+            'idle_sessions': len(self._idle),
+            'connects': self.connects,
+            'capability_refreshes': self.capability_refreshes,
+            'capabilities': self._capabilities.to_dict() if self._capabilities else None
+        }
+
+def _percentiles(samples) -> dict:
+    if not samples:
+        return {'p50': None, 'p95': None, 'p99': None}
+    ordered = sorted(samples)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+
+    return {'p50': pick(0.50), 'p95': pick(0.95), 'p99': pick(0.99)}
+
+class HealthMonitor:
+    """
+    Probes the MCP server in the background and keeps the last known status, so health
+    checks return a cached snapshot instead of opening a session per request.
+    Successful tool calls count as health signals and postpone the next probe.
+    """
+
+    def __init__(self, pool: MCPSessionPool, interval: float = MCP_HEALTH_INTERVAL, window: int = 100):
+        self.pool = pool
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._thread = None
+        self._first_probe = threading.Event()
+        self.connected = False
+        self.last_checked = None
+        self.last_success = None
+        self.last_error = None
+        self.last_error_at = None
+        self.consecutive_failures = 0
+        self._ping_latencies = deque(maxlen=window)
+        self._call_latencies = deque(maxlen=window)
+        pool.on_call_result = self.record_call
+
+    def start(self):
+        with self._lock:
+            if self._thread:
+                return
+            self._thread = threading.Thread(target=self._run, name="mcp-health-probe", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                recent_success = self.last_success and time.time() - self.last_success < self.interval
+            # When every session is busy with a long call, a ping would just queue behind them
+            if not recent_success and not self.pool.saturated():
+                self.probe()
+            self._first_probe.set()
+            time.sleep(self.interval)
+
+    def probe(self):
+        start = time.monotonic()
+        try:
+            self.pool.run(check_connection_async, timeout=5)
+            latency = time.monotonic() - start
+            with self._lock:
+                self._ping_latencies.append(latency)
+                self._mark_ok()
+        except Exception as e:
+            print(f"MCP Connection Check Failed: {e}")
+            with self._lock:
+                self.connected = False
+                self.consecutive_failures += 1
+                self.last_error = str(e) or type(e).__name__
+                self.last_error_at = time.time()
+                self.last_checked = time.time()
+
+    def record_call(self, latency, error):
+        """Called by the pool when a tool call finishes."""
+        with self._lock:
+            if error is None:
+                self._call_latencies.append(latency)
+                self._mark_ok()
+            else:
+                # A failed call doesn't prove the server is down; the next probe decides
+                self.last_error = str(error) or type(error).__name__
+                self.last_error_at = time.time()
+
+    def _mark_ok(self):
+        # Lock must be held
+        self.connected = True
+        self.consecutive_failures = 0
+        self.last_checked = self.last_success = time.time()
+
+    def snapshot(self, wait_first: float = 5) -> dict:
+        self.start()
+        # Only the very first request waits, and only until the first probe finishes
+        self._first_probe.wait(wait_first)
+        with self._lock:
+            return {
+                'status': 'connected' if self.connected else 'disconnected',
+                'connected': self.connected,
+                'last_checked': self.last_checked,
+                'last_success': self.last_success,
+                'last_error': self.last_error,
+                'last_error_at': self.last_error_at,
+                'consecutive_failures': self.consecutive_failures,
+                'ping_latency_ms': _percentiles(self._ping_latencies),
+                'call_latency_ms': _percentiles(self._call_latencies),
+                'pool': self.pool.stats()
+            }
+
+_pool = MCPSessionPool(MCP_SERVER_URL)
+atexit.register(_pool.close)
+_health = HealthMonitor(_pool)
+
+def get_pool_stats() -> dict:
+    return {**_pool.stats(), "precompress": precompress_stats()}
+
+async def check_connection_async(session: ClientSession):
     """
     Checks if the MCP server is reachable.
     """
+    await session.send_ping()
+    return True
+
+def get_health_snapshot() -> dict:
+    """
+    Returns the cached MCP health status collected by the background prober.
+    """
+    return _health.snapshot()
+
+def check_connection():
+    """
+    Returns the last known connection status (no network round trip).
+    """
+    return _health.snapshot()['connected']
+
+_upload_throughput = None  # Bytes/sec EWMA measured over previous uploads
+
+def _choose_chunk_size() -> int:
+    """
+    Picks a chunk size from the measured upload throughput.
+    The size is fixed for a single upload because it is part of the upload_id used for resuming.
+    """
+    if not _upload_throughput:
+        return CHUNK_SIZE
+    size = int(_upload_throughput * UPLOAD_TARGET_SECONDS)
+    size = max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, size))
+    return size - size % (64 * 1024)
+
+def _record_upload_throughput(sent_bytes: int, elapsed: float):
+    global _upload_throughput
+    if sent_bytes < MIN_CHUNK_SIZE or elapsed <= 0:
+        return
+    measured = sent_bytes / elapsed
+    _upload_throughput = measured if _upload_throughput is None else 0.7 * _upload_throughput + 0.3 * measured
+
+def _file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _result_text(result) -> str:
+    text = ""
+    if result.content:
+        for content in result.content:
+            if content.type == 'text':
+                text += content.text
+    return text
+
+def _checked_text(result) -> str:
+    """Text of a tool result; raises MCPToolError when the tool reported an error."""
+    text = _result_text(result)
+    if getattr(result, "isError", False) or text.startswith("Error"):
+        raise MCPToolError(text)
+    return text
+
+def _is_tool_not_found(error) -> bool:
+    text = str(error).lower()
+    return "unknown tool" in text or ("tool" in text and "not found" in text)
+
+async def _call_with_capabilities(session: ClientSession, attempt):
+    """
+    Runs attempt(capabilities) with the cached server capabilities. If the server answers that a tool
+    does not exist (e.g. it was redeployed with a different tool set), the capabilities are refreshed
+    and the attempt is repeated once with the transport they now allow.
+    """
+    capabilities = await _pool.capabilities(session)
     try:
-        async with sse_client(MCP_SERVER_URL, timeout=5, sse_read_timeout=5) as (read, write):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                return True
+        result = await attempt(capabilities)
+        if not (getattr(result, "isError", False) and _is_tool_not_found(_result_text(result))):
+            return result
+        print(f"MCP tool missing on server ({_result_text(result)}). Refreshing capabilities.")
     except Exception as e:
-        print(f"MCP Connection Check Failed: {e}")
+        if not _is_tool_not_found(e):
+            raise
+        print(f"MCP tool missing on server ({e}). Refreshing capabilities.")
+
+    capabilities = await _pool.capabilities(session, refresh=True)
+    return await attempt(capabilities)
+
+_precompress_stats = {"files": 0, "skipped": 0, "failed": 0, "bytes_in": 0, "bytes_out": 0, "bytes_saved": 0}
+_precompress_lock = threading.Lock()  # Uploads run on many request threads at once
+
+def _count_precompress(**deltas):
+    with _precompress_lock:
+        for key, delta in deltas.items():
+            _precompress_stats[key] += delta
+
+def precompress_stats() -> dict:
+    with _precompress_lock:
+        return dict(_precompress_stats)
+
+def _precompress_enabled() -> bool:
+    if MCP_PRECOMPRESS in ("off", "0", "false", "no"):
         return False
+    if shutil.which("ffmpeg"):
+        return True
+    if MCP_PRECOMPRESS in ("on", "1", "true", "yes"):
+        print("MCP_PRECOMPRESS is on but ffmpeg was not found. Sending original files.")
+    return False
 
-def check_connection():
+def precompress_audio(file_path: str, on_progress=None):
     """
-    Synchronous wrapper for connection check.
+    Extracts the audio of file_path as 16 kHz mono Opus (or FLAC) with a local ffmpeg.
+    Returns (path_to_send, bytes_saved). The original path is returned with 0 when pre-compression
+    is disabled, fails, or would not make the file smaller; otherwise the caller deletes the new file.
     """
+    original_size = os.path.getsize(file_path)
+    if original_size < MCP_PRECOMPRESS_MIN_BYTES or not _precompress_enabled():
+        return file_path, 0
+
+    if MCP_PRECOMPRESS_FORMAT == "flac":
+        suffix, codec_args = ".flac", ["-c:a", "flac"]
+    else:
+        suffix, codec_args = ".ogg", ["-c:a", "libopus", "-b:a", MCP_PRECOMPRESS_BITRATE, "-application", "voip"]
+
+    fd, output_path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    cmd = ["ffmpeg", "-y", "-v", "error", "-i", file_path, "-vn", "-ac", "1", "-ar", "16000", *codec_args, output_path]
     try:
-        return asyncio.run(check_connection_async())
+        start = time.monotonic()
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True, timeout=MCP_PRECOMPRESS_TIMEOUT)
+        compressed_size = os.path.getsize(output_path)
     except Exception as e:
-        print(f"MCP Connection Check Error: {e}")
-        return False
+        stderr = getattr(e, "stderr", None)
+        detail = stderr.decode("utf-8", "replace").strip() if stderr else str(e)
+        print(f"Pre-compression failed for {os.path.basename(file_path)}, sending original: {detail}")
+        _count_precompress(failed=1)
+        os.unlink(output_path)
+        return file_path, 0
+
+    if compressed_size == 0 or compressed_size >= original_size:
+        print(f"Pre-compression would not shrink {os.path.basename(file_path)} ({original_size} -> {compressed_size} bytes). Sending original.")
+        _count_precompress(skipped=1)
+        os.unlink(output_path)
+        return file_path, 0
+
+    saved = original_size - compressed_size
+    _count_precompress(files=1, bytes_in=original_size, bytes_out=compressed_size, bytes_saved=saved)
+    message = (f"Pre-compressed {os.path.basename(file_path)}: {original_size} -> {compressed_size} bytes "
+               f"({100 * saved / original_size:.0f}% smaller) in {time.monotonic() - start:.1f}s")
+    print(message)
+    _emit_progress(on_progress, {"step": "precompress", "message": message, "bytes_saved": saved})
+    return output_path, saved
+
+def _cancel_arguments(tool_names, request_id: str = None, deadline: float = None) -> dict:
+    """Tool arguments that let the server stop the work; only sent to servers that have cancel_request."""
+    if "cancel_request" not in tool_names:
+        return {}
+    arguments = {}
+    if request_id:
+        arguments["request_id"] = request_id
+    if deadline:
+        arguments["deadline"] = deadline
+    return arguments
+
+def _remaining(deadline: float = None):
+    return max(0.0, deadline - time.time()) if deadline else None
+
+def _cancel_remote(request_id: str):
+    """Asks the server to stop request_id (fire and forget, on another pooled session)."""
+    try:
+        _pool.submit(lambda session: session.call_tool("cancel_request", arguments={"request_id": request_id}))
+    except Exception as e:
+        print(f"Could not send cancel_request for {request_id}: {e}")
+
+def _encode_file_base64(file_path: str) -> str:
+    """
+    Base64-encodes a file block by block for the legacy single-call tools.
+    The output goes into one preallocated buffer instead of a list of per-block strings. Peak memory
+    is that buffer plus the returned string, about 2.67x the file size; the raw file is never held whole.
+    """
+    encoded = bytearray(4 * ((os.path.getsize(file_path) + 2) // 3))
+    offset = 0
+    with open(file_path, "rb") as f:
+        # Block size is a multiple of 3, so only the last block carries padding
+        for block in iter(lambda: f.read(3 * 256 * 1024), b""):
+            chunk = base64.b64encode(block)
+            encoded[offset:offset + len(chunk)] = chunk
+            offset += len(chunk)
+    return str(memoryview(encoded)[:offset], "ascii")
+
+def _progress_kwargs(on_progress) -> dict:
+    """
+    Builds the call_tool keyword arguments that forward server progress notifications to on_progress(event).
+    Server tools put a JSON object (step, message, chunk, text...) in the notification message;
+    plain text messages are passed through as {"message": ...}.
+    """
+    if on_progress is None:
+        return {}
+
+    async def progress_callback(progress, total=None, message=None):
+        event = {}
+        if message:
+            try:
+                parsed = json.loads(message)
+            except ValueError:
+                parsed = None
+            event = parsed if isinstance(parsed, dict) else {"message": message}
+        event["progress"] = round(100 * progress / total, 1) if total else progress
+        _emit_progress(on_progress, event)
 
-async def upload_file_chunked(file_path: str, session: ClientSession) -> str:
+    return {"progress_callback": progress_callback}
+
+def _emit_progress(on_progress, event: dict):
+    if on_progress is None:
+        return
+    try:
+        on_progress(event)
+    except Exception as e:
+        print(f"Progress callback failed: {e}")
+
+async def _list_uploaded_chunks(session: ClientSession, upload_id: str) -> set:
+    """
+    Asks the server which chunk indices of upload_id it already has.
     """
-    Uploads a file in chunks using the upload_chunk tool.
+    result = await session.call_tool("list_uploaded_chunks", arguments={"upload_id": upload_id})
+    try:
+        return set(json.loads(_checked_text(result)).get("chunks", []))
+    except MCPToolError:
+        return set()
+
+async def upload_file_chunked(file_path: str, session: ClientSession, tool_names=None, digest: str = None,
+                              on_progress=None) -> str:
+    """
+    Uploads a file in chunks using the upload_chunk tool, keeping MCP_UPLOAD_WINDOW chunks
+    in flight and retrying each chunk with backoff.
+    The upload_id is derived from the file content and chunk size, so an interrupted upload
+    of the same file resumes with only the chunks the server doesn't have yet.
+    on_progress(event) receives an "upload" event after each chunk.
     Returns the upload_id.
     """
     filename = os.path.basename(file_path)
     file_size = os.path.getsize(file_path)
-    total_chunks = math.ceil(file_size / CHUNK_SIZE)
-    upload_id = str(uuid.uuid4())
+    chunk_size = _choose_chunk_size()
+    total_chunks = math.ceil(file_size / chunk_size)
 
-    print(f"Uploading {filename} ({file_size} bytes) in {total_chunks} chunks. Upload ID: {upload_id}")
+    if digest is None:
+        digest = await asyncio.to_thread(_file_sha256, file_path)
+    upload_id = f"{digest[:40]}-{chunk_size}"
 
-    with open(file_path, "rb") as f:
-        for i in range(total_chunks):
-            chunk = f.read(CHUNK_SIZE)
-            chunk_data = base64.b64encode(chunk).decode("utf-8")
+    received = set()
+    if tool_names is None or "list_uploaded_chunks" in tool_names:
+        try:
+            received = await _list_uploaded_chunks(session, upload_id)
+        except Exception as e:
+            print(f"Could not list uploaded chunks for {upload_id}: {e}")
 
-            print(f"Uploading chunk {i+1}/{total_chunks}...")
+    missing = [i for i in range(total_chunks) if i not in received]
+    print(f"Uploading {filename} ({file_size} bytes) in {total_chunks} chunks of {chunk_size} bytes. Upload ID: {upload_id}")
+    if received:
+        print(f"Resuming upload: {total_chunks - len(missing)}/{total_chunks} chunks already on server")
 
-            result = await session.call_tool("upload_chunk", arguments={
-                "upload_id": upload_id,
-                "chunk_index": i,
-                "chunk_data": chunk_data
-            })
+    window = asyncio.Semaphore(MCP_UPLOAD_WINDOW)
+    done_chunks = total_chunks - len(missing)
+
+    async def send_chunk(i):
+        nonlocal done_chunks
+        async with window:
+            with open(file_path, "rb") as f:
+                f.seek(i * chunk_size)
+                chunk = f.read(chunk_size)
+            chunk_data = base64.b64encode(chunk).decode("utf-8")
 
-            # Check result for error
-            result_text = ""
-            if result.content:
-                for content in result.content:
-                    if content.type == 'text':
-                        result_text += content.text
+            for attempt in range(MCP_UPLOAD_RETRIES + 1):
+                try:
+                    result = await session.call_tool("upload_chunk", arguments={
+                        "upload_id": upload_id,
+                        "chunk_index": i,
+                        "chunk_data": chunk_data
+                    })
+                    _checked_text(result)
+                    print(f"Uploaded chunk {i+1}/{total_chunks}")
+                    done_chunks += 1
+                    _emit_progress(on_progress, {
+                        "step": "upload",
+                        "progress": round(100 * done_chunks / total_chunks, 1),
+                        "message": f"Uploaded {done_chunks}/{total_chunks} chunks"
+                    })
+                    return len(chunk)
+                except Exception as e:
+                    if _is_tool_not_found(e):
+                        raise
+                    if attempt == MCP_UPLOAD_RETRIES:
+                        raise Exception(f"Failed to upload chunk {i}: {e}")
+                    delay = 0.5 * (2 ** attempt) + random.uniform(0, 0.25)
+                    print(f"Chunk {i} failed ({e}), retrying in {delay:.1f}s...")
+                    await asyncio.sleep(delay)
 
-            if result_text.startswith("Error"):
-                raise Exception(f"Failed to upload chunk {i}: {result_text}")
+    start = time.monotonic()
+    tasks = [asyncio.create_task(send_chunk(i)) for i in missing]
+    try:
+        sent = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
 
+    _record_upload_throughput(sum(sent), time.monotonic() - start)
     print(f"Upload complete for {filename} (ID: {upload_id})")
     return upload_id
 
-async def _call_transcribe_audio_async(file_path: str, model_size: str = "base"):
+async def upload_file_blob(file_path: str, session: ClientSession, tool_names=None, on_progress=None) -> str:
+    """
+    Makes sure the server's content-addressed store has this file and returns its SHA-256.
+    If the server already has the blob nothing is uploaded; otherwise the file is sent with
+    upload_file_chunked and committed under its hash.
+    """
+    filename = os.path.basename(file_path)
+    digest = await asyncio.to_thread(_file_sha256, file_path)
+
+    result_text = _checked_text(await session.call_tool("has_blob", arguments={"sha256": digest}))
+    if json.loads(result_text).get("exists"):
+        print(f"Server already has {filename} (sha256 {digest[:12]}...). Skipping upload.")
+        return digest
+
+    upload_id = await upload_file_chunked(file_path, session, tool_names, digest=digest, on_progress=on_progress)
+    _checked_text(await session.call_tool("commit_blob", arguments={
+        "upload_id": upload_id,
+        "sha256": digest,
+        "filename": filename
+    }))
+    return digest
+
+async def _upload_input(file_path: str, session: ClientSession, capabilities: ServerCapabilities, on_progress=None) -> dict:
+    """
+    Uploads file_path with the best transport the server supports (blob or chunked) and returns
+    the arguments that reference it in *_uploaded_file tools.
+    """
+    filename = os.path.basename(file_path)
+    if capabilities.transport() == "blob":
+        digest = await upload_file_blob(file_path, session, capabilities.tools, on_progress)
+        return {"blob_sha256": digest, "filename": filename}
+    upload_id = await upload_file_chunked(file_path, session, capabilities.tools, on_progress=on_progress)
+    return {"upload_id": upload_id, "filename": filename}
+
+def _is_blob_missing(text: str) -> bool:
+    return "blob bulunamadı" in text.lower() or "blob not found" in text.lower()
+
+async def _call_uploaded_tool(session: ClientSession, tool_name: str, file_path: str, capabilities: ServerCapabilities,
+                              arguments: dict, on_progress=None, **call_kwargs):
     """
-    Connects to the remote MCP server via SSE and calls the transcribe_audio_base64 tool.
-    If file is large (>5MB), uses chunked upload strategy.
+    Uploads file_path (see _upload_input) and calls tool_name with the upload reference plus arguments.
+    The blob store can evict a blob between has_blob and the tool call; in that case the file is
+    uploaded again and the call repeated once.
     """
-    print(f"Connecting to MCP Server: {MCP_SERVER_URL}")
+    for attempt in range(2):
+        reference = await _upload_input(file_path, session, capabilities, on_progress)
+        print(f"Calling {tool_name} for uploaded file: {reference['filename']}")
+        result = await session.call_tool(tool_name, arguments={**reference, **arguments}, **call_kwargs)
+        if attempt or "blob_sha256" not in reference or not _is_blob_missing(_result_text(result)):
+            return result
+        print(f"Blob for {os.path.basename(file_path)} was evicted before {tool_name}; uploading again.")
 
+async def _call_transcribe_audio_async(session: ClientSession, file_path: str, model_size: str = "base", on_progress=None,
+                                       request_id: str = None, deadline: float = None):
+    """
+    Transcribes a file on a pooled MCP session.
+    Files of any size go through the chunked (or blob) transport so memory use stays constant;
+    the single-call base64 tool is only used when the server has no upload_chunk tool.
+    """
     filename = os.path.basename(file_path)
     file_size = os.path.getsize(file_path)
 
-    # Check if we should use chunked upload (e.g., > 5MB)
-    use_chunked = file_size > 5 * 1024 * 1024
+    async def attempt(capabilities: ServerCapabilities):
+        if capabilities.transport() != "legacy" and capabilities.has("transcribe_uploaded_file"):
+            # Upload errors are raised instead of falling back, so a retry can resume the upload
+            print(f"Sending {filename} ({file_size} bytes) with {capabilities.transport()} transport.")
+            return await _call_uploaded_tool(session, "transcribe_uploaded_file", file_path, capabilities, {
+                **_cancel_arguments(capabilities.tools, request_id, deadline),
+                "model_size": model_size
+            }, on_progress, **_progress_kwargs(on_progress))
 
-    # Set timeout to 1 hour (3600s) for large file uploads and long processing
-    async with sse_client(MCP_SERVER_URL, timeout=3600, sse_read_timeout=3600) as (read, write):
-        async with ClientSession(read, write) as session:
-            await session.initialize()
+        print("Chunked upload tools not found on server. Falling back to base64.")
+        audio_data = await asyncio.to_thread(_encode_file_base64, file_path)
 
-            if use_chunked:
-                try:
-                    # Check if upload_chunk exists
-                    tools_result = await session.list_tools()
-                    tool_names = [t.name for t in tools_result.tools]
-
-                    if "upload_chunk" in tool_names:
-                        print(f"File size {file_size} bytes > 5MB. Using chunked upload strategy.")
-                        upload_id = await upload_file_chunked(file_path, session)
-
-                        print(f"Requesting transcription for uploaded file: {filename} (ID: {upload_id})")
-                        result = await session.call_tool("transcribe_uploaded_file", arguments={
-                            "upload_id": upload_id,
-                            "filename": filename,
-                            "model_size": model_size
-                        })
-                    else:
-                        print("Chunked upload tools not found on server. Falling back to base64.")
-                        use_chunked = False
-                except Exception as e:
-                    print(f"Error checking/using chunked upload: {e}. Falling back to base64.")
-                    use_chunked = False
-
-            if not use_chunked:
-                print(f"Preparing file {filename} for transfer (Legacy Base64)...")
-                # Read and encode file
-                with open(file_path, "rb") as f:
-                    file_content = f.read()
-                    audio_data = base64.b64encode(file_content).decode("utf-8")
-
-                print(f"Sending file '{filename}' ({len(file_content)} bytes) to MCP server for transcription...")
-
-                result = await session.call_tool("transcribe_audio_base64", arguments={
-                    "audio_data": audio_data,
-                    "filename": filename,
-                    "model_size": model_size
-                })
-
-            final_text = ""
-            if result.content:
-                for content in result.content:
-                    if content.type == 'text':
-                        final_text += content.text
-            return final_text
-
-async def _call_process_youtube_workflow_async(url: str):
-    """
-    Connects to the remote MCP server via SSE and calls the process_youtube_workflow tool.
-    """
-    print(f"Connecting to MCP Server: {MCP_SERVER_URL}")
-    # Set timeout to 1 hour (3600s) for long youtube video processing
-    async with sse_client(MCP_SERVER_URL, timeout=3600, sse_read_timeout=3600) as (read, write):
-        async with ClientSession(read, write) as session:
-            # Initialize the connection
-            await session.initialize()
-
-            # Call the tool
-            print(f"Calling tool 'process_youtube_workflow' with url: {url}")
-            result = await session.call_tool("process_youtube_workflow", arguments={"url": url})
-
-            # Extract text content from the result
-            final_text = ""
-            if result.content:
-                for content in result.content:
-                    if content.type == 'text':
-                        final_text += content.text
-            return final_text
-
-def call_process_youtube_workflow(url: str):
+        print(f"Sending file '{filename}' ({file_size} bytes) to MCP server for transcription...")
+
+        return await session.call_tool("transcribe_audio_base64", arguments={
+            "audio_data": audio_data,
+            "filename": filename,
+            **_cancel_arguments(capabilities.tools, request_id, deadline),
+            "model_size": model_size
+        }, **_progress_kwargs(on_progress))
+
+    return _result_text(await _call_with_capabilities(session, attempt))
+
+async def _call_process_youtube_workflow_async(session: ClientSession, url: str, on_progress=None,
+                                               request_id: str = None, deadline: float = None):
+    """
+    Calls the process_youtube_workflow tool on a pooled MCP session.
+    Progress notifications (download, split, chunk i/N...) are passed to on_progress(event).
+    """
+    async def attempt(capabilities: ServerCapabilities):
+        print(f"Calling tool 'process_youtube_workflow' with url: {url}")
+        return await session.call_tool("process_youtube_workflow", arguments={
+            "url": url,
+            **_cancel_arguments(capabilities.tools, request_id, deadline)
+        }, **_progress_kwargs(on_progress))
+
+    return _result_text(await _call_with_capabilities(session, attempt))
+
+def call_process_youtube_workflow(url: str, on_progress=None, deadline: float = None,
+                                  cancel_event: threading.Event = None):
     """
     Synchronous wrapper for the async MCP tool call.
+    deadline (Unix time) and cancel_event stop the wait and ask the server to stop the work.
     """
+    request_id = uuid.uuid4().hex
     try:
-        # Create a new event loop for this thread if needed, or use asyncio.run
-        return asyncio.run(_call_process_youtube_workflow_async(url))
+        return _pool.run(
+            lambda session: _call_process_youtube_workflow_async(session, url, on_progress, request_id, deadline),
+            timeout=_remaining(deadline), cancel_event=cancel_event
+        )
+    except RequestCancelled as e:
+        _cancel_remote(request_id)
+        return f"MCP Client Error: {str(e)}"
     except Exception as e:
         import traceback
         traceback.print_exc()
         return f"MCP Client Error: {str(e)}"
 
-async def _call_convert_media_async(file_path: str, target_format: str = "mp3"):
+async def _call_convert_media_async(session: ClientSession, file_path: str, target_format: str = "mp3",
+                                    return_handle: bool = False):
     """
-    Connects to the remote MCP server via SSE and calls the convert_media_base64 tool.
+    Converts a file on a pooled MCP session, using the chunked (or blob) transport when the server supports it.
+    With return_handle=True and a server that has download_chunk, the result is a JSON download handle
+    instead of the base64 encoded file.
     """
-    print(f"Connecting to MCP Server: {MCP_SERVER_URL}")
-
     filename = os.path.basename(file_path)
     file_size = os.path.getsize(file_path)
 
-    use_chunked = file_size > 5 * 1024 * 1024
+    async def attempt(capabilities: ServerCapabilities):
+        handle_arguments = {"return_handle": True} if return_handle and capabilities.has("download_chunk") else {}
 
-    async with sse_client(MCP_SERVER_URL, timeout=3600, sse_read_timeout=3600) as (read, write):
-        async with ClientSession(read, write) as session:
-            await session.initialize()
-
-            if use_chunked:
-                try:
-                    tools_result = await session.list_tools()
-                    tool_names = [t.name for t in tools_result.tools]
-
-                    if "upload_chunk" in tool_names:
-                        print(f"File size {file_size} bytes > 5MB. Using chunked upload strategy.")
-                        upload_id = await upload_file_chunked(file_path, session)
-
-                        print(f"Requesting conversion for uploaded file: {filename} (ID: {upload_id})")
-                        result = await session.call_tool("convert_uploaded_file", arguments={
-                            "upload_id": upload_id,
-                            "filename": filename,
-                            "output_format": target_format
-                        })
-                    else:
-                        print("Chunked upload tools not found. Falling back.")
-                        use_chunked = False
-                except Exception as e:
-                     print(f"Error checking/using chunked upload: {e}. Falling back.")
-                     use_chunked = False
-
-            if not use_chunked:
-                print(f"Preparing file {filename} for conversion...")
+        if capabilities.transport() != "legacy" and capabilities.has("convert_uploaded_file"):
+            print(f"Sending {filename} ({file_size} bytes) with {capabilities.transport()} transport.")
+            return await _call_uploaded_tool(session, "convert_uploaded_file", file_path, capabilities, {
+                **handle_arguments,
+                "output_format": target_format
+            })
 
-                # Read and encode file
-                with open(file_path, "rb") as f:
-                    file_content = f.read()
-                    audio_data = base64.b64encode(file_content).decode("utf-8")
+        print("Chunked upload tools not found. Falling back to base64.")
+        audio_data = await asyncio.to_thread(_encode_file_base64, file_path)
 
-                print(f"Sending file '{filename}' ({len(file_content)} bytes) to MCP server for conversion...")
+        print(f"Sending file '{filename}' ({file_size} bytes) to MCP server for conversion...")
 
-                result = await session.call_tool("convert_media_base64", arguments={
-                    "audio_data": audio_data,
-                    "filename": filename,
-                    "output_format": target_format
-                })
+        return await session.call_tool("convert_media_base64", arguments={
+            "audio_data": audio_data,
+            "filename": filename,
+            **handle_arguments,
+            "output_format": target_format
+        })
 
-            final_text = ""
-            if result.content:
-                for content in result.content:
-                    if content.type == 'text':
-                        final_text += content.text
-            return final_text
+    return _result_text(await _call_with_capabilities(session, attempt))
 
 def call_convert_media(file_path: str, target_format: str = "mp3"):
     """
     Synchronous wrapper for the async MCP tool call.
     """
     try:
-        return asyncio.run(_call_convert_media_async(file_path, target_format))
+        return _pool.run(lambda session: _call_convert_media_async(session, file_path, target_format))
     except Exception as e:
         import traceback
         traceback.print_exc()
         return f"MCP Client Error: {str(e)}"
 
-def call_transcribe_audio(file_path: str, model_size: str = "base"):
+async def _download_chunk_async(session: ClientSession, handle: str, offset: int, length: int) -> bytes:
+    result_text = _result_text(await session.call_tool("download_chunk", arguments={
+        "handle": handle,
+        "offset": offset,
+        "length": length
+    }))
+    if result_text.startswith("Error"):
+        raise MCPToolError(result_text)
+    return base64.b64decode(result_text)
+
+def _iter_download(handle: str, size: int):
+    """
+    Yields a server-side file in MCP_DOWNLOAD_CHUNK_SIZE pieces, keeping MCP_DOWNLOAD_PREFETCH
+    requests in flight so the next piece is on its way while the current one is being sent on.
+    The handle is released when the iterator finishes or is closed.
+    """
+    offsets = iter(range(0, size, MCP_DOWNLOAD_CHUNK_SIZE))
+    pending = deque()
+
+    def schedule():
+        offset = next(offsets, None)
+        if offset is not None:
+            pending.append((offset, _pool.submit(
+                lambda session: _download_chunk_async(session, handle, offset, MCP_DOWNLOAD_CHUNK_SIZE)
+            )))
+
+    try:
+        for _ in range(max(1, MCP_DOWNLOAD_PREFETCH)):
+            schedule()
+        while pending:
+            offset, future = pending.popleft()
+            data = future.result(MCP_READ_TIMEOUT)
+            # A short piece means the file changed or vanished; never hand out a truncated result
+            if len(data) != min(MCP_DOWNLOAD_CHUNK_SIZE, size - offset):
+                raise MCPToolError(f"Download {handle} returned {len(data)} bytes at offset {offset}")
+            schedule()
+            yield data
+    finally:
+        for _, future in pending:
+            future.cancel()
+        try:
+            _pool.submit(lambda session: session.call_tool("release_download", arguments={"handle": handle}))
+        except Exception as e:
+            print(f"Could not release download {handle}: {e}")
+
+def _download_info(result: str):
+    """Returns the {"type": "download", "handle", "size"} object of a handle result, or None for inline base64."""
+    try:
+        info = json.loads(result)
+    except ValueError:
+        return None
+    if isinstance(info, dict) and info.get("type") == "download":
+        return info
+    return None
+
+def call_convert_media_stream(file_path: str, target_format: str = "mp3"):
+    """
+    Converts a file and returns (size, chunks) where chunks yields the converted bytes piece by piece.
+    The conversion finishes before this returns, so the input file can be deleted right away.
+    Servers without download_chunk return the whole result at once; it is then yielded as one piece.
+    Raises MCPToolError if the conversion fails.
+    """
+    result = _pool.run(lambda session: _call_convert_media_async(session, file_path, target_format, return_handle=True))
+    if result.startswith("Error") or result.startswith("Hata:"):
+        raise MCPToolError(result)
+
+    info = _download_info(result)
+    if info is not None:
+        return info["size"], _iter_download(info["handle"], info["size"])
+
+    data = base64.b64decode(result)
+    return len(data), iter([data])
+
+def call_transcribe_audio(file_path: str, model_size: str = "base", on_progress=None, deadline: float = None,
+                          cancel_event: threading.Event = None):
     """
     Synchronous wrapper for the async MCP tool call.
+    The file is pre-compressed to 16 kHz mono audio first when a local ffmpeg is available.
+    deadline (Unix time) and cancel_event stop the wait and ask the server to stop the work.
     """
+    upload_path = file_path
+    request_id = uuid.uuid4().hex
     try:
-        return asyncio.run(_call_transcribe_audio_async(file_path, model_size))
+        upload_path, _ = precompress_audio(file_path, on_progress)
+        if cancel_event is not None and cancel_event.is_set():
+            raise RequestCancelled("Request cancelled by the caller")
+        return _pool.run(
+            lambda session: _call_transcribe_audio_async(session, upload_path, model_size, on_progress, request_id, deadline),
+            timeout=_remaining(deadline), cancel_event=cancel_event
+        )
+    except RequestCancelled as e:
+        _cancel_remote(request_id)
+        return f"MCP Client Error: {str(e)}"
     except Exception as e:
         import traceback
         traceback.print_exc()
         return f"MCP Client Error: {str(e)}"
+    finally:
+        if upload_path != file_path and os.path.exists(upload_path):
+            os.unlink(upload_path)
@@ -0,0 +1,129 @@
+import os
+import re
+import json
+import time
+import threading
+from collections import deque
+
+PROGRESS_TTL = int(os.getenv("PROGRESS_TTL", "600"))  # Sessiz kanallar bu kadar saniye sonra silinir
+PROGRESS_HISTORY = int(os.getenv("PROGRESS_HISTORY", "200"))  # Kanal başına saklanan olay sayısı
+PROGRESS_KEEPALIVE = float(os.getenv("PROGRESS_KEEPALIVE", "15"))
+
+PROGRESS_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+def is_valid_progress_id(progress_id) -> bool:
+    return bool(progress_id and PROGRESS_ID_PATTERN.match(progress_id))
+
+class _Channel:
+    def __init__(self, lock, history):
+        self.events = deque(maxlen=history)  # (seq, event)
+        self.seq = 0
+        self.done = False
+        self.updated = time.time()
+        self.condition = threading.Condition(lock)
+
+class ProgressBroker:
+    """
+    İlerleme olaylarını istek başına bir kanalda toplar ve Server-Sent Events olarak yayınlar.
+    Tarayıcı progress_id'yi kendisi üretir, /api/progress/<id> ile dinlemeye başlar ve aynı id'yi
+    isteğe ekler; bu yüzden kanal, ilk olay ya da ilk dinleyici hangisi önce gelirse o an oluşturulur.
+    Kopan bağlantılar Last-Event-ID ile kaldıkları olaydan devam eder.
+    """
+
+    def __init__(self, ttl: int = PROGRESS_TTL, history: int = PROGRESS_HISTORY,
+                 keepalive: float = PROGRESS_KEEPALIVE):
+        self.ttl = ttl
+        self.history = history
+        self.keepalive = keepalive
+        self._lock = threading.Lock()
+        self._channels = {}
+        self._groups = {}  # Grup anahtarı (ör. single-flight anahtarı) -> progress_id kümesi
+
+    def _channel(self, progress_id):
+        # Lock tutulurken çağrılır
+        channel = self._channels.get(progress_id)
+        if channel is None:
+            self._purge_expired()
+            channel = self._channels[progress_id] = _Channel(self._lock, self.history)
+        return channel
+
+    def publish(self, progress_id, event: dict):
+        """Kanala bir olay ekler ve bekleyen dinleyicileri uyandırır."""
+        if not is_valid_progress_id(progress_id):
+            return
+        with self._lock:
+            channel = self._channel(progress_id)
+            if channel.done:
+                return
+            channel.seq += 1
+            channel.events.append((channel.seq, dict(event, time=time.time())))
+            channel.updated = time.time()
+            channel.condition.notify_all()
+
+    def finish(self, progress_id, event: dict = None):
+        """Son olayı yayınlar ve kanalı kapatır; dinleyiciler kalan olayları aldıktan sonra ayrılır."""
+        if not is_valid_progress_id(progress_id):
+            return
+        self.publish(progress_id, event or {'step': 'done', 'progress': 100})
+        with self._lock:
+            channel = self._channel(progress_id)
+            channel.done = True
+            channel.updated = time.time()
+            channel.condition.notify_all()
+
+    def join(self, group_key, progress_id):
+        """progress_id'yi gruba ekler; publish_group ile gruba giden olaylar onun kanalına da yazılır."""
+        if not is_valid_progress_id(progress_id):
+            return
+        with self._lock:
+            self._groups.setdefault(group_key, set()).add(progress_id)
+
+    def leave(self, group_key, progress_id):
+        with self._lock:
+            members = self._groups.get(group_key)
+            if members:
+                members.discard(progress_id)
+                if not members:
+                    del self._groups[group_key]
+
+    def publish_group(self, group_key, event: dict):
+        with self._lock:
+            members = list(self._groups.get(group_key, ()))
+        for progress_id in members:
+            self.publish(progress_id, event)
+
+    def subscribe(self, progress_id, last_event_id=None):
+        """Kanalın olaylarını SSE biçiminde üreten generator. Kanal kapanınca veya TTL boyunca sessiz kalınca biter."""
+        try:
+            sent = int(last_event_id or 0)
+        except ValueError:
+            sent = 0
+
+        while True:
+            with self._lock:
+                channel = self._channel(progress_id)
+                pending = [(seq, event) for seq, event in channel.events if seq > sent]
+                if not pending and not channel.done:
+                    channel.condition.wait(self.keepalive)
+                    pending = [(seq, event) for seq, event in channel.events if seq > sent]
+                done = channel.done
+                idle = time.time() - channel.updated > self.ttl
+
+            if pending:
+                for seq, event in pending:
+                    sent = seq
+                    yield f"id: {seq}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+            elif done or idle:
+                return
+            else:
+                yield ": keepalive\n\n"
+
+    def _purge_expired(self):
+        # Lock tutulurken çağrılır
+        now = time.time()
+        expired = [
+            progress_id for progress_id, channel in self._channels.items()
+            if now - channel.updated > self.ttl
+        ]
+        for progress_id in expired:
+            del self._channels[progress_id]
@@ -0,0 +1,29 @@
+import time
+import threading
+
+class RateLimiter:
+    """
+    Basit token bucket: dakikada en fazla `rate_per_minute` istek, `burst` kadar ani artışa izin verir.
+    acquire() gerekirse token gelene kadar bekler.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst if burst is not None else max(1, int(rate_per_minute // 6))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
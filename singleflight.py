@@ -0,0 +1,54 @@
+import threading
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Aynı anahtar için eşzamanlı çağrıları birleştirir: ilk çağıran işi yapar,
+    diğerleri onun sonucunu (veya hatasını) bekleyip aynen alır.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        """fn'i çalıştırır veya devam eden çağrıyı bekler. (sonuç, paylaşıldı_mı) döndürür."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call:
+                call.waiters += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+        if call.waiters:
+            print(f"Single-flight: '{key}' sonucu {call.waiters} bekleyen istekle paylaşıldı")
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,122 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from rate_limit import RateLimiter
+
+SUMMARY_CHUNK_CHARS = int(os.getenv("SUMMARY_CHUNK_CHARS", "24000"))
+SUMMARY_MAX_CONCURRENCY = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "4"))
+SUMMARY_RATE_PER_MINUTE = float(os.getenv("SUMMARY_RATE_PER_MINUTE", "30"))
+
+# Prompt metinleri değiştiğinde artırılmalı
+PROMPT_VERSION = 2
+
+SINGLE_PROMPT = """Aşağıdaki metni özetle. Önemli noktaları maddeler halinde belirt:
+
+        {text}
+        """
+
+MAP_PROMPT = """Aşağıda uzun bir transkriptin {index}/{total}. bölümü ({time_range}) yer alıyor.
+Bu bölümdeki önemli noktaları maddeler halinde, kısa ve bilgi kaybetmeden özetle:
+
+{text}
+"""
+
+REDUCE_PROMPT = """Aşağıda uzun bir metnin sırayla bölüm bölüm çıkarılmış özetleri var.
+Bunları tek bir bütünlüklü özette birleştir. Tekrarları ele, önemli noktaları maddeler halinde belirt:
+
+{text}
+"""
+
+TIMESTAMP_LINE = re.compile(r'^\[(\d{1,2}:\d{2}(?::\d{2})?)\]\s*')
+SENTENCE_END = re.compile(r'(?<=[.!?…])\s+')
+
+# Gemini için tüm isteklerin paylaştığı hız sınırı
+gemini_limiter = RateLimiter(SUMMARY_RATE_PER_MINUTE)
+
+def split_segments(text: str):
+    """
+    Metni (zaman damgası, metin) parçalarına ayırır.
+    get_transcript çıktısındaki '[mm:ss] metin' satırlarını kullanır; zaman damgası yoksa cümlelere böler.
+    """
+    segments = []
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        match = TIMESTAMP_LINE.match(line)
+        if match:
+            segments.append((match.group(1), line[match.end():]))
+        else:
+            segments.extend((None, sentence) for sentence in SENTENCE_END.split(line) if sentence)
+    return segments
+
+def chunk_segments(segments, max_chars: int = SUMMARY_CHUNK_CHARS):
+    """Parçaları sınır aşılmayacak şekilde sırayla gruplar. (zaman_aralığı, metin) listesi döndürür."""
+    chunks = []
+    current, size = [], 0
+
+    def flush():
+        if current:
+            stamps = [stamp for stamp, _ in current if stamp]
+            time_range = f"{stamps[0]} - {stamps[-1]}" if stamps else ""
+            chunks.append((time_range, ' '.join(text for _, text in current)))
+
+    for stamp, text in segments:
+        # Tek başına sınırı aşan parçayı kelime sınırından böl
+        while len(text) > max_chars:
+            cut = text.rfind(' ', 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            flush()
+            current, size = [(stamp, text[:cut])], cut
+            text = text[cut:].lstrip()
+        if current and size + len(text) + 1 > max_chars:
+            flush()
+            current, size = [], 0
+        current.append((stamp, text))
+        size += len(text) + 1
+    flush()
+    return chunks
+
+def summarize_text(text: str, generate, max_chars: int = SUMMARY_CHUNK_CHARS,
+                   max_concurrency: int = SUMMARY_MAX_CONCURRENCY, limiter: RateLimiter = gemini_limiter) -> str:
+    """
+    Metni özetler. Kısa metinler tek istekle, uzun metinler map-reduce ile özetlenir:
+    bölümler sınırlı eşzamanlılıkla paralel özetlenir, sonra kısmi özetler birleştirilir.
+    `generate` prompt alıp metin döndüren fonksiyondur.
+    """
+    def call(prompt):
+        limiter.acquire()
+        return generate(prompt)
+
+    segments = split_segments(text)
+    plain = ' '.join(segment for _, segment in segments)
+    if len(plain) <= max_chars:
+        return call(SINGLE_PROMPT.format(text=plain))
+
+    chunks = chunk_segments(segments, max_chars)
+    print(f"Uzun metin: {len(plain)} karakter, {len(chunks)} bölüm halinde özetleniyor...")
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        partials = list(executor.map(
+            lambda item: call(MAP_PROMPT.format(
+                index=item[0] + 1,
+                total=len(chunks),
+                time_range=item[1][0] or "zaman bilgisi yok",
+                text=item[1][1]
+            )),
+            enumerate(chunks)
+        ))
+
+        # Kısmi özetler de sınırı aşıyorsa gruplar halinde tekrar indir
+        while True:
+            sections = [f"### Bölüm {i + 1}\n{partial}" for i, partial in enumerate(partials)]
+            combined = '\n\n'.join(sections)
+            if len(combined) <= max_chars or len(partials) == 1:
+                return call(REDUCE_PROMPT.format(text=combined))
+
+            groups = chunk_segments([(None, section) for section in sections], max_chars)
+            if len(groups) >= len(partials):
+                # Gruplama küçültmüyorsa sonsuza dek dönmemek için doğrudan birleştir
+                return call(REDUCE_PROMPT.format(text=combined))
+            partials = list(executor.map(lambda group: call(REDUCE_PROMPT.format(text=group[1])), groups))
@@ -0,0 +1,74 @@
+import time
+import unittest
+
+from batch_ingest import BatchManager, BatchLimitError, extract_playlist_id, is_collection_url
+
+def extract_video_id(url):
+    return url.split('v=')[1] if 'v=' in url else None
+
+class TestBatchIngest(unittest.TestCase):
+    def wait_for(self, manager, batch_id):
+        deadline = time.time() + 2
+        while time.time() < deadline:
+            batch = manager.get(batch_id)
+            if batch['status'] in ('done', 'failed'):
+                return batch
+            time.sleep(0.01)
+        self.fail("Batch did not finish in time")
+
+    def test_url_helpers(self):
+        self.assertEqual(extract_playlist_id('https://www.youtube.com/playlist?list=PL123_x'), 'PL123_x')
+        self.assertTrue(is_collection_url('https://www.youtube.com/playlist?list=PL123'))
+        self.assertTrue(is_collection_url('https://www.youtube.com/@kanal'))
+        self.assertFalse(is_collection_url('https://www.youtube.com/watch?v=abc&list=PL123'))
+
+    def test_batch_skips_existing_and_bulk_inserts(self):
+        inserts = []
+
+        def fetch(video_id, url, options):
+            if video_id == 'bad':
+                return None, 'no captions'
+            return {'video_id': video_id, 'url': url}, None
+
+        def insert(rows):
+            inserts.append(rows)
+            return [{'id': i, 'video_id': row['video_id']} for i, row in enumerate(rows)]
+
+        manager = BatchManager(fetch, lambda ids: {'old'}, insert, extract_video_id, insert_size=2, rate_per_minute=0)
+        urls = ['https://youtu.be/watch?v=a', 'https://youtu.be/watch?v=b', 'https://youtu.be/watch?v=a',
+                'https://youtu.be/watch?v=old', 'https://youtu.be/watch?v=bad', 'https://youtu.be/watch?v=c']
+        batch = self.wait_for(manager, manager.submit(urls))
+
+        self.assertEqual(batch['status'], 'done')
+        self.assertEqual(batch['total'], 5)
+        self.assertEqual(batch['counts'], {'done': 3, 'cached': 1, 'failed': 1})
+        self.assertEqual(sum(len(rows) for rows in inserts), 3)
+        self.assertTrue(all(len(rows) <= 2 for rows in inserts))
+        self.assertEqual(batch['progress'], 1.0)
+
+    def test_active_batch_limit(self):
+        manager = BatchManager(lambda *a: (time.sleep(0.2), ({'video_id': 'x'}, None))[1],
+                               lambda ids: set(), lambda rows: [], extract_video_id, max_active=1, rate_per_minute=0)
+        manager.submit(['https://youtu.be/watch?v=a'])
+        with self.assertRaises(BatchLimitError):
+            manager.submit(['https://youtu.be/watch?v=b'])
+
+    def test_rate_limit_is_shared_by_batches(self):
+        acquired = []
+
+        class CountingLimiter:
+            def acquire(self):
+                acquired.append(1)
+
+        manager = BatchManager(lambda video_id, url, options: ({'video_id': video_id}, None),
+                               lambda ids: {'old'}, lambda rows: [], extract_video_id, max_active=2)
+        manager.limiter = CountingLimiter()
+        first = manager.submit(['https://youtu.be/watch?v=a', 'https://youtu.be/watch?v=old'])
+        second = manager.submit(['https://youtu.be/watch?v=b', 'https://youtu.be/watch?v=c'])
+        self.wait_for(manager, first)
+        self.wait_for(manager, second)
+        # Önbellekteki video YouTube'a gitmez; diğer üç öğe aynı sınırlayıcıdan geçer
+        self.assertEqual(len(acquired), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import sys
+import time
+import hashlib
+import tempfile
+import shutil
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mcp-media-server', 'src'))
+
+import blobstore
+
+def write_file(directory, name, content):
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+class TestBlobStore(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.blob_dir = os.path.join(self.root, 'blobs')
+        os.makedirs(self.blob_dir)
+        patcher = mock.patch.object(blobstore, 'BLOB_DIR', self.blob_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.root, True)
+
+    def test_commit_moves_verified_file(self):
+        content = b'ses verisi'
+        upload = write_file(self.root, 'upload.part', content)
+        path = blobstore.commit_file(upload, hashlib.sha256(content).hexdigest())
+        self.assertFalse(os.path.exists(upload))
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), content)
+
+    def test_commit_hash_mismatch_deletes_file(self):
+        upload = write_file(self.root, 'upload.part', b'bozuk')
+        wrong = hashlib.sha256(b'beklenen').hexdigest()
+        with self.assertRaises(ValueError):
+            blobstore.commit_file(upload, wrong)
+        self.assertFalse(os.path.exists(upload))
+        self.assertEqual(os.listdir(self.blob_dir), [])
+
+    def test_evict_removes_least_recently_used(self):
+        old = write_file(self.blob_dir, 'a' * 64, b'x' * 100)
+        new = write_file(self.blob_dir, 'b' * 64, b'y' * 100)
+        os.utime(old, (time.time() - 100, time.time() - 100))
+        with mock.patch.object(blobstore, 'BLOB_STORE_MAX_BYTES', 150):
+            blobstore.evict()
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(new))
+
+    def test_evict_spares_keep(self):
+        # Yeni yüklenen blob tek başına sınırı aşsa bile silinmez; yerine eskiler gider
+        old = write_file(self.blob_dir, 'a' * 64, b'x' * 100)
+        kept = write_file(self.blob_dir, 'b' * 64, b'y' * 300)
+        os.utime(kept, (time.time() - 100, time.time() - 100))
+        with mock.patch.object(blobstore, 'BLOB_STORE_MAX_BYTES', 150):
+            blobstore.evict(keep=kept)
+        self.assertTrue(os.path.exists(kept))
+        self.assertFalse(os.path.exists(old))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import socket
+import threading
+import time
+import unittest
+
+import cancellation
+from cancellation import RequestScope, CancelRegistry, SharedCancel, is_disconnected
+
+class TestDisconnectDetection(unittest.TestCase):
+    def test_peer_close_is_detected(self):
+        server, client = socket.socketpair()
+        try:
+            self.assertFalse(is_disconnected(server))
+            client.close()
+            self.assertTrue(is_disconnected(server))
+        finally:
+            server.close()
+
+    def test_scope_cancels_when_client_goes_away(self):
+        server, client = socket.socketpair()
+        old_interval = cancellation.DISCONNECT_POLL_INTERVAL
+        cancellation.DISCONNECT_POLL_INTERVAL = 0.01
+        try:
+            with RequestScope({'werkzeug.socket': server}) as scope:
+                client.close()
+                self.assertTrue(scope.cancel_event.wait(1))
+        finally:
+            cancellation.DISCONNECT_POLL_INTERVAL = old_interval
+            server.close()
+
+class TestRequestScope(unittest.TestCase):
+    def test_deadline(self):
+        scope = RequestScope(timeout=10)
+        self.assertAlmostEqual(scope.deadline, time.time() + 10, delta=1)
+        self.assertIsNone(RequestScope(timeout=0).deadline)
+
+    def test_registry_cancel(self):
+        registry = CancelRegistry()
+        with RequestScope(progress_id='abcdef123456', registry=registry) as scope:
+            self.assertTrue(registry.cancel('abcdef123456'))
+            self.assertTrue(scope.cancelled)
+        self.assertFalse(registry.cancel('abcdef123456'))
+
+class TestSharedCancel(unittest.TestCase):
+    def test_work_is_cancelled_only_when_every_waiter_leaves(self):
+        shared = SharedCancel()
+        first, second = RequestScope(), RequestScope()
+        event = shared.join('key', first)
+        self.assertIs(shared.join('key', second), event)
+
+        first.cancel()
+        self.assertFalse(event.is_set())
+        second.cancel()
+        self.assertTrue(event.is_set())
+
+        # Sonraki istek iptal edilmiş sinyali devralmaz
+        third = RequestScope()
+        self.assertFalse(shared.join('key', third).is_set())
+        shared.leave('key', third)
+
+    def test_leave_does_not_cancel(self):
+        shared = SharedCancel()
+        scope = RequestScope()
+        event = shared.join('key', scope)
+        shared.leave('key', scope)
+        scope.cancel()
+        self.assertFalse(event.is_set())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+from captions import select_caption_track, CaptionTrackCache
+
+class FakeLanguage:
+    def __init__(self, language_code):
+        self.language_code = language_code
+
+class FakeTrack:
+    def __init__(self, language_code, is_generated=False, translatable_to=()):
+        self.language_code = language_code
+        self.is_generated = is_generated
+        self.translation_languages = [FakeLanguage(code) for code in translatable_to]
+
+    @property
+    def is_translatable(self):
+        return bool(self.translation_languages)
+
+    def translate(self, language_code):
+        return FakeTrack(language_code, self.is_generated)
+
+class TestSelectCaptionTrack(unittest.TestCase):
+    def test_preference_order(self):
+        tracks = [FakeTrack('en'), FakeTrack('tr', is_generated=True)]
+        track, code = select_caption_track(tracks, ['tr', 'en'], 'tr')
+        self.assertEqual(code, 'tr')
+        self.assertIs(track, tracks[1])
+
+    def test_manual_before_generated(self):
+        tracks = [FakeTrack('en', is_generated=True), FakeTrack('en')]
+        track, _ = select_caption_track(tracks, ['en'], '')
+        self.assertFalse(track.is_generated)
+
+    def test_translation_fallback(self):
+        tracks = [FakeTrack('de', translatable_to=['tr', 'en'])]
+        track, code = select_caption_track(tracks, ['tr', 'en'], 'tr')
+        self.assertEqual(code, 'tr')
+        self.assertEqual(track.language_code, 'tr')
+
+    def test_any_track_and_empty(self):
+        tracks = [FakeTrack('de', is_generated=True)]
+        self.assertEqual(select_caption_track(tracks, ['tr'], '')[1], 'de')
+        self.assertEqual(select_caption_track([], ['tr'], 'tr'), (None, None))
+
+class TestCaptionTrackCache(unittest.TestCase):
+    def test_bounded_and_invalidate(self):
+        cache = CaptionTrackCache(ttl=60, max_entries=1)
+        cache.set('a', 'track-a', 'tr')
+        cache.set('b', 'track-b', 'en')
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('b'), ('track-b', 'en'))
+        cache.invalidate('b')
+        self.assertIsNone(cache.get('b'))
+
+if __name__ == '__main__':
+    unittest.main()
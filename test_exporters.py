@@ -0,0 +1,53 @@
+import json
+import unittest
+
+from exporters import parse_segments, format_cue_time, export_etag, iter_export
+
+RECORD = {
+    'id': 7,
+    'video_id': 'abc',
+    'url': 'https://youtu.be/abc',
+    'language': 'tr',
+    'created': '2024-01-01T00:00:00',
+    'full_transcript': "[00:01] merhaba\n[00:05] dünya\nikinci satır\n[01:00:02] son",
+    'summary': 'özet'
+}
+
+class TestExporters(unittest.TestCase):
+    def test_parse_segments(self):
+        segments = parse_segments(RECORD['full_transcript'])
+        self.assertEqual([s['start'] for s in segments], [1, 5, 3602])
+        self.assertEqual(segments[0]['end'], 5)
+        self.assertEqual(segments[1]['text'], 'dünya ikinci satır')
+        self.assertEqual(segments[-1]['end'], 3606)
+        self.assertEqual(parse_segments("zaman damgasız metin"), [])
+
+    def test_cue_time(self):
+        self.assertEqual(format_cue_time(3661.5), '01:01:01,500')
+        self.assertEqual(format_cue_time(2, '.'), '00:00:02.000')
+
+    def test_srt_and_vtt(self):
+        srt = ''.join(iter_export(RECORD, 'srt'))
+        self.assertTrue(srt.startswith("1\n00:00:01,000 --> 00:00:05,000\nmerhaba\n\n"))
+        vtt = ''.join(iter_export(RECORD, 'vtt'))
+        self.assertTrue(vtt.startswith("WEBVTT\n\n00:00:01.000 --> 00:00:05.000\nmerhaba"))
+
+    def test_json_is_valid(self):
+        data = json.loads(''.join(iter_export(RECORD, 'json')))
+        self.assertEqual(data['video_id'], 'abc')
+        self.assertEqual(len(data['segments']), 3)
+        plain = json.loads(''.join(iter_export({**RECORD, 'full_transcript': 'düz metin'}, 'json')))
+        self.assertEqual(plain['segments'][0]['text'], 'düz metin')
+
+    def test_txt_matches_previous_layout(self):
+        txt = ''.join(iter_export(RECORD, 'txt'))
+        self.assertTrue(txt.startswith("URL: https://youtu.be/abc\nTarih: 2024-01-01T00:00:00\n\n" + "=" * 50))
+        self.assertTrue(txt.endswith("ÖZET:\n\nözet"))
+
+    def test_etag_changes_with_content(self):
+        self.assertEqual(export_etag(RECORD, 'txt'), export_etag(dict(RECORD), 'txt'))
+        self.assertNotEqual(export_etag(RECORD, 'txt'), export_etag(RECORD, 'md'))
+        self.assertNotEqual(export_etag(RECORD, 'txt'), export_etag({**RECORD, 'summary': 'yeni'}, 'txt'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+
+from gemini_router import ModelRouter, OPEN, CLOSED
+
+class FakeModels:
+    def __init__(self, behaviour):
+        self.behaviour = behaviour
+        self.calls = []
+        self.listed = []
+
+    def generate_content(self, model, contents, config=None):
+        self.calls.append(model)
+        result = self.behaviour.get(model, 'ok')
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def list(self):
+        return self.listed
+
+class FakeClient:
+    def __init__(self, behaviour):
+        self.models = FakeModels(behaviour)
+
+class TestModelRouter(unittest.TestCase):
+    def make_router(self, behaviour, models=('a', 'b', 'c')):
+        client = FakeClient(behaviour)
+        return ModelRouter(client, list(models), failure_threshold=2, refresh_interval=0), client
+
+    def test_not_found_model_is_skipped_next_time(self):
+        router, client = self.make_router({'a': Exception('404 NOT_FOUND')})
+        self.assertEqual(router.generate_content('hi'), 'ok')
+        self.assertEqual(client.models.calls, ['a', 'b'])
+
+        client.models.calls.clear()
+        router.generate_content('hi')
+        self.assertEqual(client.models.calls, ['b'])
+        self.assertEqual(router.snapshot()['models'][0]['state'], OPEN)
+
+    def test_failing_model_is_demoted(self):
+        router, client = self.make_router({'a': Exception('500 internal')})
+        router.generate_content('hi')
+        client.models.calls.clear()
+        router.generate_content('hi')
+        self.assertEqual(client.models.calls, ['b'])
+
+    def test_breaker_opens_after_threshold(self):
+        router, client = self.make_router({'a': Exception('500 internal')}, models=('a',))
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                router.generate_content('hi')
+        self.assertEqual(router.snapshot()['models'][0]['state'], OPEN)
+
+    def test_half_open_probe_recovers(self):
+        router, client = self.make_router({'a': Exception('500 internal')})
+        router.record_failure('a', Exception('500 internal'))
+        router.record_failure('a', Exception('500 internal'))
+        router._models['a'].open_until = 0
+        client.models.behaviour['a'] = 'ok'
+        client.models.calls.clear()
+        router.generate_content('hi')
+        # Healthy model goes first, the probe is released without being used
+        self.assertEqual(client.models.calls, ['b'])
+        self.assertFalse(router._models['a'].probe_in_flight)
+
+        client.models.behaviour['b'] = Exception('404 NOT_FOUND')
+        client.models.behaviour['c'] = Exception('404 NOT_FOUND')
+        router.generate_content('hi')
+        self.assertEqual(router._models['a'].state, CLOSED)
+
+    def test_refresh_parks_unlisted_models(self):
+        router, client = self.make_router({})
+
+        class Listed:
+            def __init__(self, name):
+                self.name = name
+                self.supported_actions = ['generateContent']
+
+        client.models.listed = [Listed('models/b')]
+        router.refresh_models()
+        self.assertEqual(router.best_model(), 'b')
+
+    def test_all_failed_raises_last_error(self):
+        router, _ = self.make_router({'a': Exception('x'), 'b': Exception('y'), 'c': Exception('z')})
+        with self.assertRaises(Exception) as ctx:
+            router.generate_content('hi')
+        self.assertEqual(str(ctx.exception), 'z')
+
+    def test_last_model_reports_serving_model(self):
+        router, _ = self.make_router({'a': Exception('500 internal')})
+        self.assertIsNone(router.last_model())
+        router.generate_content('hi')
+        self.assertEqual(router.last_model(), 'b')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import importlib.util
+import unittest
+
+# mcp_client_utils, mcp paketini modül yüklenirken içe aktarır
+HAS_MCP = importlib.util.find_spec('mcp') is not None
+
+if HAS_MCP:
+    from mcp_client_utils import HealthMonitor, _percentiles
+
+class FakePool:
+    """Sağlık kontrolünün kullandığı havuz arayüzü; fail=True iken ping hata verir."""
+
+    def __init__(self, fail=False, saturated=False):
+        self.fail = fail
+        self.busy = saturated
+        self.runs = 0
+        self.on_call_result = None
+
+    def run(self, fn, timeout=None):
+        self.runs += 1
+        if self.fail:
+            raise ConnectionRefusedError("bağlantı reddedildi")
+        return True
+
+    def saturated(self):
+        return self.busy
+
+    def stats(self):
+        return {'sessions': 1}
+
+@unittest.skipUnless(HAS_MCP, "mcp paketi kurulu değil")
+class TestPercentiles(unittest.TestCase):
+    def test_empty(self):
+        self.assertEqual(_percentiles([]), {'p50': None, 'p95': None, 'p99': None})
+
+    def test_milliseconds(self):
+        samples = [i / 1000 for i in range(100, 0, -1)]
+        self.assertEqual(_percentiles(samples), {'p50': 51.0, 'p95': 96.0, 'p99': 100.0})
+
+    def test_single_sample(self):
+        self.assertEqual(_percentiles([0.25]), {'p50': 250.0, 'p95': 250.0, 'p99': 250.0})
+
+@unittest.skipUnless(HAS_MCP, "mcp paketi kurulu değil")
+class TestHealthMonitor(unittest.TestCase):
+    def monitor(self, pool, interval=60):
+        return HealthMonitor(pool, interval=interval, window=3)
+
+    def test_registers_for_call_results(self):
+        pool = FakePool()
+        monitor = self.monitor(pool)
+        self.assertEqual(pool.on_call_result, monitor.record_call)
+
+    def test_failed_probes_are_counted(self):
+        pool = FakePool(fail=True)
+        monitor = self.monitor(pool)
+        monitor.probe()
+        monitor.probe()
+        self.assertFalse(monitor.connected)
+        self.assertEqual(monitor.consecutive_failures, 2)
+        self.assertEqual(monitor.last_error, "bağlantı reddedildi")
+        self.assertIsNone(monitor.last_success)
+
+        pool.fail = False
+        monitor.probe()
+        self.assertTrue(monitor.connected)
+        self.assertEqual(monitor.consecutive_failures, 0)
+
+    def test_failed_call_does_not_mark_disconnected(self):
+        monitor = self.monitor(FakePool())
+        monitor.record_call(0.1, None)
+        monitor.record_call(0.2, RuntimeError("araç hatası"))
+        self.assertTrue(monitor.connected)
+        self.assertEqual(monitor.last_error, "araç hatası")
+
+    def test_latency_window_keeps_recent_samples(self):
+        monitor = self.monitor(FakePool())
+        for latency in (9.0, 0.001, 0.002, 0.003):
+            monitor.record_call(latency, None)
+        self.assertEqual(monitor.snapshot()['call_latency_ms']['p99'], 3.0)
+
+    def test_snapshot_is_cached(self):
+        pool = FakePool()
+        monitor = self.monitor(pool)
+        first = monitor.snapshot()
+        second = monitor.snapshot()
+        self.assertEqual(pool.runs, 1)
+        self.assertEqual(first['status'], 'connected')
+        self.assertEqual(second['last_checked'], first['last_checked'])
+        self.assertIsNotNone(second['ping_latency_ms']['p50'])
+        self.assertEqual(second['pool'], {'sessions': 1})
+
+    def test_recent_call_replaces_probe(self):
+        pool = FakePool()
+        monitor = self.monitor(pool)
+        monitor.record_call(0.05, None)
+        snapshot = monitor.snapshot()
+        self.assertEqual(pool.runs, 0)
+        self.assertTrue(snapshot['connected'])
+        self.assertEqual(snapshot['call_latency_ms']['p50'], 50.0)
+
+    def test_saturated_pool_is_not_probed(self):
+        pool = FakePool(saturated=True)
+        monitor = self.monitor(pool)
+        snapshot = monitor.snapshot()
+        self.assertEqual(pool.runs, 0)
+        self.assertEqual(snapshot['status'], 'disconnected')
+        self.assertIsNone(snapshot['last_checked'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import json
+import base64
+import unittest
+
+from history_cursor import encode_history_cursor, decode_history_cursor
+
+def raw_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode('utf-8')).decode('ascii')
+
+class TestHistoryCursor(unittest.TestCase):
+    def test_round_trip(self):
+        record = {'created': '2024-05-01T12:30:45.123456', 'id': 42, 'title': 'x'}
+        cursor = encode_history_cursor(record)
+        self.assertEqual(decode_history_cursor(cursor), ('2024-05-01T12:30:45.123456', 42))
+
+    def test_timezone_is_kept(self):
+        cursor = encode_history_cursor({'created': '2024-05-01T12:30:45+03:00', 'id': 7})
+        self.assertEqual(decode_history_cursor(cursor), ('2024-05-01T12:30:45+03:00', 7))
+
+    def test_cursor_is_url_safe(self):
+        cursor = encode_history_cursor({'created': '2024-05-01T12:30:45.999999', 'id': 10 ** 12})
+        self.assertNotRegex(cursor, r'[+/]')
+
+    def test_malformed_cursor_is_rejected(self):
+        for cursor in ('', 'bozuk*imleç', 'e30', raw_cursor(5), raw_cursor(['2024-05-01']),
+                       raw_cursor(['2024-05-01', 1, 2]), raw_cursor({'created': '2024-05-01', 'id': 1})):
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(ValueError):
+                    decode_history_cursor(cursor)
+
+    def test_tampered_values_are_rejected(self):
+        # Değerler PostgREST filtresine yazıldığı için tarih ve tamsayı dışındaki her şey reddedilir
+        for created, record_id in (('2024-05-01",id.gt.0', 1), ('dün', 1), (20240501, 1),
+                                   ('2024-05-01T00:00:00', '1),or(id.gt.0'), ('2024-05-01T00:00:00', 1.5),
+                                   ('2024-05-01T00:00:00', True), ('2024-05-01T00:00:00', None)):
+            with self.subTest(created=created, record_id=record_id):
+                with self.assertRaises(ValueError):
+                    decode_history_cursor(raw_cursor([created, record_id]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import time
+import threading
+import unittest
+
+from job_queue import JobManager, QueueFullError
+
+class TestJobManager(unittest.TestCase):
+    def wait_for(self, manager, job_id, timeout=2):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            job = manager.get(job_id)
+            if job['status'] in ('done', 'failed'):
+                return job
+            time.sleep(0.01)
+        self.fail("Job did not finish in time")
+
+    def test_job_result(self):
+        manager = JobManager(workers=1, queue_size=5)
+        job_id = manager.submit(lambda x: ({'value': x}, 200), 42)
+        job = self.wait_for(manager, job_id)
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['result'], {'value': 42})
+
+    def test_error_payload_marks_failed(self):
+        manager = JobManager(workers=1, queue_size=5)
+        job_id = manager.submit(lambda: ({'error': 'bad'}, 400))
+        job = self.wait_for(manager, job_id)
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(job['error'], 'bad')
+
+    def test_queue_full_rejects(self):
+        manager = JobManager(workers=1, queue_size=1)
+        gate = threading.Event()
+        manager.submit(lambda: (gate.wait(), ({}, 200))[1])
+        time.sleep(0.05)  # worker picks up the first job
+        manager.submit(lambda: ({}, 200))
+        with self.assertRaises(QueueFullError):
+            manager.submit(lambda: ({}, 200))
+        gate.set()
+
+    def test_unknown_job(self):
+        self.assertIsNone(JobManager(workers=1).get('missing'))
+
+if __name__ == '__main__':
+    unittest.main()
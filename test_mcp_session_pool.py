@@ -0,0 +1,119 @@
+import asyncio
+import importlib.util
+import unittest
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest import mock
+
+# mcp_client_utils, mcp paketini modül yüklenirken içe aktarır
+HAS_MCP = importlib.util.find_spec('mcp') is not None
+
+if HAS_MCP:
+    import mcp_client_utils
+    from mcp_client_utils import MCPSessionPool, MCPToolError, RequestCancelled
+
+class FakeSession:
+    """SSE bağlantısı kurmadan ClientSession'ın havuzun kullandığı kısmını taklit eder."""
+
+    created = []
+
+    def __init__(self, read, write):
+        self.calls = 0
+        FakeSession.created.append(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def initialize(self):
+        return SimpleNamespace(serverInfo=SimpleNamespace(name='media', version='1'))
+
+    async def list_tools(self):
+        return SimpleNamespace(tools=[SimpleNamespace(name='upload_chunk')])
+
+    async def send_ping(self):
+        pass
+
+@asynccontextmanager
+async def fake_sse_client(url, timeout=None, sse_read_timeout=None):
+    yield None, None
+
+@unittest.skipUnless(HAS_MCP, "mcp paketi kurulu değil")
+class TestMCPSessionPool(unittest.TestCase):
+    def setUp(self):
+        FakeSession.created = []
+        for name, fake in (('ClientSession', FakeSession), ('sse_client', fake_sse_client)):
+            patcher = mock.patch.object(mcp_client_utils, name, fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.pool = MCPSessionPool('http://mcp.test/sse', max_sessions=2, keepalive_interval=60)
+        self.addCleanup(self.pool.close)
+
+    def call(self, fn=None, **kwargs):
+        async def default(session):
+            session.calls += 1
+            return session
+        return self.pool.run(fn or default, **kwargs)
+
+    def capabilities(self):
+        return self.pool.run(lambda session: self.pool.capabilities(session))
+
+    def test_session_is_reused(self):
+        first = self.call()
+        second = self.call()
+        self.assertIs(first, second)
+        self.assertEqual(first.calls, 2)
+        self.assertEqual(self.pool.connects, 1)
+
+    def test_tool_error_keeps_session_and_capabilities(self):
+        self.capabilities()
+
+        async def failing(session):
+            raise MCPToolError("Error: bad input")
+
+        with self.assertRaises(MCPToolError):
+            self.call(failing)
+        self.call()
+        self.capabilities()
+        self.assertEqual(self.pool.connects, 1)
+        self.assertEqual(self.pool.capability_refreshes, 1)
+
+    def test_connection_error_reconnects_and_refreshes_capabilities(self):
+        self.capabilities()
+
+        async def broken(session):
+            raise ConnectionResetError("stream closed")
+
+        with self.assertRaises(ConnectionResetError):
+            self.call(broken)
+        session = self.call()
+        self.assertIs(session, FakeSession.created[-1])
+        self.assertEqual(self.pool.connects, 2)
+        self.capabilities()
+        self.assertEqual(self.pool.capability_refreshes, 2)
+
+    def test_wrapped_connection_error_is_detected(self):
+        async def broken(session):
+            try:
+                raise ConnectionResetError("stream closed")
+            except ConnectionResetError as e:
+                raise Exception(f"Failed to upload chunk 0: {e}")
+
+        with self.assertRaises(Exception):
+            self.call(broken)
+        self.call()
+        self.assertEqual(self.pool.connects, 2)
+
+    def test_cancelled_call_keeps_session(self):
+        async def slow(session):
+            await asyncio.sleep(10)
+
+        with self.assertRaises(RequestCancelled):
+            self.call(slow, timeout=0.1)
+        self.call()
+        self.assertEqual(self.pool.connects, 1)
+
+if __name__ == '__main__':
+    unittest.main()
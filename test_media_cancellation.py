@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import subprocess
+import importlib.util
+import unittest
+from unittest import mock
+
+# Sunucunun cancellation modülü, uygulamadaki cancellation.py ile aynı adı taşıdığı için yoldan yüklenir
+_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mcp-media-server', 'src', 'cancellation.py')
+_spec = importlib.util.spec_from_file_location('media_cancellation', _path)
+cancellation = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(cancellation)
+
+class TestCancelToken(unittest.TestCase):
+    def test_check_passes_until_cancelled(self):
+        token = cancellation.CancelToken('req')
+        token.check()
+        token.cancel('kullanıcı vazgeçti')
+        self.assertTrue(token.cancelled)
+        with self.assertRaises(cancellation.RequestCancelled) as ctx:
+            token.check()
+        self.assertEqual(str(ctx.exception), 'kullanıcı vazgeçti')
+
+    def test_first_reason_is_kept(self):
+        token = cancellation.CancelToken()
+        token.cancel('ilk')
+        token.cancel('ikinci')
+        self.assertEqual(token.reason, 'ilk')
+
+    def test_deadline_cancels(self):
+        token = cancellation.CancelToken(deadline=time.time() - 1)
+        with self.assertRaises(cancellation.RequestCancelled):
+            token.check()
+        self.assertEqual(token.reason, 'Son süre aşıldı')
+
+    def test_run_process_returns_output(self):
+        token = cancellation.CancelToken()
+        result = token.run_process([sys.executable, '-c', 'print("ok")'])
+        self.assertEqual(result.stdout.strip(), b'ok')
+
+    def test_run_process_raises_on_failure(self):
+        token = cancellation.CancelToken()
+        with self.assertRaises(subprocess.CalledProcessError):
+            token.run_process([sys.executable, '-c', 'import sys; sys.exit(3)'])
+
+    def test_run_process_is_killed_on_deadline(self):
+        token = cancellation.CancelToken(deadline=time.time() + 0.3)
+        started = time.time()
+        with mock.patch.object(cancellation, 'CANCEL_POLL_INTERVAL', 0.05):
+            with self.assertRaises(cancellation.RequestCancelled):
+                token.run_process([sys.executable, '-c', 'import time; time.sleep(30)'])
+        self.assertLess(time.time() - started, 5)
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        patchers = [mock.patch.object(cancellation, '_tokens', {}), mock.patch.object(cancellation, '_early_cancels', {})]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_cancel_reaches_registered_token(self):
+        token = cancellation.register('req')
+        self.assertEqual(cancellation.active_requests(), 1)
+        self.assertTrue(cancellation.cancel('req'))
+        self.assertTrue(token.cancelled)
+        cancellation.release(token)
+        self.assertEqual(cancellation.active_requests(), 0)
+
+    def test_early_cancel_is_applied_on_register(self):
+        # İptal, istek sunucuya ulaşmadan gelirse hatırlanır
+        self.assertFalse(cancellation.cancel('req'))
+        token = cancellation.register('req')
+        self.assertTrue(token.cancelled)
+        # Hatırlanan iptal bir kez kullanılır
+        self.assertFalse(cancellation.register('req').cancelled)
+
+    def test_expired_early_cancels_are_pruned(self):
+        cancellation.cancel('old')
+        cancellation._early_cancels['old'] -= cancellation.EARLY_CANCEL_TTL + 1
+        cancellation.cancel('new')
+        self.assertEqual(set(cancellation._early_cancels), {'new'})
+        self.assertFalse(cancellation.register('old').cancelled)
+
+    def test_token_without_request_id_is_not_registered(self):
+        token = cancellation.register('', deadline=time.time() + 60)
+        self.assertEqual(cancellation.active_requests(), 0)
+        cancellation.release(token)
+
+    def test_release_keeps_newer_token(self):
+        first = cancellation.register('req')
+        second = cancellation.register('req')
+        cancellation.release(first)
+        self.assertTrue(cancellation.cancel('req'))
+        self.assertTrue(second.cancelled)
+        self.assertFalse(first.cancelled)
+
+if __name__ == '__main__':
+    unittest.main()
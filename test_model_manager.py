@@ -0,0 +1,129 @@
+import os
+import sys
+import time
+import threading
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mcp-media-server', 'src'))
+
+import transcribe
+from transcribe import ModelManager
+
+# Sahte boyutlar: bytes_per_param=1 ile her model MODEL_PARAMS'taki kadar byte tutar
+SIZES = {'a': 100, 'b': 100, 'c': 100, 'large': 1000}
+
+class FakeBackend:
+    name = 'fake'
+    bytes_per_param = 1
+
+    def __init__(self, fail=(), delay=0.0):
+        self.loads = []
+        self.warmups = 0
+        self.fail = set(fail)
+        self.delay = delay
+
+    def load(self, model_size):
+        if model_size in self.fail:
+            raise RuntimeError(f"{model_size} yüklenemedi")
+        time.sleep(self.delay)
+        self.loads.append(model_size)
+        return f"model-{model_size}"
+
+    def transcribe(self, model, audio):
+        self.warmups += 1
+        return ""
+
+    def model_bytes(self, model, model_size=""):
+        return 0  # Tahmine (MODEL_PARAMS) düşülür
+
+class TestModelManager(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(transcribe.MODEL_PARAMS, SIZES, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.backend = FakeBackend()
+
+    def manager(self, budget):
+        return ModelManager(budget_bytes=budget, warmup=False)
+
+    def resident(self, manager):
+        return list(manager.stats()['models'])
+
+    def test_least_recently_used_is_evicted(self):
+        manager = self.manager(250)
+        manager.get('a', self.backend)
+        manager.get('b', self.backend)
+        manager.get('a', self.backend)
+        manager.get('c', self.backend)
+        self.assertEqual(self.resident(manager), ['fake:a', 'fake:c'])
+        self.assertEqual(manager.evictions, 1)
+        self.assertEqual(self.backend.loads, ['a', 'b', 'c'])
+
+    def test_cached_model_is_not_reloaded(self):
+        manager = self.manager(1000)
+        self.assertEqual(manager.get('a', self.backend), 'model-a')
+        self.assertEqual(manager.get('a', self.backend), 'model-a')
+        self.assertEqual(self.backend.loads, ['a'])
+
+    def test_model_in_use_is_not_evicted(self):
+        manager = self.manager(250)
+        with manager.use('a', self.backend):
+            manager.get('b', self.backend)
+            manager.get('c', self.backend)
+            # a en eski olduğu halde kullanımda; yerine b çıkarılır
+            self.assertEqual(self.resident(manager), ['fake:a', 'fake:c'])
+
+    def test_budget_is_exceeded_only_while_models_are_in_use(self):
+        manager = self.manager(150)
+        with manager.use('a', self.backend):
+            with manager.use('b', self.backend):
+                stats = manager.stats()
+                self.assertEqual(stats['resident_bytes'], 200)
+                self.assertEqual(stats['models']['fake:a']['users'], 1)
+        stats = manager.stats()
+        self.assertEqual(stats['resident_bytes'], 100)
+        self.assertEqual(list(stats['models']), ['fake:b'])
+        self.assertEqual(stats['models']['fake:b']['users'], 0)
+
+    def test_model_larger_than_budget_stays_loaded(self):
+        manager = self.manager(50)
+        manager.get('a', self.backend)
+        self.assertEqual(self.resident(manager), ['fake:a'])
+        manager.get('a', self.backend)
+        self.assertEqual(self.backend.loads, ['a'])
+
+    def test_concurrent_requests_load_once(self):
+        backend = FakeBackend(delay=0.2)
+        manager = self.manager(1000)
+        threads = [threading.Thread(target=manager.get, args=('a', backend)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(backend.loads, ['a'])
+
+    def test_preload_skips_failures(self):
+        backend = FakeBackend(fail={'b'})
+        manager = self.manager(1000)
+        manager.preload(['a', 'b', 'c'], backend)
+        self.assertEqual(self.resident(manager), ['fake:a', 'fake:c'])
+
+    def test_stats(self):
+        manager = ModelManager(budget_bytes=1000, warmup=True)
+        manager.get('a', self.backend)
+        manager.get('a', self.backend)
+        stats = manager.stats()
+        entry = stats['models']['fake:a']
+        self.assertNotIn('model', entry)
+        self.assertEqual(entry['bytes'], 100)
+        self.assertEqual(entry['hits'], 1)
+        self.assertEqual(entry['backend'], 'fake')
+        self.assertIsNotNone(entry['warmup_seconds'])
+        self.assertEqual(self.backend.warmups, 1)
+        self.assertEqual(stats['resident_bytes'], 100)
+        self.assertEqual(stats['budget_bytes'], 1000)
+        self.assertEqual(stats['evictions'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
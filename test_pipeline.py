@@ -0,0 +1,164 @@
+import os
+import sys
+import time
+import threading
+import shutil
+import tempfile
+import subprocess
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mcp-media-server', 'src'))
+
+from pipeline import SegmentPipeline
+from audio import stream_segments, StreamError
+
+class Cancelled(Exception):
+    pass
+
+class FakeToken:
+    def __init__(self):
+        self.cancelled = False
+
+    def check(self):
+        if self.cancelled:
+            raise Cancelled()
+
+def make_segments(count, delay=0.0):
+    for i in range(count):
+        if delay:
+            time.sleep(delay)
+        yield {'path': f'seg{i}.wav', 'start': i * 10.0, 'end': (i + 1) * 10.0}
+
+class TestSegmentPipeline(unittest.TestCase):
+    def test_segments_arrive_in_order(self):
+        added = []
+        pipeline = SegmentPipeline(on_segment=lambda segment: added.append(segment['path']), queue_size=2)
+        pipeline.start(make_segments(6, delay=0.01))
+        received = [segment['path'] for segment in pipeline]
+        pipeline.close()
+
+        expected = [f'seg{i}.wav' for i in range(6)]
+        self.assertEqual(received, expected)
+        self.assertEqual(added, expected)
+        self.assertEqual(pipeline.paths, expected)
+
+    def test_queue_bounds_producer(self):
+        pipeline = SegmentPipeline(queue_size=1)
+        pipeline.start(make_segments(10))
+        iterator = iter(pipeline)
+        next(iterator)
+        time.sleep(0.2)
+        # Bir parça tüketildi, biri kuyrukta, biri de kuyruğa girmeyi bekliyor
+        self.assertLessEqual(len(pipeline.paths), 3)
+        pipeline.close()
+
+    def test_producer_error_is_raised_after_segments(self):
+        def failing():
+            yield from make_segments(2)
+            raise RuntimeError("ffmpeg failed")
+
+        pipeline = SegmentPipeline()
+        pipeline.start(failing())
+        received = []
+        with self.assertRaises(RuntimeError):
+            for segment in pipeline:
+                received.append(segment['path'])
+        pipeline.close()
+        self.assertEqual(received, ['seg0.wav', 'seg1.wav'])
+
+    def test_close_kills_blocked_process(self):
+        added = []
+        pipeline = SegmentPipeline(on_segment=lambda segment: added.append(segment['path']))
+
+        def blocked():
+            process = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'], stdout=subprocess.PIPE)
+            pipeline.attach_process(process)
+            try:
+                process.stdout.read()  # Takılmış ağ okuması gibi bloklanır
+                # Süreç öldürülünce kalan ses son parça olarak yazılır
+                yield {'path': 'tail.wav', 'start': 0.0, 'end': 1.0}
+            finally:
+                process.wait()
+                process.stdout.close()
+
+        pipeline.start(blocked())
+        while pipeline._process is None:
+            time.sleep(0.01)
+
+        started = time.time()
+        pipeline.close()
+        self.assertLess(time.time() - started, 5)
+        self.assertIsNotNone(pipeline._process.poll())
+        # Kapatıldıktan sonra yazılan parça temizlik için kaydedilir ama işe gönderilmez
+        self.assertEqual(pipeline.paths, ['tail.wav'])
+        self.assertEqual(added, [])
+
+    def test_cancelled_token_stops_iteration(self):
+        token = FakeToken()
+        pipeline = SegmentPipeline(token=token)
+        stop = threading.Event()
+
+        def slow():
+            yield {'path': 'seg0.wav', 'start': 0.0, 'end': 10.0}
+            stop.wait(10)
+
+        pipeline.start(slow())
+        iterator = iter(pipeline)
+        next(iterator)
+        token.cancelled = True
+        with self.assertRaises(Cancelled):
+            next(iterator)
+        stop.set()
+        pipeline.close()
+
+FAKE_FFMPEG = """#!{python}
+import os, sys
+# Gürültü (yüksek seviye) yazıp hata koduyla çıkan sahte ffmpeg
+sys.stdout.buffer.write(os.urandom({nbytes}))
+sys.stdout.flush()
+sys.stderr.write("connection reset")
+sys.exit(1)
+"""
+
+class TestStreamSegments(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+
+    def fake_ffmpeg(self, seconds):
+        bin_dir = os.path.join(self.root, 'bin')
+        os.makedirs(bin_dir)
+        path = os.path.join(bin_dir, 'ffmpeg')
+        with open(path, 'w') as f:
+            f.write(FAKE_FFMPEG.format(python=sys.executable, nbytes=int(seconds * 16000) * 2))
+        os.chmod(path, 0o755)
+        patcher = mock.patch.dict(os.environ, {'PATH': bin_dir + os.pathsep + os.environ['PATH']})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_ffmpeg_dying_mid_stream_fails_the_pipeline(self):
+        self.fake_ffmpeg(40)
+        pipeline = SegmentPipeline()
+        pipeline.start(stream_segments('http://example/stream', self.root, 'video', target_length=5))
+        received = []
+        with self.assertRaises(StreamError) as ctx:
+            for segment in pipeline:
+                received.append(segment)
+        pipeline.close()
+
+        # Kesilmeden önce hazır olan parçalar gelir, kalan tampon son parça olarak yazılmaz
+        self.assertTrue(received)
+        self.assertEqual(ctx.exception.segments, len(received))
+        self.assertIn('connection reset', str(ctx.exception))
+        self.assertLess(received[-1]['end'], 40)
+        self.assertEqual(pipeline.paths, [segment['path'] for segment in received])
+
+    def test_ffmpeg_failing_at_start_reports_no_segments(self):
+        self.fake_ffmpeg(0)
+        with self.assertRaises(StreamError) as ctx:
+            list(stream_segments('http://example/stream', self.root, 'video'))
+        self.assertEqual(ctx.exception.segments, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+import threading
+import subprocess
+import importlib.util
+import unittest
+from unittest import mock
+
+# mcp_client_utils, mcp paketini modül yüklenirken içe aktarır
+HAS_MCP = importlib.util.find_spec('mcp') is not None
+
+if HAS_MCP:
+    import mcp_client_utils
+    from mcp_client_utils import precompress_audio, precompress_stats
+
+ZERO_STATS = {"files": 0, "skipped": 0, "failed": 0, "bytes_in": 0, "bytes_out": 0, "bytes_saved": 0}
+
+def fake_ffmpeg(output_size=None, error=None):
+    """subprocess.run yerine geçer: çıktı dosyasına output_size byte yazar veya error fırlatır."""
+    def run(cmd, **kwargs):
+        if error is not None:
+            raise error
+        with open(cmd[-1], 'wb') as f:
+            f.write(b'o' * output_size)
+    return run
+
+@unittest.skipUnless(HAS_MCP, "mcp paketi kurulu değil")
+class TestPrecompressAudio(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, True)
+        patchers = [
+            mock.patch.dict(mcp_client_utils._precompress_stats, ZERO_STATS),
+            mock.patch.object(mcp_client_utils, 'MCP_PRECOMPRESS', 'auto'),
+            mock.patch.object(mcp_client_utils, 'MCP_PRECOMPRESS_MIN_BYTES', 100),
+            mock.patch.object(mcp_client_utils.shutil, 'which', return_value='/usr/bin/ffmpeg'),
+            mock.patch.object(tempfile, 'tempdir', self.dir),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.source = os.path.join(self.dir, 'kayit.wav')
+        with open(self.source, 'wb') as f:
+            f.write(b'i' * 1000)
+        self.events = []
+
+    def compress(self, **ffmpeg):
+        with mock.patch.object(mcp_client_utils.subprocess, 'run', side_effect=fake_ffmpeg(**ffmpeg)) as run:
+            result = precompress_audio(self.source, self.events.append)
+        return result, run
+
+    def leftovers(self):
+        return sorted(set(os.listdir(self.dir)) - {'kayit.wav'})
+
+    def test_compressed_file_is_returned(self):
+        (path, saved), _ = self.compress(output_size=200)
+        self.addCleanup(os.unlink, path)
+        self.assertNotEqual(path, self.source)
+        self.assertTrue(path.endswith('.ogg'))
+        self.assertEqual(saved, 800)
+        self.assertEqual(precompress_stats(), {**ZERO_STATS, "files": 1, "bytes_in": 1000, "bytes_out": 200,
+                                               "bytes_saved": 800})
+        self.assertEqual(self.events[0]['step'], 'precompress')
+
+    def test_output_that_does_not_shrink_is_skipped(self):
+        (path, saved), _ = self.compress(output_size=1000)
+        self.assertEqual((path, saved), (self.source, 0))
+        self.assertEqual(precompress_stats()['skipped'], 1)
+        self.assertEqual(self.leftovers(), [])
+        self.assertEqual(self.events, [])
+
+    def test_ffmpeg_failure_sends_original(self):
+        error = subprocess.CalledProcessError(1, 'ffmpeg', stderr=b'Invalid data found')
+        with mock.patch('builtins.print') as printed:
+            (path, saved), _ = self.compress(error=error)
+        self.assertEqual((path, saved), (self.source, 0))
+        self.assertIn('Invalid data found', printed.call_args[0][0])
+        self.assertEqual(precompress_stats()['failed'], 1)
+        self.assertEqual(self.leftovers(), [])
+
+    def test_timeout_counts_as_failure(self):
+        (path, _), _ = self.compress(error=subprocess.TimeoutExpired('ffmpeg', 1))
+        self.assertEqual(path, self.source)
+        self.assertEqual(precompress_stats()['failed'], 1)
+        self.assertEqual(self.leftovers(), [])
+
+    def test_small_file_is_not_compressed(self):
+        with mock.patch.object(mcp_client_utils, 'MCP_PRECOMPRESS_MIN_BYTES', 10_000):
+            (path, saved), run = self.compress(output_size=1)
+        self.assertEqual((path, saved), (self.source, 0))
+        run.assert_not_called()
+        self.assertEqual(precompress_stats(), ZERO_STATS)
+
+    def test_disabled_or_missing_ffmpeg(self):
+        for setting, ffmpeg in (('off', '/usr/bin/ffmpeg'), ('auto', None), ('on', None)):
+            with self.subTest(setting=setting, ffmpeg=ffmpeg):
+                with mock.patch.object(mcp_client_utils, 'MCP_PRECOMPRESS', setting), \
+                        mock.patch.object(mcp_client_utils.shutil, 'which', return_value=ffmpeg):
+                    (path, _), run = self.compress(output_size=1)
+                self.assertEqual(path, self.source)
+                run.assert_not_called()
+
+    def test_counters_are_exact_under_concurrency(self):
+        def count():
+            for _ in range(200):
+                mcp_client_utils._count_precompress(files=1, bytes_saved=3)
+
+        threads = [threading.Thread(target=count) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = precompress_stats()
+        self.assertEqual(stats['files'], 1600)
+        self.assertEqual(stats['bytes_saved'], 4800)
+
+if __name__ == '__main__':
+    unittest.main()
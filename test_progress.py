@@ -0,0 +1,72 @@
+import json
+import threading
+import unittest
+
+from progress import ProgressBroker, is_valid_progress_id
+
+PID = 'abcdef1234567890'
+
+def parse(messages):
+    events = []
+    for message in messages:
+        if message.startswith('id:'):
+            events.append(json.loads(message.split('data: ', 1)[1]))
+    return events
+
+class TestProgressBroker(unittest.TestCase):
+    def test_replays_events_and_stops_when_finished(self):
+        broker = ProgressBroker(keepalive=0.05)
+        broker.publish(PID, {'step': 'download', 'progress': 10})
+        broker.publish(PID, {'step': 'split', 'progress': 25})
+        broker.finish(PID)
+
+        events = parse(list(broker.subscribe(PID)))
+        self.assertEqual([e['step'] for e in events], ['download', 'split', 'done'])
+
+    def test_live_subscriber_receives_events(self):
+        broker = ProgressBroker(keepalive=0.05)
+        messages = []
+        reader = threading.Thread(target=lambda: messages.extend(broker.subscribe(PID)))
+        reader.start()
+        broker.publish(PID, {'step': 'transcribe', 'chunk': 1, 'text': 'merhaba'})
+        broker.finish(PID)
+        reader.join(2)
+
+        self.assertFalse(reader.is_alive())
+        events = parse(messages)
+        self.assertEqual(events[0]['text'], 'merhaba')
+        self.assertEqual(events[-1]['step'], 'done')
+
+    def test_resume_from_last_event_id(self):
+        broker = ProgressBroker(keepalive=0.05)
+        for i in range(3):
+            broker.publish(PID, {'step': 'chunk', 'chunk': i})
+        broker.finish(PID)
+
+        events = parse(list(broker.subscribe(PID, last_event_id='2')))
+        self.assertEqual([e.get('chunk') for e in events], [2, None])
+
+    def test_group_publishes_to_all_members(self):
+        broker = ProgressBroker(keepalive=0.05)
+        other = 'fedcba0987654321'
+        broker.join('flight', PID)
+        broker.join('flight', other)
+        broker.publish_group('flight', {'step': 'upload'})
+        broker.leave('flight', other)
+        broker.publish_group('flight', {'step': 'transcribe'})
+        broker.finish(PID)
+        broker.finish(other)
+
+        self.assertEqual([e['step'] for e in parse(broker.subscribe(PID))], ['upload', 'transcribe', 'done'])
+        self.assertEqual([e['step'] for e in parse(broker.subscribe(other))], ['upload', 'done'])
+
+    def test_invalid_ids_are_ignored(self):
+        self.assertFalse(is_valid_progress_id('../x'))
+        self.assertFalse(is_valid_progress_id(None))
+        broker = ProgressBroker()
+        broker.publish('../x', {'step': 'x'})
+        broker.finish(None)
+        self.assertEqual(broker._channels, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mcp-media-server', 'src'))
+
+from audio import (parse_silences, plan_segments, silent_runs, FRAME_SECONDS, MIN_SEGMENT_SECONDS,
+                   SILENCE_DROP_SECONDS)
+from transcribe import format_transcript
+
+LOUD = -10.0
+QUIET = -80.0
+
+def levels(*parts):
+    """(saniye, seviye) çiftlerinden kare seviyeleri üretir."""
+    return np.concatenate([np.full(int(round(seconds / FRAME_SECONDS)), level) for seconds, level in parts])
+
+class TestParseSilences(unittest.TestCase):
+    def test_no_silences(self):
+        self.assertEqual(parse_silences("size=N/A time=00:10:00.00\n", 600.0), [])
+
+    def test_pairs_and_trailing_silence(self):
+        output = "\n".join([
+            "[silencedetect @ 0x1] silence_start: -0.01",
+            "[silencedetect @ 0x1] silence_end: 1.5 | silence_duration: 1.51",
+            "[silencedetect @ 0x1] silence_start: 95.2",
+        ])
+        self.assertEqual(parse_silences(output, 100.0), [(0.0, 1.5), (95.2, 100.0)])
+
+class TestSilentRuns(unittest.TestCase):
+    def test_no_silence(self):
+        self.assertEqual(silent_runs(levels((5, LOUD)), final=True), [])
+
+    def test_short_dips_are_ignored(self):
+        self.assertEqual(silent_runs(levels((2, LOUD), (0.2, QUIET), (2, LOUD)), final=True), [])
+
+    def test_run_in_the_middle(self):
+        runs = silent_runs(levels((2, LOUD), (1, QUIET), (2, LOUD)), final=True)
+        self.assertEqual(len(runs), 1)
+        self.assertAlmostEqual(runs[0][0], 2.0)
+        self.assertAlmostEqual(runs[0][1], 3.0)
+
+    def test_open_run_waits_for_more_audio(self):
+        # Tampon sonunda süren kısa sessizlik uzayabilir; akış bitmeden karar verilmez
+        data = levels((2, LOUD), (1, QUIET))
+        self.assertEqual(silent_runs(data, final=False), [])
+        self.assertEqual(len(silent_runs(data, final=True)), 1)
+
+    def test_all_silence(self):
+        runs = silent_runs(levels((10, QUIET)), final=True)
+        self.assertEqual(len(runs), 1)
+        self.assertAlmostEqual(runs[0][0], 0.0)
+        self.assertAlmostEqual(runs[0][1], 10.0)
+
+class TestPlanSegments(unittest.TestCase):
+    def test_short_recording_without_silences(self):
+        self.assertEqual(plan_segments(100.0, []), [(0.0, 100.0)])
+
+    def test_long_recording_without_silences_is_cut_at_target(self):
+        self.assertEqual(plan_segments(600.0, [], target=180, window=30),
+                         [(0.0, 180.0), (180.0, 360.0), (360.0, 540.0), (540.0, 600.0)])
+
+    def test_all_silence_returns_nothing(self):
+        self.assertEqual(plan_segments(100.0, [(0.0, 100.0)]), [])
+        self.assertEqual(plan_segments(100.0, parse_silences("silence_start: 0", 100.0)), [])
+
+    def test_cut_snaps_to_nearest_pause(self):
+        pauses = [(160.0, 160.5), (175.0, 175.5), (205.0, 205.5)]
+        segments = plan_segments(400.0, pauses, target=180, window=30)
+        self.assertEqual(segments[0], (0.0, 175.25))
+        self.assertEqual(segments[1][0], 175.25)
+        self.assertEqual(segments[-1][1], 400.0)
+
+    def test_pause_outside_window_is_ignored(self):
+        segments = plan_segments(400.0, [(100.0, 100.5)], target=180, window=30)
+        self.assertEqual(segments[0], (0.0, 180.0))
+
+    def test_long_silence_is_dropped(self):
+        segments = plan_segments(100.0, [(40.0, 60.0)])
+        self.assertEqual(segments, [(0.0, 40.2), (59.8, 100.0)])
+
+    def test_short_trailing_region_is_dropped(self):
+        # Uzun sessizlikten sonra kalan konuşma MIN_SEGMENT_SECONDS'tan kısa
+        end = 100.0 - (MIN_SEGMENT_SECONDS / 2)
+        segments = plan_segments(100.0, [(50.0, end)])
+        self.assertGreaterEqual(end - 50.0, SILENCE_DROP_SECONDS)
+        self.assertEqual(segments, [(0.0, 50.2)])
+
+class TestFormatTranscript(unittest.TestCase):
+    def test_offset_makes_timestamps_absolute(self):
+        segments = [{'start': 0.0, 'end': 4.0, 'text': ' Merhaba'}, {'start': 65.0, 'end': 70.0, 'text': ' dünya '}]
+        lines, text = format_transcript(segments, offset=175.25)
+        self.assertEqual(lines, "[02:55] Merhaba\n[04:00] dünya")
+        self.assertEqual(text, "Merhaba dünya")
+
+    def test_stitched_chunks_cross_the_hour(self):
+        chunks = [
+            ((0.0, 3590.0), [{'start': 3585.0, 'end': 3589.0, 'text': 'son'}]),
+            ((3590.0, 3700.0), [{'start': 15.0, 'end': 18.0, 'text': 'ilk'}, {'start': 20.0, 'end': 21.0, 'text': '  '}]),
+        ]
+        lines = [format_transcript(segments, start)[0] for (start, _), segments in chunks]
+        self.assertEqual(lines, ["[59:45] son", "[01:00:05] ilk"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import time
+import threading
+import unittest
+
+from singleflight import SingleFlight
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_result(self):
+        flight = SingleFlight()
+        calls = []
+
+        def work():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'result'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do('key', work))) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([r[0] for r in results], ['result'] * 5)
+        self.assertEqual(sum(1 for r in results if r[1]), 4)
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_error_propagates_to_waiters(self):
+        flight = SingleFlight()
+        started = threading.Event()
+
+        def fail():
+            started.set()
+            time.sleep(0.05)
+            raise ValueError('boom')
+
+        errors = []
+
+        def run():
+            try:
+                flight.do('key', fail)
+            except ValueError as e:
+                errors.append(str(e))
+
+        leader = threading.Thread(target=run)
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=run)
+        follower.start()
+        leader.join()
+        follower.join()
+        self.assertEqual(errors, ['boom', 'boom'])
+
+    def test_sequential_calls_run_again(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do('key', lambda: 1), (1, False))
+        self.assertEqual(flight.do('key', lambda: 2), (2, False))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import threading
+import unittest
+
+from rate_limit import RateLimiter
+from summarizer import split_segments, chunk_segments, summarize_text
+
+class TestSummarizer(unittest.TestCase):
+    def setUp(self):
+        self.limiter = RateLimiter(0)
+
+    def test_split_segments(self):
+        segments = split_segments("[00:01] merhaba\n[01:02:03] dünya")
+        self.assertEqual(segments, [('00:01', 'merhaba'), ('01:02:03', 'dünya')])
+        self.assertEqual(split_segments("Bir. İki? Üç"), [(None, 'Bir.'), (None, 'İki?'), (None, 'Üç')])
+
+    def test_chunks_respect_limit_and_keep_all_text(self):
+        segments = [(f"00:{i:02d}", "kelime " * 10) for i in range(50)]
+        chunks = chunk_segments(segments, max_chars=200)
+        self.assertTrue(all(len(text) <= 200 for _, text in chunks))
+        self.assertEqual(sum(text.count('kelime') for _, text in chunks), 500)
+        self.assertTrue(chunks[0][0].startswith('00:00 - '))
+
+    def test_short_text_single_call(self):
+        prompts = []
+        summary = summarize_text("[00:01] kısa metin", lambda p: prompts.append(p) or 'özet', limiter=self.limiter)
+        self.assertEqual(summary, 'özet')
+        self.assertEqual(len(prompts), 1)
+        self.assertNotIn('[00:01]', prompts[0])
+
+    def test_long_text_map_reduce_covers_everything(self):
+        lines = '\n'.join(f"[00:{i:02d}] satır{i} " + "x" * 50 for i in range(60))
+        prompts = []
+        lock = threading.Lock()
+
+        def generate(prompt):
+            with lock:
+                prompts.append(prompt)
+            return 'kısmi'
+
+        summarize_text(lines, generate, max_chars=500, max_concurrency=3, limiter=self.limiter)
+        map_prompts = [p for p in prompts if 'bölümü' in p]
+        self.assertGreater(len(map_prompts), 1)
+        for i in range(60):
+            self.assertTrue(any(f"satır{i} " in p for p in map_prompts))
+        self.assertIn('birleştir', prompts[-1])
+
+if __name__ == '__main__':
+    unittest.main()
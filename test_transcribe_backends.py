@@ -0,0 +1,79 @@
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mcp-media-server', 'src'))
+
+import transcribe
+from transcribe import FasterWhisperBackend, get_backend, set_cpu_threads
+
+class FakeWhisperModel:
+    def __init__(self, model_size, device, compute_type, cpu_threads):
+        self.model_size = model_size
+        self.cpu_threads = cpu_threads
+
+class FakePipeline:
+    def __init__(self, model):
+        self.model = model
+
+# faster-whisper kurulu olmasa da seçim ve yükleme yolu sahte modülle denenir
+fake_faster_whisper = SimpleNamespace(WhisperModel=FakeWhisperModel, BatchedInferencePipeline=FakePipeline)
+
+class TestGetBackend(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(transcribe, '_missing_warned', set())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_unknown_backend_raises(self):
+        with self.assertRaises(ValueError):
+            get_backend('whisper-cpp')
+
+    def test_default_comes_from_environment_setting(self):
+        with mock.patch.object(transcribe, 'TRANSCRIBE_BACKEND', 'whisper'):
+            self.assertIs(get_backend(), transcribe.BACKENDS['whisper'])
+            self.assertIs(get_backend(''), transcribe.BACKENDS['whisper'])
+
+    def test_name_is_normalized(self):
+        with mock.patch.object(transcribe, 'faster_whisper', fake_faster_whisper):
+            self.assertIs(get_backend(' Faster_Whisper '), transcribe.BACKENDS['faster-whisper'])
+
+    def test_missing_backend_falls_back_to_whisper(self):
+        with mock.patch.object(transcribe, 'faster_whisper', None), mock.patch('builtins.print') as printed:
+            self.assertIs(get_backend('faster-whisper'), transcribe.BACKENDS['whisper'])
+            self.assertIs(get_backend('faster-whisper'), transcribe.BACKENDS['whisper'])
+        # Uyarı yalnızca ilk seferde yazılır
+        self.assertEqual(printed.call_count, 1)
+
+class TestFasterWhisperBackend(unittest.TestCase):
+    def test_set_cpu_threads(self):
+        backend = transcribe.BACKENDS['faster-whisper']
+        original = backend.cpu_threads
+        self.addCleanup(setattr, backend, 'cpu_threads', original)
+        set_cpu_threads(2)
+        self.assertEqual(backend.cpu_threads, 2)
+        with mock.patch.object(transcribe, 'faster_whisper', fake_faster_whisper):
+            model = backend.load('base')
+        self.assertEqual(model.model.cpu_threads, 2)
+
+    def test_batching_can_be_disabled(self):
+        with mock.patch.object(transcribe, 'faster_whisper', fake_faster_whisper):
+            self.assertIsInstance(FasterWhisperBackend(batch_size=8).load('tiny'), FakePipeline)
+            self.assertIsInstance(FasterWhisperBackend(batch_size=0).load('tiny'), FakeWhisperModel)
+
+    def test_bytes_per_param_follows_compute_type(self):
+        self.assertEqual(FasterWhisperBackend(compute_type='int8').bytes_per_param, 1)
+        self.assertEqual(FasterWhisperBackend(compute_type='float16').bytes_per_param, 2)
+        self.assertEqual(FasterWhisperBackend(compute_type='float32').bytes_per_param, 4)
+
+    def test_model_bytes_is_estimated_per_model(self):
+        backend = FasterWhisperBackend(compute_type='int8')
+        self.assertEqual(backend.model_bytes(object(), 'base'), transcribe.MODEL_PARAMS['base'])
+        self.assertEqual(backend.model_bytes(object(), 'large-v3'), transcribe.MODEL_PARAMS['large'])
+        self.assertEqual(FasterWhisperBackend(compute_type='float16').model_bytes(object(), 'small'),
+                         2 * transcribe.MODEL_PARAMS['small'])
+
+if __name__ == '__main__':
+    unittest.main()
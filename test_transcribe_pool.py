@@ -0,0 +1,143 @@
+import os
+import sys
+import unittest
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mcp-media-server', 'src'))
+
+import transcribe_pool
+from transcribe_pool import ChunkTranscription, worker_count
+
+def fake_segments(path, model_size='base', backend=None):
+    return [{'start': 0.0, 'end': 1.0, 'text': f'yerel:{path}'}]
+
+class Cancelled(Exception):
+    pass
+
+class FakeToken:
+    def __init__(self):
+        self.cancelled = False
+
+    def check(self):
+        if self.cancelled:
+            raise Cancelled()
+
+class FakeExecutor:
+    """Parçayı hemen sonuçlanan bir Future ile 'işler'; broken=True ise çökmüş havuzu taklit eder."""
+
+    def __init__(self, broken=False):
+        self.broken = broken
+        self.submitted = []
+
+    def submit(self, fn, path, model_size, backend):
+        if self.broken:
+            raise BrokenProcessPool()
+        self.submitted.append(path)
+        future = Future()
+        future.set_result([{'start': 0.0, 'end': 1.0, 'text': f'havuz:{path}'}])
+        return future
+
+class TestWorkerCount(unittest.TestCase):
+    def count(self, workers, cpus, threads=2):
+        with mock.patch.object(transcribe_pool, 'WHISPER_WORKERS', workers), \
+                mock.patch.object(transcribe_pool, 'WHISPER_THREADS_PER_WORKER', threads), \
+                mock.patch.object(transcribe_pool.os, 'cpu_count', return_value=cpus):
+            return worker_count()
+
+    def test_auto_divides_cores_by_threads(self):
+        self.assertEqual(self.count('auto', 8), 4)
+        self.assertEqual(self.count(' AUTO ', 8, threads=3), 2)
+
+    def test_auto_uses_at_least_one_worker(self):
+        self.assertEqual(self.count('auto', 1), 1)
+        self.assertEqual(self.count('auto', None), 1)
+        self.assertEqual(self.count('auto', 8, threads=0), 8)
+
+    def test_explicit_count(self):
+        self.assertEqual(self.count('3', 8), 3)
+        self.assertEqual(self.count('0', 8), 1)
+
+class TestChunkTranscription(unittest.TestCase):
+    def setUp(self):
+        patchers = [
+            mock.patch.object(transcribe_pool, 'transcribe_segments', side_effect=fake_segments),
+            mock.patch.object(transcribe_pool, 'worker_count', return_value=2),
+            mock.patch.object(transcribe_pool, '_reset_executor'),
+        ]
+        self.transcribe, _, self.reset = [patcher.start() for patcher in patchers]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+
+    def with_executor(self, executor, **kwargs):
+        with mock.patch.object(transcribe_pool, '_get_executor', return_value=executor):
+            return ChunkTranscription(**kwargs)
+
+    def test_sequential_chunks_are_transcribed_on_demand(self):
+        transcripts = ChunkTranscription(['a.wav', 'b.wav'], parallel=False)
+        self.assertIsNone(transcripts.executor)
+        self.transcribe.assert_not_called()
+        self.assertEqual(transcripts.result(1)[0]['text'], 'yerel:b.wav')
+        self.assertEqual(transcripts.result(0)[0]['text'], 'yerel:a.wav')
+
+    def test_single_chunk_does_not_start_pool(self):
+        with mock.patch.object(transcribe_pool, '_get_executor') as get_executor:
+            ChunkTranscription(['a.wav'])
+        get_executor.assert_not_called()
+
+    def test_cancelled_token_stops_before_transcribing(self):
+        token = FakeToken()
+        transcripts = ChunkTranscription(['a.wav', 'b.wav'], token=token, parallel=False)
+        transcripts.result(0)
+        token.cancelled = True
+        with self.assertRaises(Cancelled):
+            transcripts.result(1)
+        self.assertEqual(self.transcribe.call_count, 1)
+
+    def test_streamed_chunks_are_submitted_to_pool(self):
+        executor = FakeExecutor()
+        transcripts = self.with_executor(executor, parallel=True)
+        self.assertEqual(transcripts.add('a.wav'), 0)
+        self.assertEqual(transcripts.add('b.wav'), 1)
+        self.assertEqual(executor.submitted, ['a.wav', 'b.wav'])
+        self.assertEqual(transcripts.result(1)[0]['text'], 'havuz:b.wav')
+        self.transcribe.assert_not_called()
+
+    def test_broken_pool_on_submit_falls_back_to_local(self):
+        executor = FakeExecutor(broken=True)
+        transcripts = self.with_executor(executor, paths=['a.wav', 'b.wav'])
+        self.assertIsNone(transcripts.executor)
+        self.reset.assert_called_once_with(executor)
+        self.assertEqual(transcripts.result(0)[0]['text'], 'yerel:a.wav')
+        self.assertEqual(transcripts.result(1)[0]['text'], 'yerel:b.wav')
+
+    def test_broken_pool_on_result_falls_back_to_local(self):
+        executor = FakeExecutor()
+        transcripts = self.with_executor(executor, paths=['a.wav', 'b.wav'])
+        failed = Future()
+        failed.set_exception(BrokenProcessPool())
+        transcripts.futures[0] = failed
+        self.assertEqual(transcripts.result(0)[0]['text'], 'yerel:a.wav')
+        self.assertEqual(transcripts.futures, {})
+        # Sonra eklenen parçalar da bu süreçte işlenir
+        transcripts.add('c.wav')
+        self.assertEqual(transcripts.result(2)[0]['text'], 'yerel:c.wav')
+        self.assertEqual(executor.submitted, ['a.wav', 'b.wav'])
+
+    def test_pool_is_reset_once_when_failure_is_seen_twice(self):
+        executor = FakeExecutor()
+        transcripts = self.with_executor(executor, paths=['a.wav', 'b.wav'])
+        transcripts._pool_failed(executor)
+        transcripts._pool_failed(executor)
+        self.reset.assert_called_once_with(executor)
+
+    def test_close_cancels_pending_futures(self):
+        transcripts = self.with_executor(FakeExecutor(), parallel=True)
+        pending = Future()
+        transcripts.futures[0] = pending
+        transcripts.close()
+        self.assertTrue(pending.cancelled())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import time
+import tempfile
+import unittest
+
+from transcript_cache import TwoTierCache
+
+class TestTwoTierCache(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+
+    def tearDown(self):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.db_path + suffix):
+                os.unlink(self.db_path + suffix)
+
+    def test_memory_and_disk_hits(self):
+        cache = TwoTierCache('t', db_path=self.db_path)
+        cache.set('abc', {'id': 1})
+        self.assertEqual(cache.get('abc'), {'id': 1})
+
+        # A new instance simulates a restart: only the SQLite tier survives
+        restarted = TwoTierCache('t', db_path=self.db_path)
+        self.assertEqual(restarted.get('abc'), {'id': 1})
+        self.assertEqual(restarted.stats()['disk_hits'], 1)
+        self.assertEqual(restarted.get('abc'), {'id': 1})
+        self.assertEqual(restarted.stats()['memory_hits'], 1)
+
+    def test_ttl_expiry(self):
+        cache = TwoTierCache('t', db_path=self.db_path, ttl=1)
+        cache.set('abc', 'value')
+        time.sleep(1.1)
+        self.assertIsNone(cache.get('abc'))
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_lru_bounds(self):
+        cache = TwoTierCache('t', db_path=None, max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+
+        small = TwoTierCache('t', db_path=None, max_bytes=10)
+        small.set('a', 'x' * 5)
+        small.set('b', 'y' * 5)
+        self.assertLessEqual(small.stats()['memory_bytes'], 10)
+        self.assertIsNone(small.get('a'))
+
+    def test_negative_and_invalidate(self):
+        cache = TwoTierCache('t', db_path=self.db_path)
+        cache.set_negative('vid', 'no captions')
+        self.assertEqual(cache.get_negative('vid'), 'no captions')
+        self.assertIsNone(cache.get('vid'))
+        cache.invalidate('vid')
+        self.assertIsNone(cache.get_negative('vid'))
+        self.assertIsNone(TwoTierCache('t', db_path=self.db_path).get_negative('vid'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,234 @@
+import os
+import io
+import sys
+import time
+import json
+import base64
+import shutil
+import asyncio
+import tempfile
+import importlib.util
+import unittest
+from concurrent.futures import Future
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mcp-media-server', 'src'))
+
+import transfer
+from transfer import decode_base64_to_file, write_base64_temp, BASE64_DECODE_BLOCK
+from transfer import register_download, read_download, delete_download, cleanup_stale_downloads
+
+# mcp_client_utils, mcp paketini modül yüklenirken içe aktarır
+HAS_MCP = importlib.util.find_spec('mcp') is not None
+
+if HAS_MCP:
+    import mcp_client_utils
+    from mcp_client_utils import _encode_file_base64, _iter_download, _download_info, call_convert_media_stream, MCPToolError
+
+# İstemci 3 * 256 KB'lık bloklar kodlar, sunucu 1 MB'lık (4'ün katı) karakter blokları çözer
+CLIENT_BLOCK = 3 * 256 * 1024
+SIZES = [0, 1, 2, 3, 1000, CLIENT_BLOCK - 1, CLIENT_BLOCK, CLIENT_BLOCK + 1, 2 * CLIENT_BLOCK + 2]
+
+class TestDecodeBase64(unittest.TestCase):
+    def roundtrip(self, content):
+        out = io.BytesIO()
+        written = decode_base64_to_file(base64.b64encode(content).decode('ascii'), out)
+        self.assertEqual(written, len(content))
+        self.assertEqual(out.getvalue(), content)
+
+    def test_roundtrip_sizes(self):
+        for size in SIZES:
+            with self.subTest(size=size):
+                self.roundtrip(os.urandom(size))
+
+    def test_small_blocks(self):
+        # Blok sınırı her birkaç karakterde bir denk gelir; dolgu (=) yalnızca son blokta olur
+        with mock.patch.object(transfer, 'BASE64_DECODE_BLOCK', 8):
+            for size in (5, 6, 7, 100):
+                with self.subTest(size=size):
+                    self.roundtrip(os.urandom(size))
+
+    def test_block_is_multiple_of_four(self):
+        self.assertEqual(BASE64_DECODE_BLOCK % 4, 0)
+
+class TestWriteBase64Temp(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, True)
+        patcher = mock.patch.object(tempfile, 'tempdir', self.dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_keeps_extension(self):
+        content = os.urandom(CLIENT_BLOCK + 1)
+        path = write_base64_temp(base64.b64encode(content).decode('ascii'), '../kayit.mp3')
+        self.assertEqual(os.path.dirname(path), self.dir)
+        self.assertTrue(path.endswith('.mp3'))
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), content)
+
+    def test_removes_file_when_decoding_fails(self):
+        with self.assertRaises(ValueError):
+            write_base64_temp('bozuk*veri', 'kayit.wav')
+        self.assertEqual(os.listdir(self.dir), [])
+
+class TestDownloads(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, True)
+        patcher = mock.patch.object(transfer, 'DOWNLOAD_DIR', self.dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def register(self, content, ext='.mp3'):
+        fd, path = tempfile.mkstemp(suffix=ext)
+        os.write(fd, content)
+        os.close(fd)
+        return register_download(path), path
+
+    def test_register_moves_file_and_marks_result(self):
+        info, source = self.register(b'0123456789')
+        self.assertEqual(info['type'], 'download')
+        self.assertEqual(info['size'], 10)
+        self.assertTrue(info['handle'].endswith('.mp3'))
+        self.assertFalse(os.path.exists(source))
+        self.assertEqual(os.listdir(self.dir), [info['handle']])
+
+    def test_read_ranges(self):
+        info, _ = self.register(b'0123456789')
+        self.assertEqual(read_download(info['handle'], 0, 4), b'0123')
+        self.assertEqual(read_download(info['handle'], 8, 4), b'89')
+        self.assertEqual(read_download(info['handle'], 10, 4), b'')
+        with mock.patch.object(transfer, 'DOWNLOAD_MAX_CHUNK', 3):
+            self.assertEqual(read_download(info['handle'], 0, 100), b'012')
+
+    def test_unknown_or_escaping_handle_is_rejected(self):
+        for handle in ('', 'yok.mp3', '../' + os.path.basename(self.dir)):
+            with self.subTest(handle=handle):
+                with self.assertRaises(FileNotFoundError):
+                    read_download(handle, 0, 1)
+
+    def test_delete(self):
+        info, _ = self.register(b'abc')
+        delete_download(info['handle'])
+        self.assertEqual(os.listdir(self.dir), [])
+        with self.assertRaises(FileNotFoundError):
+            delete_download(info['handle'])
+
+    def test_stale_downloads_are_removed(self):
+        old, _ = self.register(b'eski')
+        new, _ = self.register(b'yeni')
+        past = time.time() - transfer.DOWNLOAD_TTL - 10
+        os.utime(os.path.join(self.dir, old['handle']), (past, past))
+        with mock.patch.object(transfer, '_last_download_cleanup', 0.0):
+            cleanup_stale_downloads()
+        self.assertEqual(os.listdir(self.dir), [new['handle']])
+
+def tool_result(text):
+    return SimpleNamespace(content=[SimpleNamespace(type='text', text=text)], isError=False)
+
+class FakeDownloadServer:
+    """download_chunk/release_download araçlarını taklit eder; truncate ile dosya yarıda kısalmış gibi davranır."""
+
+    def __init__(self, content, truncate=None):
+        self.content = content
+        self.truncate = truncate
+        self.requests = []
+        self.released = []
+
+    async def call_tool(self, name, arguments):
+        if name == 'release_download':
+            self.released.append(arguments['handle'])
+            return tool_result(f"Released {arguments['handle']}")
+        offset, length = arguments['offset'], arguments['length']
+        self.requests.append(offset)
+        content = self.content[:self.truncate] if self.truncate is not None else self.content
+        return tool_result(base64.b64encode(content[offset:offset + length]).decode('ascii'))
+
+class FakePool:
+    """MCPSessionPool yerine çağrıları aynı thread'de, tek bir sahte oturumla çalıştırır."""
+
+    def __init__(self, session):
+        self.session = session
+
+    def run(self, fn, **kwargs):
+        return asyncio.run(fn(self.session))
+
+    def submit(self, fn):
+        future = Future()
+        try:
+            future.set_result(self.run(fn))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+@unittest.skipUnless(HAS_MCP, "mcp paketi kurulu değil")
+class TestClientDownload(unittest.TestCase):
+    def use_server(self, server):
+        patchers = [mock.patch.object(mcp_client_utils, '_pool', FakePool(server)),
+                    mock.patch.object(mcp_client_utils, 'MCP_DOWNLOAD_CHUNK_SIZE', 4)]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        return server
+
+    def test_pieces_are_yielded_in_order_and_released(self):
+        server = self.use_server(FakeDownloadServer(b'0123456789'))
+        self.assertEqual(list(_iter_download('h.mp3', 10)), [b'0123', b'4567', b'89'])
+        self.assertEqual(server.requests, [0, 4, 8])
+        self.assertEqual(server.released, ['h.mp3'])
+
+    def test_closing_early_releases_handle(self):
+        server = self.use_server(FakeDownloadServer(b'0123456789'))
+        chunks = _iter_download('h.mp3', 10)
+        self.assertEqual(next(chunks), b'0123')
+        chunks.close()
+        self.assertEqual(server.released, ['h.mp3'])
+
+    def test_short_piece_raises(self):
+        server = self.use_server(FakeDownloadServer(b'0123456789', truncate=6))
+        chunks = _iter_download('h.mp3', 10)
+        self.assertEqual(next(chunks), b'0123')
+        with self.assertRaises(MCPToolError):
+            next(chunks)
+        self.assertEqual(server.released, ['h.mp3'])
+
+    def test_download_info_requires_marker(self):
+        self.assertEqual(_download_info('{"type": "download", "handle": "h", "size": 3}')['handle'], 'h')
+        self.assertIsNone(_download_info('{"handle": "h", "size": 3}'))
+        self.assertIsNone(_download_info(base64.b64encode(b'ses').decode('ascii')))
+        self.assertIsNone(_download_info('1234'))
+
+    def test_convert_stream_uses_handle_or_inline_result(self):
+        server = self.use_server(FakeDownloadServer(b'0123456789'))
+        handle = json.dumps({'type': 'download', 'handle': 'h.mp3', 'size': 10})
+        for result, expected in ((handle, b'0123456789'), (base64.b64encode(b'ses').decode('ascii'), b'ses')):
+            with self.subTest(result=result):
+                async def convert(session, file_path, target_format, return_handle=False):
+                    return result
+                with mock.patch.object(mcp_client_utils, '_call_convert_media_async', convert):
+                    size, chunks = call_convert_media_stream('girdi.wav', 'mp3')
+                self.assertEqual(size, len(expected))
+                self.assertEqual(b''.join(chunks), expected)
+
+@unittest.skipUnless(HAS_MCP, "mcp paketi kurulu değil")
+class TestClientEncoding(unittest.TestCase):
+    def test_client_to_server_roundtrip(self):
+        for size in SIZES:
+            with self.subTest(size=size):
+                content = os.urandom(size)
+                fd, path = tempfile.mkstemp()
+                os.write(fd, content)
+                os.close(fd)
+                try:
+                    encoded = _encode_file_base64(path)
+                finally:
+                    os.unlink(path)
+                self.assertEqual(encoded, base64.b64encode(content).decode('ascii'))
+                out = io.BytesIO()
+                decode_base64_to_file(encoded, out)
+                self.assertEqual(out.getvalue(), content)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+import os
+import json
+import asyncio
+import tempfile
+import importlib.util
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+# mcp_client_utils, mcp paketini modül yüklenirken içe aktarır
+HAS_MCP = importlib.util.find_spec('mcp') is not None
+
+if HAS_MCP:
+    import mcp_client_utils
+    from mcp_client_utils import ServerCapabilities, MIN_CHUNK_SIZE, MAX_CHUNK_SIZE, CHUNK_SIZE
+
+@unittest.skipUnless(HAS_MCP, "mcp paketi kurulu değil")
+class TestChooseChunkSize(unittest.TestCase):
+    def choose(self, throughput):
+        with mock.patch.object(mcp_client_utils, '_upload_throughput', throughput):
+            return mcp_client_utils._choose_chunk_size()
+
+    def test_default_before_measurement(self):
+        self.assertEqual(self.choose(None), CHUNK_SIZE)
+
+    def test_slow_link_is_clamped_to_minimum(self):
+        self.assertEqual(self.choose(1024), MIN_CHUNK_SIZE)
+
+    def test_fast_link_is_clamped_to_maximum(self):
+        self.assertEqual(self.choose(10 ** 10), MAX_CHUNK_SIZE)
+
+    def test_size_is_aligned_and_within_bounds(self):
+        for throughput in (200_000, 1_234_567, 3_000_001):
+            size = self.choose(throughput)
+            self.assertGreaterEqual(size, MIN_CHUNK_SIZE)
+            self.assertLessEqual(size, MAX_CHUNK_SIZE)
+            self.assertEqual(size % (64 * 1024), 0)
+
+    def test_throughput_is_smoothed_and_small_samples_ignored(self):
+        with mock.patch.object(mcp_client_utils, '_upload_throughput', None):
+            mcp_client_utils._record_upload_throughput(MIN_CHUNK_SIZE - 1, 0.01)
+            self.assertIsNone(mcp_client_utils._upload_throughput)
+            mcp_client_utils._record_upload_throughput(MIN_CHUNK_SIZE * 10, 1.0)
+            self.assertEqual(mcp_client_utils._upload_throughput, MIN_CHUNK_SIZE * 10)
+            mcp_client_utils._record_upload_throughput(MIN_CHUNK_SIZE * 20, 1.0)
+            self.assertAlmostEqual(mcp_client_utils._upload_throughput, MIN_CHUNK_SIZE * 13)
+            # Ölçülen hız hedef süreye göre parça boyutuna çevrilir
+            expected = int(MIN_CHUNK_SIZE * 13 * mcp_client_utils.UPLOAD_TARGET_SECONDS)
+            self.assertEqual(mcp_client_utils._choose_chunk_size(), expected - expected % (64 * 1024))
+
+@unittest.skipUnless(HAS_MCP, "mcp paketi kurulu değil")
+class TestServerCapabilities(unittest.TestCase):
+    def test_blob_transport_needs_all_blob_tools(self):
+        capabilities = ServerCapabilities(['transcribe_audio', 'upload_chunk', 'has_blob', 'commit_blob'])
+        self.assertEqual(capabilities.transport(), 'blob')
+
+    def test_chunked_transport(self):
+        self.assertEqual(ServerCapabilities(['transcribe_audio', 'upload_chunk']).transport(), 'chunked')
+        # Blob araçlarından biri eksikse parça yüklemeye düşülür
+        self.assertEqual(ServerCapabilities(['upload_chunk', 'has_blob']).transport(), 'chunked')
+
+    def test_legacy_transport(self):
+        self.assertEqual(ServerCapabilities(['transcribe_audio']).transport(), 'legacy')
+        self.assertEqual(ServerCapabilities([]).transport(), 'legacy')
+        self.assertEqual(ServerCapabilities(['has_blob', 'commit_blob']).transport(), 'legacy')
+
+    def test_to_dict_reports_transport(self):
+        info = ServerCapabilities(['upload_chunk'], 'media', '1.0').to_dict()
+        self.assertEqual(info['transport'], 'chunked')
+        self.assertEqual(info['tools'], ['upload_chunk'])
+
+def tool_result(text, error=False):
+    return SimpleNamespace(content=[SimpleNamespace(type='text', text=text)], isError=error)
+
+class FakeBlobServer:
+    """Blob araçlarını taklit eder; evict_once ile ilk çağrıdan önce blob depodan düşmüş gibi davranır."""
+
+    def __init__(self, stored=False, evict_once=False):
+        self.stored = stored
+        self.evict_once = evict_once
+        self.calls = []
+
+    async def call_tool(self, name, arguments=None, **kwargs):
+        self.calls.append(name)
+        if name == 'has_blob':
+            return tool_result(json.dumps({'exists': self.stored}))
+        if name == 'list_uploaded_chunks':
+            return tool_result(json.dumps({'chunks': []}))
+        if name == 'upload_chunk':
+            return tool_result('Chunk saved')
+        if name == 'commit_blob':
+            self.stored = True
+            return tool_result(json.dumps({'sha256': arguments['sha256']}))
+        if name == 'transcribe_uploaded_file':
+            if self.evict_once:
+                self.evict_once = False
+                self.stored = False
+                return tool_result(f"Error in transcribe_uploaded_file: Blob bulunamadı: {arguments['blob_sha256']}")
+            return tool_result('metin')
+        raise AssertionError(name)
+
+class FakeChunkServer:
+    """upload_chunk'ı taklit eder; received sunucuda zaten bulunan parça indeksleridir."""
+
+    def __init__(self, received=(), failures=0):
+        self.received = set(received)
+        self.failures = failures
+        self.sent = []
+
+    async def call_tool(self, name, arguments=None, **kwargs):
+        if name == 'list_uploaded_chunks':
+            return tool_result(json.dumps({'chunks': sorted(self.received)}))
+        if name == 'upload_chunk':
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionResetError("bağlantı koptu")
+            self.sent.append(arguments['chunk_index'])
+            return tool_result('Chunk saved')
+        raise AssertionError(name)
+
+@unittest.skipUnless(HAS_MCP, "mcp paketi kurulu değil")
+class TestChunkedUpload(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.write(fd, b'x' * (MIN_CHUNK_SIZE * 3 + 10))
+        os.close(fd)
+        self.addCleanup(os.unlink, self.path)
+        patcher = mock.patch.object(mcp_client_utils, '_upload_throughput', MIN_CHUNK_SIZE / 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def upload(self, server):
+        with mock.patch.object(mcp_client_utils, '_record_upload_throughput'):
+            return asyncio.run(mcp_client_utils.upload_file_chunked(self.path, server))
+
+    def test_resume_sends_only_missing_chunks(self):
+        server = FakeChunkServer(received={0, 2})
+        upload_id = self.upload(server)
+        self.assertEqual(sorted(server.sent), [1, 3])
+        self.assertTrue(upload_id.endswith(f"-{MIN_CHUNK_SIZE}"))
+
+    def test_failed_chunk_is_retried(self):
+        server = FakeChunkServer(failures=2)
+        with mock.patch.object(mcp_client_utils.asyncio, 'sleep', mock.AsyncMock()):
+            self.upload(server)
+        self.assertEqual(sorted(server.sent), [0, 1, 2, 3])
+
+@unittest.skipUnless(HAS_MCP, "mcp paketi kurulu değil")
+class TestBlobFallback(unittest.TestCase):
+    TOOLS = ['upload_chunk', 'has_blob', 'commit_blob', 'list_uploaded_chunks', 'transcribe_uploaded_file']
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.wav')
+        os.write(fd, b'ses' * 1000)
+        os.close(fd)
+        self.addCleanup(os.unlink, self.path)
+
+    def call(self, server):
+        capabilities = ServerCapabilities(self.TOOLS)
+        return asyncio.run(mcp_client_utils._call_uploaded_tool(
+            server, 'transcribe_uploaded_file', self.path, capabilities, {'model_size': 'base'}))
+
+    def test_stored_blob_is_not_uploaded(self):
+        server = FakeBlobServer(stored=True)
+        self.assertEqual(mcp_client_utils._result_text(self.call(server)), 'metin')
+        self.assertEqual(server.calls, ['has_blob', 'transcribe_uploaded_file'])
+
+    def test_evicted_blob_is_uploaded_again(self):
+        server = FakeBlobServer(stored=True, evict_once=True)
+        self.assertEqual(mcp_client_utils._result_text(self.call(server)), 'metin')
+        self.assertEqual(server.calls.count('transcribe_uploaded_file'), 2)
+        self.assertIn('commit_blob', server.calls)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", "transcript_cache.db")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "500"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # 64MB
+CACHE_TTL = int(os.getenv("CACHE_TTL", str(7 * 24 * 3600)))  # 7 gün
+CACHE_NEGATIVE_TTL = int(os.getenv("CACHE_NEGATIVE_TTL", str(24 * 3600)))  # 1 gün
+
+NEGATIVE_PREFIX = "negative:"
+
+class TwoTierCache:
+    """
+    İki katmanlı önbellek: süreç içi LRU (adet ve byte sınırlı) + diskte SQLite.
+    Bellekte bulunamayan kayıt SQLite'tan okunur ve belleğe geri yüklenir.
+    Değerler JSON'a çevrilebilir olmalıdır.
+    """
+
+    def __init__(self, namespace: str, db_path: str = CACHE_DB_PATH,
+                 max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES,
+                 ttl: int = CACHE_TTL, negative_ttl: int = CACHE_NEGATIVE_TTL):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+        self._memory = OrderedDict()  # key -> (expires, value, size)
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'negative_hits': 0,
+            'sets': 0,
+            'evictions': 0,
+            'invalidations': 0
+        }
+
+        self._db = None
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS cache ("
+                    "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                    "expires REAL, PRIMARY KEY (namespace, key))"
+                )
+                self._db.execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires < ?", (time.time(),))
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Önbellek veritabanı açılamadı ({db_path}): {e}. Sadece bellek kullanılacak.")
+                self._db = None
+
+    def get(self, key: str):
+        """Değeri döndürür, yoksa veya süresi dolmuşsa None."""
+        hit, value = self._lookup(key)
+        return value if hit else None
+
+    def set(self, key: str, value, ttl: int = None):
+        """Değeri her iki katmana yazar. ttl=0 süresiz saklar."""
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.time() + ttl if ttl else None
+        encoded = json.dumps(value, ensure_ascii=False)
+
+        with self._lock:
+            self._stats['sets'] += 1
+            self._memory_put(key, expires, value, len(encoded.encode('utf-8')))
+            if self._db:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO cache (namespace, key, value, expires) VALUES (?, ?, ?, ?)",
+                        (self.namespace, key, encoded, expires)
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"Önbellek yazma hatası: {e}")
+
+    def get_negative(self, key: str):
+        """Daha önce kaydedilmiş olumsuz sonucu (ör. transkript yok) döndürür, yoksa None."""
+        hit, value = self._lookup(NEGATIVE_PREFIX + key, count=False)
+        if hit:
+            with self._lock:
+                self._stats['negative_hits'] += 1
+            return value
+        return None
+
+    def set_negative(self, key: str, reason: str, ttl: int = None):
+        """Olumsuz sonucu daha kısa bir süre için önbelleğe alır."""
+        self.set(NEGATIVE_PREFIX + key, reason, ttl=self.negative_ttl if ttl is None else ttl)
+
+    def invalidate(self, key: str):
+        """Anahtarın olumlu ve olumsuz kayıtlarını her iki katmandan siler."""
+        keys = (key, NEGATIVE_PREFIX + key)
+        with self._lock:
+            self._stats['invalidations'] += 1
+            for k in keys:
+                self._memory_remove(k)
+            if self._db:
+                try:
+                    self._db.executemany(
+                        "DELETE FROM cache WHERE namespace = ? AND key = ?",
+                        [(self.namespace, k) for k in keys]
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"Önbellek silme hatası: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self._db:
+                self._db.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+            stats['memory_bytes'] = self._memory_bytes
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 3) if lookups else 0.0
+        return stats
+
+    def _lookup(self, key: str, count: bool = True):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry:
+                expires, value, _ = entry
+                if expires is None or expires > now:
+                    self._memory.move_to_end(key)
+                    if count:
+                        self._stats['memory_hits'] += 1
+                    return True, value
+                self._memory_remove(key)
+
+            if self._db:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, expires FROM cache WHERE namespace = ? AND key = ?",
+                        (self.namespace, key)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    print(f"Önbellek okuma hatası: {e}")
+                    row = None
+
+                if row:
+                    encoded, expires = row
+                    if expires is None or expires > now:
+                        value = json.loads(encoded)
+                        self._memory_put(key, expires, value, len(encoded.encode('utf-8')))
+                        if count:
+                            self._stats['disk_hits'] += 1
+                        return True, value
+                    self._db.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+                    self._db.commit()
+
+            if count:
+                self._stats['misses'] += 1
+            return False, None
+
+    def _memory_put(self, key, expires, value, size):
+        # Lock tutulurken çağrılır
+        self._memory_remove(key)
+        if size > self.max_bytes:
+            return  # Tek başına sınırı aşan değerler sadece diskte tutulur
+        self._memory[key] = (expires, value, size)
+        self._memory_bytes += size
+        while self._memory and (len(self._memory) > self.max_entries or self._memory_bytes > self.max_bytes):
+            _, (_, _, old_size) = self._memory.popitem(last=False)
+            self._memory_bytes -= old_size
+            self._stats['evictions'] += 1
+
+    def _memory_remove(self, key):
+        entry = self._memory.pop(key, None)
+        if entry:
+            self._memory_bytes -= entry[2]